@@ -1,25 +1,148 @@
 import sys
 import os
-import uuid
-import time
-import tempfile
+import argparse
+import logging
 
 # Add parent directory to path for importing custom modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, render_template, request, jsonify, send_file
-from src.analyze import FrenchAnalyzer
-from gtts import gTTS
+from flask import Flask, render_template, request, jsonify, send_from_directory
+from werkzeug.exceptions import NotFound
+from src.analyze import FrenchAnalyzer, COMPONENTS
+from src.tts import TTSService, create_backends
+from src.tts_cache import AudioCache, is_cache_file
+from src.jobs import JobQueue, QueueFull
+from src.documents import DocumentStore, apply_edits
+from src.result_cache import ResultCache
+from src.transcription import parse_cpu_list
+from src.whisper_models import ModelPolicy
+from src.phonetics import DEFAULT_LEXICON_PATH
+from src.inflections import DEFAULT_INFLECTIONS_PATH
+from src.streaming import StreamManager, pcm16_to_float32
+from src.metrics import metrics, timed, collect, as_milliseconds
+
+# Log level of the app and the analysis pipeline (DEBUG shows every intermediate correction)
+logging.basicConfig(level=os.environ.get('NUANSA_LOG_LEVEL', 'INFO').upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 # Initialize Flask app with custom static folder path
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-print(f"Static folder: {app.static_folder}")
-
-# Initialize French language analyzer
-analyzer = FrenchAnalyzer()
-
-# Configure upload directory for audio files
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
+logger.debug("Static folder: %s", app.static_folder)
+
+# Number of local LanguageTool servers shared by the request threads (0 = rules-only)
+app.config['LANGUAGETOOL_POOL_SIZE'] = int(os.environ.get('NUANSA_LANGUAGETOOL_POOL_SIZE', '2'))
+
+# Synthesized speech is cached by content under static/audio, bounded in size (MB) and in
+# age: files unused for TTL seconds (0 = no limit) are removed by a sweep every SWEEP_INTERVAL seconds
+app.config['TTS_CACHE_FOLDER'] = os.path.join(app.static_folder, 'audio')
+app.config['TTS_CACHE_MAX_MB'] = int(os.environ.get('NUANSA_TTS_CACHE_MAX_MB', '200'))
+app.config['TTS_CACHE_TTL'] = int(os.environ.get('NUANSA_TTS_CACHE_TTL', '86400'))
+app.config['TTS_CACHE_SWEEP_INTERVAL'] = int(os.environ.get('NUANSA_TTS_CACHE_SWEEP_INTERVAL', '300'))
+tts_cache = AudioCache(app.config['TTS_CACHE_FOLDER'],
+                       max_bytes=app.config['TTS_CACHE_MAX_MB'] * 1024 * 1024,
+                       ttl=app.config['TTS_CACHE_TTL'] or None)
+
+# Browsers may keep content-addressed audio this many seconds without asking again
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+# Text-to-speech backends tried in order: gtts (network), espeak (offline), stub (offline tone for tests)
+app.config['TTS_BACKENDS'] = os.environ.get('NUANSA_TTS_BACKENDS', 'gtts,espeak')
+app.config['TTS_TIMEOUT'] = float(os.environ.get('NUANSA_TTS_TIMEOUT', '10'))
+tts_service = TTSService(create_backends(app.config['TTS_BACKENDS'], timeout=app.config['TTS_TIMEOUT']),
+                         tts_cache)
+
+# Concurrent Whisper transcriptions are batched: collection window (ms) and maximum batch size
+app.config['WHISPER_BATCH_WINDOW_MS'] = float(os.environ.get('NUANSA_WHISPER_BATCH_WINDOW_MS', '30'))
+app.config['WHISPER_MAX_BATCH'] = int(os.environ.get('NUANSA_WHISPER_MAX_BATCH', '8'))
+
+# CPUs reserved for Whisper decoding, e.g. "0-3" (empty = no pinning, share every core)
+app.config['WHISPER_CPUS'] = parse_cpu_list(os.environ.get('NUANSA_WHISPER_CPUS', ''))
+
+# Whisper models: the accurate one, an optional fast one (e.g. "tiny", empty = none), and int8
+# dynamic quantization of their linear layers for faster CPU inference
+app.config['WHISPER_MODEL'] = os.environ.get('NUANSA_WHISPER_MODEL', 'base')
+app.config['WHISPER_FAST_MODEL'] = os.environ.get('NUANSA_WHISPER_FAST_MODEL', '')
+app.config['WHISPER_QUANTIZE'] = os.environ.get('NUANSA_WHISPER_QUANTIZE', '0') == '1'
+
+# Latency budget: clips up to this many seconds, and all clips while this many transcriptions
+# are pending, go to the fast model
+app.config['WHISPER_FAST_MAX_SECONDS'] = float(os.environ.get('NUANSA_WHISPER_FAST_MAX_SECONDS', '8'))
+app.config['WHISPER_BUSY_PENDING'] = int(os.environ.get('NUANSA_WHISPER_BUSY_PENDING', '4'))
+
+# French word list used to repair misspelled transcriptions (one word per line, most frequent first)
+app.config['LEXICON_PATH'] = os.environ.get('NUANSA_LEXICON_PATH', DEFAULT_LEXICON_PATH)
+
+# Binary inflection lexicon for gender and number agreement, memory-mapped and shared by the
+# workers (build it with "python -m src.inflections"; empty disables the agreement checks)
+app.config['INFLECTIONS_PATH'] = os.environ.get('NUANSA_INFLECTIONS_PATH', DEFAULT_INFLECTIONS_PATH)
+
+# Per-word pronunciation scores against synthesized references, off by default: they need word
+# timestamps, so scored clips are not batched. Budgets in milliseconds of CPU and of wall-clock
+# time per second of audio
+app.config['PRONUNCIATION_SCORING'] = os.environ.get('NUANSA_PRONUNCIATION_SCORING', '0') == '1'
+app.config['PRONUNCIATION_CPU_MS'] = float(os.environ.get('NUANSA_PRONUNCIATION_CPU_MS', '150'))
+app.config['PRONUNCIATION_WALL_MS'] = float(os.environ.get('NUANSA_PRONUNCIATION_WALL_MS', '300'))
+
+# Acoustic feature vectors kept in memory, keyed by audio content
+app.config['FEATURE_CACHE_SIZE'] = int(os.environ.get('NUANSA_FEATURE_CACHE_SIZE', '512'))
+
+# Text analysis results cached by text, gender, mode and rules version: entries in memory
+# (0 disables the cache), time to live in seconds, and an optional SQLite file shared by workers,
+# with its maximum number of rows
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('NUANSA_RESULT_CACHE_SIZE', '2048'))
+app.config['RESULT_CACHE_TTL'] = int(os.environ.get('NUANSA_RESULT_CACHE_TTL', '3600'))
+app.config['RESULT_CACHE_DB'] = os.environ.get('NUANSA_RESULT_CACHE_DB', '')
+app.config['RESULT_CACHE_DB_ROWS'] = int(os.environ.get('NUANSA_RESULT_CACHE_DB_ROWS', '100000'))
+result_cache = None
+if app.config['RESULT_CACHE_SIZE'] > 0 or app.config['RESULT_CACHE_DB']:
+    result_cache = ResultCache(max_entries=app.config['RESULT_CACHE_SIZE'],
+                               ttl=app.config['RESULT_CACHE_TTL'],
+                               path=app.config['RESULT_CACHE_DB'] or None,
+                               max_rows=app.config['RESULT_CACHE_DB_ROWS'])
+
+# Return SHAP contributions with accent predictions (the explainer is built once, with the model)
+app.config['EXPLAIN_ACCENT'] = os.environ.get('NUANSA_EXPLAIN_ACCENT', '0') == '1'
+
+# Initialize French language analyzer (models are loaded on first use, see /warmup)
+analyzer = FrenchAnalyzer(grammar_pool_size=app.config['LANGUAGETOOL_POOL_SIZE'],
+                          tts=tts_service,
+                          audio_url='/static/audio/',
+                          whisper_batch_window=app.config['WHISPER_BATCH_WINDOW_MS'] / 1000,
+                          whisper_max_batch=app.config['WHISPER_MAX_BATCH'],
+                          whisper_cpus=app.config['WHISPER_CPUS'] or None,
+                          explain_accent=app.config['EXPLAIN_ACCENT'],
+                          feature_cache_size=app.config['FEATURE_CACHE_SIZE'],
+                          result_cache=result_cache,
+                          whisper_model=app.config['WHISPER_MODEL'],
+                          whisper_fast_model=app.config['WHISPER_FAST_MODEL'],
+                          whisper_quantize=app.config['WHISPER_QUANTIZE'],
+                          whisper_policy=ModelPolicy(fast_max_seconds=app.config['WHISPER_FAST_MAX_SECONDS'],
+                                                     busy_pending=app.config['WHISPER_BUSY_PENDING']),
+                          lexicon_path=app.config['LEXICON_PATH'],
+                          inflections_path=app.config['INFLECTIONS_PATH'] or None,
+                          score_pronunciation=app.config['PRONUNCIATION_SCORING'],
+                          pronunciation_budget=app.config['PRONUNCIATION_CPU_MS'] / 1000,
+                          pronunciation_wall_budget=app.config['PRONUNCIATION_WALL_MS'] / 1000)
+
+# Live recordings streamed in chunks to /stream: maximum simultaneous sessions
+app.config['STREAM_MAX_SESSIONS'] = int(os.environ.get('NUANSA_STREAM_MAX_SESSIONS', '16'))
+streams = StreamManager(analyzer.transcriber, max_sessions=app.config['STREAM_MAX_SESSIONS'])
+
+# Maximum number of texts accepted by /analyze_text/batch
+app.config['BATCH_MAX_TEXTS'] = int(os.environ.get('NUANSA_BATCH_MAX_TEXTS', '1000'))
+
+# Background audio analyses: worker threads and maximum queued or running jobs (429 beyond)
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('NUANSA_ANALYSIS_WORKERS', '2'))
+app.config['ANALYSIS_QUEUE_SIZE'] = int(os.environ.get('NUANSA_ANALYSIS_QUEUE_SIZE', '8'))
+analysis_jobs = JobQueue(workers=app.config['ANALYSIS_WORKERS'],
+                         max_pending=app.config['ANALYSIS_QUEUE_SIZE'])
+
+# Documents analyzed incrementally by /documents (as-you-type checking): maximum kept, and
+# seconds an untouched document is kept
+app.config['MAX_DOCUMENTS'] = int(os.environ.get('NUANSA_MAX_DOCUMENTS', '256'))
+app.config['DOCUMENT_TTL'] = int(os.environ.get('NUANSA_DOCUMENT_TTL', '1800'))
+documents = DocumentStore(max_documents=app.config['MAX_DOCUMENTS'], document_ttl=app.config['DOCUMENT_TTL'])
 
 # Sample sentences with common French grammar errors for testing/demo
 PRELOADED_SENTENCES = [
@@ -91,8 +214,16 @@ def analyze_audio():
     - audio: Audio file (.wav)
     - gender: 'masculine' or 'feminine' for grammar agreement
     - recruiter_mode: 'true' for demo mode with popup
-
-    Returns JSON with transcription, errors, corrections, and accent analysis.
+    - async: 'true' to run the analysis in the background (optional)
+    - timing: 'true' to add the time spent in each stage, in ms (optional)
+    - accuracy: 'high' for the accurate Whisper model, 'fast' for the fast one (optional,
+      chosen from the clip length and the server load by default)
+
+    Returns JSON with transcription, errors, corrections, accent analysis, per-word pronunciation
+    scores ('word_scores': word, expected word, start and end in seconds, score out of 100 or null)
+    and the Whisper model used.
+    In async mode, returns 202 with a job_id to poll at /jobs/<job_id>,
+    or 429 when the analysis queue is full.
     """
     recruiter_mode = request.form.get('recruiter_mode') == 'true'
     gender = request.form.get('gender', 'masculine')
@@ -113,36 +244,153 @@ def analyze_audio():
     if audio.filename == '' or not audio.filename.endswith('.wav'):
         return jsonify({"error": "Seul le format .wav est accepté"}), 400
 
-    # Save audio file temporarily
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    filename = os.path.join(app.config['UPLOAD_FOLDER'], f'input_{uuid.uuid4()}.wav')
-    audio.save(filename)
+    # Decode straight from the request body: no copy in the uploads folder
+    audio_bytes = audio.read()
+    include_timing = request.form.get('timing') == 'true'
+    accuracy = request.form.get('accuracy') or None
 
-    try:
-        # Analyze audio using French analyzer
-        result = analyzer.analyze_speech(filename, speaker_gender=gender)
+    if request.form.get('async') == 'true':
+        try:
+            job_id = analysis_jobs.submit(run_audio_analysis, audio_bytes, gender, recruiter_mode, display_gender,
+                                          include_timing, accuracy)
+        except QueueFull:
+            response = jsonify({"error": "Trop d'analyses en cours, veuillez réessayer dans quelques secondes."})
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+
+    return jsonify(run_audio_analysis(audio_bytes, gender, recruiter_mode, display_gender, include_timing, accuracy))
+
+def run_audio_analysis(audio_bytes, gender, recruiter_mode, display_gender, include_timing=False, accuracy=None):
+    """
+    Runs the speech analysis of an uploaded .wav file and builds the JSON response body.
+    Used directly and by the job queue.
+    """
+    # Analyze audio using French analyzer
+    with collect() as timings:
+        result = analyzer.analyze_speech(audio_bytes, speaker_gender=gender, accuracy=accuracy)
+
+    response = build_audio_response(result, recruiter_mode, display_gender)
+    if include_timing:
+        response["timing"] = as_milliseconds(timings)
+    return response
+
+def build_audio_response(result, recruiter_mode, display_gender):
+    """
+    Builds the JSON response body of a speech analysis result.
+    """
+    response = {
+        "transcription": result["transcription"],
+        "errors": result["errors"],
+        "corrected_text": result["corrected_text"],
+        "accent": result["accent"],
+        "shap_values": result.get("shap_values"),
+        "audio": result.get("audio_path"),
+        "pronunciation_corrections": result.get("pronunciation_corrections", []),
+        "word_scores": result.get("word_scores"),
+        "whisper_model": result.get("whisper_model"),
+        "recruiter_mode": recruiter_mode,
+        "interface": FRENCH_INTERFACE,
+        "display_gender": display_gender # Added for UI display
+    }
+
+    if recruiter_mode:
+        response["popup"] = FRENCH_INTERFACE["demo_popup"]
+
+    return response
+
+@app.route('/stream/start', methods=['POST'])
+def stream_start():
+    """
+    Opens a live recording session.
+
+    Expected JSON data:
+    - gender: 'masculine' or 'feminine' for grammar agreement
+
+    Returns JSON with the session_id and the audio format expected by /stream/<session_id>/chunk,
+    or 429 when too many recordings are in progress.
+    """
+    data = request.get_json(silent=True) or {}
+    session = streams.create(speaker_gender=data.get('gender', 'masculine'))
+    if session is None:
+        return jsonify({"error": "Trop d'enregistrements en cours, veuillez réessayer plus tard."}), 429
+
+    return jsonify({"session_id": session.id, "sample_rate": 16000, "format": "pcm_s16le"})
+
+@app.route('/stream/<session_id>/chunk', methods=['POST'])
+def stream_chunk(session_id):
+    """
+    Adds a chunk of the live recording (raw 16 kHz mono 16-bit little-endian PCM in the body).
+
+    Returns JSON with the stable transcript (words that will not change any more),
+    the unstable tail, and the rule-based corrections of the stable transcript.
+    """
+    session = streams.get(session_id)
+    if session is None:
+        return jsonify({"error": "Session inconnue ou expirée"}), 404
+
+    with session.lock:
+        try:
+            updated = session.add_chunk(pcm16_to_float32(request.get_data()))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stable_text = session.stable_text
+        if updated and stable_text:
+            # Rules-only analysis keeps live feedback fast; LanguageTool runs at the end
+            text, _ = analyzer.repair_transcription(stable_text)
+            errors, corrected_text = analyzer.analyze_text(text, speaker_gender=session.speaker_gender,
+                                                           use_language_tool=False)
+            session.analysis = {"errors": errors, "corrected_text": corrected_text}
 
         response = {
-            "transcription": result["transcription"],
-            "errors": result["errors"],
-            "corrected_text": result["corrected_text"],
-            "accent": result["accent"],
-            "audio": result.get("audio_path"),
-            "pronunciation_corrections": result.get("pronunciation_corrections", []),
-            "recruiter_mode": recruiter_mode,
-            "interface": FRENCH_INTERFACE,
-            "display_gender": display_gender # Added for UI display
+            "stable_text": stable_text,
+            "unstable_text": session.unstable_text,
+            "duration": round(session.duration, 2)
         }
+        response.update(session.analysis or {"errors": [], "corrected_text": ""})
+        return jsonify(response)
 
-        if recruiter_mode:
-            response["popup"] = FRENCH_INTERFACE["demo_popup"]
+@app.route('/stream/<session_id>/end', methods=['POST'])
+def stream_end(session_id):
+    """
+    Closes a live recording session and runs the full analysis of the recording.
 
-        return jsonify(response)
+    Returns the same JSON as /analyze_audio.
+    """
+    session = streams.close(session_id)
+    if session is None:
+        return jsonify({"error": "Session inconnue ou expirée"}), 404
+
+    with session.lock:
+        recording = session.finish()
+        result = analyzer.analyze_transcription(session.stable_text, recording,
+                                                speaker_gender=session.speaker_gender,
+                                                whisper_model=analyzer.whisper_label,
+                                                words=session.word_timings)
+
+    gender = session.speaker_gender.lower()
+    display_gender = FRENCH_INTERFACE["gender_feminine"] if gender == "feminine" else FRENCH_INTERFACE["gender_masculine"]
+    return jsonify(build_audio_response(result, False, display_gender))
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Returns the status of a background analysis job.
 
-    finally:
-        # Clean up temporary file
-        if os.path.exists(filename):
-            os.remove(filename)
+    Returns JSON with 'status' ('queued', 'running', 'done' or 'failed'),
+    plus 'result' (the /analyze_audio response) when done or 'error' when failed.
+    """
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Tâche inconnue ou expirée"}), 404
+
+    response = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        response["result"] = job["result"]
+    elif job["status"] == "failed":
+        response["error"] = job["error"]
+    return jsonify(response)
 
 @app.route('/analyze_text', methods=['POST'])
 def analyze_text():
@@ -153,6 +401,8 @@ def analyze_text():
     - text: French text to analyze
     - gender: 'masculine' or 'feminine' for grammar agreement
     - recruiter_mode: 'true' for demo mode with popup
+    - mode: 'rules' for the fast rules-only analysis that skips LanguageTool (optional)
+    - timing: true to add the time spent in each stage, in ms (optional)
 
     Returns JSON with original text, detected errors, and corrections.
     """
@@ -160,6 +410,7 @@ def analyze_text():
     recruiter_mode = data.get('recruiter_mode', False)
     gender = data.get('gender', 'masculine')
     text = data.get('text', '')
+    use_language_tool = data.get('mode', 'full') != 'rules'
 
     # Convert gender to French and capitalize for display
     display_gender = ""
@@ -173,7 +424,9 @@ def analyze_text():
     if not text:
         return jsonify({"error": FRENCH_INTERFACE["error_no_text"]}), 400
 
-    errors, corrected_text = analyzer.analyze_text(text, speaker_gender=gender)
+    with collect() as timings:
+        errors, corrected_text = analyzer.analyze_text(text, speaker_gender=gender,
+                                                       use_language_tool=use_language_tool)
 
     result = {
         "transcription": text,
@@ -199,21 +452,149 @@ def analyze_text():
     if recruiter_mode:
         response["popup"] = FRENCH_INTERFACE["demo_popup"]
 
+    if data.get('timing'):
+        response["timing"] = as_milliseconds(timings)
+
     return jsonify(response)
 
-@app.route('/tts', methods=['POST'])
-def text_to_speech():
+@app.route('/analyze_text/batch', methods=['POST'])
+def analyze_text_batch():
     """
-    Generates audio from text using gTTS.
+    Analyzes a batch of texts (e.g. a homework set) in one request.
 
     Expected JSON data:
+    - texts: list of French texts to analyze
+    - gender: 'masculine' or 'feminine' for grammar agreement
+    - mode: 'rules' for the fast rules-only analysis that skips LanguageTool (optional)
+    - timing: true to add the time spent in each stage, in ms (optional)
+
+    Returns JSON with one result per text, in order. Empty texts get an 'error' entry.
+    The interface strings are not repeated; fetch them once from the page.
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    gender = data.get('gender', 'masculine')
+    use_language_tool = data.get('mode', 'full') != 'rules'
+
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"error": FRENCH_INTERFACE["error_no_text"]}), 400
+    if len(texts) > app.config['BATCH_MAX_TEXTS']:
+        return jsonify({"error": f"Trop de textes : {app.config['BATCH_MAX_TEXTS']} au maximum par requête"}), 413
+
+    texts = [text if isinstance(text, str) else '' for text in texts]
+    to_analyze = [text for text in texts if text.strip()]
+    with collect() as timings:
+        analyses = iter(analyzer.analyze_texts(to_analyze, speaker_gender=gender,
+                                               use_language_tool=use_language_tool))
+
+    results = []
+    for text in texts:
+        if not text.strip():
+            results.append({"transcription": text, "error": FRENCH_INTERFACE["error_no_text"]})
+            continue
+        errors, corrected_text = next(analyses)
+        results.append({"transcription": text, "errors": errors, "corrected_text": corrected_text})
+
+    response = {"results": results, "gender": gender}
+    if data.get('timing'):
+        response["timing"] = as_milliseconds(timings)
+    return jsonify(response)
+
+@app.route('/documents', methods=['POST'])
+def document_create():
+    """
+    Analyzes a text and keeps it as a document that later requests edit incrementally.
+
+    Expected JSON data:
+    - text: French text to analyze
+    - gender: 'masculine' or 'feminine' for grammar agreement
+    - mode: 'rules' for the fast rules-only analysis that skips LanguageTool (optional)
+
+    Returns JSON with the analysis_id and version to send with the edits, the errors
+    (each with an 'id' that stays the same while the error exists) and the corrected text.
+    """
+    data = request.get_json(silent=True) or {}
+    text = data.get('text', '')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({"error": FRENCH_INTERFACE["error_no_text"]}), 400
+
+    document = documents.create(text, speaker_gender=data.get('gender', 'masculine'),
+                                use_language_tool=data.get('mode', 'full') != 'rules')
+    with document.lock:
+        errors, corrected_text, sentences = analyzer.analyze_document(
+            text, speaker_gender=document.speaker_gender, use_language_tool=document.use_language_tool)
+        document.update(text, errors, corrected_text, sentences)
+
+        return jsonify({
+            "analysis_id": document.id,
+            "version": document.version,
+            "errors": document.errors,
+            "corrected_text": document.corrected_text
+        })
+
+@app.route('/documents/<analysis_id>/edits', methods=['POST'])
+def document_edit(analysis_id):
+    """
+    Applies edits to a document and analyzes again only the sentences they changed.
+
+    Expected JSON data:
+    - edits: list of {start, end, text}, each replacing the characters [start, end) of the
+      text left by the previous edits
+    - version: the version the edits were made against (the latest one returned)
+
+    Returns JSON with the new version, the errors that appeared ('added', with their ids),
+    the ids of the errors that went away ('removed') and the corrected text.
+    Answers 409 with the current version when the document changed in the meantime.
+    """
+    document = documents.get(analysis_id)
+    if document is None:
+        return jsonify({"error": "Document inconnu ou expiré"}), 404
+
+    data = request.get_json(silent=True) or {}
+    edits = data.get('edits', [])
+    with document.lock:
+        if data.get('version') != document.version:
+            return jsonify({"error": "Le document a changé entre-temps", "version": document.version}), 409
+        try:
+            text = apply_edits(document.text, edits)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        errors, corrected_text, sentences = analyzer.analyze_document(
+            text, known=document.sentences, speaker_gender=document.speaker_gender,
+            use_language_tool=document.use_language_tool)
+        added, removed = document.update(text, errors, corrected_text, sentences, edits=edits)
+
+        return jsonify({
+            "analysis_id": document.id,
+            "version": document.version,
+            "added": added,
+            "removed": removed,
+            "corrected_text": document.corrected_text
+        })
+
+@app.route('/documents/<analysis_id>', methods=['DELETE'])
+def document_close(analysis_id):
+    """
+    Forgets a document (e.g. when the editor is closed).
+    """
+    if documents.close(analysis_id) is None:
+        return jsonify({"error": "Document inconnu ou expiré"}), 404
+    return jsonify({"analysis_id": analysis_id, "closed": True})
+
+@app.route('/tts', methods=['GET', 'POST'])
+def text_to_speech():
+    """
+    Generates audio from text with the configured TTS backends (gTTS by default).
+
+    Expected JSON data (POST), or query parameters (GET, e.g. as an <audio> source):
     - text: Text to convert to speech
     - lang: Language code (e.g., 'fr')
-    - gender: 'masculine' or 'feminine' (currently unused by gTTS)
+    - gender: 'masculine' or 'feminine' (currently unused by the TTS backends)
 
-    Returns audio file as response.
+    Returns the audio, streamed as it is synthesized.
     """
-    data = request.get_json()
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
     text = data.get('text', '')
     lang = data.get('lang', 'fr')
 
@@ -221,35 +602,98 @@ def text_to_speech():
         return jsonify({"error": "Aucun texte fourni pour la synthèse vocale"}), 400
 
     try:
-        # Generate temporary audio file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-            tts = gTTS(text=text, lang=lang, slow=False)
-            tts.save(temp_file.name)
-
-            # Send file and clean up
-            response = send_file(temp_file.name, mimetype='audio/mpeg')
-
-        # Schedule cleanup after response is sent
-        # Note: This os.remove might execute before send_file fully streams the file.
-        # For production, consider using a background task queue or Flask's after_request hook
-        # to ensure the file is served before deletion. For a small demo, this might be acceptable.
-        os.remove(temp_file.name)
-        return response
+        # Audio goes out from memory as soon as its first part is ready; identical
+        # requests share one cached file instead of being synthesized again
+        with timed("tts"):
+            chunks, backend = tts_service.stream(text, lang=lang)
+        if chunks is None:
+            return jsonify({"error": "Erreur lors de la génération audio : aucun moteur disponible"}), 503
+        return app.response_class(chunks, mimetype=backend.mimetype)
 
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la génération audio : {str(e)}"}), 500
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
+@app.route('/stats')
+def stats():
+    """
+    Returns cache counters (hits, misses, evictions, size), job queue usage,
+    Whisper batching, acoustic feature cache, text result cache and document counters as JSON.
+    """
+    return jsonify({
+        "tts_cache": tts_cache.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "whisper_batches": analyzer.transcriber.stats(),
+        "whisper_fast_batches": analyzer.fast_transcriber.stats() if analyzer.fast_transcriber else None,
+        "feature_cache": analyzer.features.stats(),
+        "result_cache": result_cache.stats() if result_cache else None,
+        "documents": documents.stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
     """
-    Serves static files (CSS, JS, images) with debugging information.
+    Returns the latency histogram of each analysis stage in the Prometheus text format.
     """
-    static_path = os.path.join(app.static_folder, filename)
-    print(f"Serving file: {static_path}, Exists: {os.path.exists(static_path)}")
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
-    if os.path.exists(static_path):
-        return send_file(static_path)
-    return FRENCH_INTERFACE["file_not_found"], 404
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    """
+    Loads analyzer models ahead of the first request that needs them.
+
+    Expected JSON data (optional):
+    - components: list of components among 'grammar', 'whisper', 'whisper_fast', 'classifier',
+      'feedback', 'lexicon' (defaults to all of them except 'feedback', which no route uses)
+
+    Returns JSON with the seconds spent loading each component.
+    """
+    data = request.get_json(silent=True) or {}
+    components = data.get('components', [c for c in COMPONENTS if c != 'feedback'])
+
+    try:
+        timings = analyzer.warmup(components)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "loaded": timings,
+        "ready": {component: analyzer.is_loaded(component) for component in COMPONENTS}
+    })
+
+@app.before_request
+def start_audio_sweeper():
+    # Started by the first request of each process: threads do not survive the workers' fork()
+    tts_cache.start_sweeper(app.config['TTS_CACHE_SWEEP_INTERVAL'])
+
+@app.endpoint('static')
+def serve_static(filename):
+    """
+    Serves static files (CSS, JS, images, synthesized audio). Responses carry an ETag and
+    Last-Modified, so replaying a file is answered with 304, and honor Range requests for
+    seeking in audio. Synthesized audio is named after its content and never changes, so
+    browsers keep it without revalidating.
+    """
+    directory, name = os.path.split(filename)
+    immutable = directory == 'audio' and is_cache_file(name)
+    try:
+        response = send_from_directory(app.static_folder, filename, max_age=AUDIO_MAX_AGE if immutable else None)
+    except NotFound:
+        return FRENCH_INTERFACE["file_not_found"], 404
+    if immutable:
+        response.cache_control.immutable = True
+    return response
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nuansa French tutor web app")
+    parser.add_argument('--preload', default='',
+                        help=f"Comma-separated components to load at startup ({', '.join(COMPONENTS)}, or 'all')")
+    args = parser.parse_args()
+
+    if args.preload:
+        components = COMPONENTS if args.preload == 'all' else [c.strip() for c in args.preload.split(',') if c.strip()]
+        try:
+            print(f"Preloaded components: {analyzer.warmup(components)}")
+        except ValueError as e:
+            parser.error(str(e))
+
     app.run(debug=True, host="0.0.0.0", port=5001)
@@ -0,0 +1,315 @@
+"""
+Production entry point: load the models once, then fork worker processes.
+
+The parent process imports the app, loads the models (Whisper, the accent
+classifier, the feedback generator, the lexicon index) and freezes the garbage
+collector, then forks the workers. The workers share the model weights copy-on-write, so
+adding a worker adds request capacity without another copy of the models.
+Every worker serves the same listening socket with a bounded pool of request
+threads, and its Whisper decoding thread can be pinned to a separate set of
+cores (--whisper-cpus).
+
+Background jobs, live recording sessions and edited documents live in the
+worker that created them. Their ids start with the worker's index, and a
+request that reaches another worker is forwarded to the owner over a private
+Unix socket.
+
+LanguageTool runs as Java servers outside the parent, so every worker starts
+its own; the per-worker pool defaults to a single server (--languagetool-servers).
+
+Whole static files (synthesized audio above all) are sent with sendfile():
+the kernel copies them from the page cache to the socket, without reading
+them into Python.
+
+Usage, from nuansa-french-tutor/:
+    python -m app.serve --workers 4 --threads 8 --whisper-cpus 0-3
+"""
+
+import argparse
+import gc
+import http.client
+import logging
+import os
+import re
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.wsgi import FileWrapper
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+logger = logging.getLogger("app.serve")
+
+# Components loaded in the parent and shared by the workers. LanguageTool runs
+# as separate Java servers, so each worker starts its own pool when needed.
+DEFAULT_PRELOAD = "whisper,whisper_fast,classifier,feedback,lexicon"
+
+# LanguageTool servers per worker: a Java server costs hundreds of megabytes, and one per
+# worker already gives as many servers as workers
+DEFAULT_LANGUAGETOOL_SERVERS = 1
+
+# Job, live session and document URLs whose id names the worker that owns them
+_OWNED_PATH = re.compile(r"^/(?:jobs|stream|documents)/w(\d+)-")
+
+# Request headers that describe the body and are forwarded as they are
+_FORWARDED_HEADERS = ("CONTENT_TYPE", "CONTENT_LENGTH")
+
+
+class SendfileWrapper(FileWrapper):
+    """
+    wsgi.file_wrapper whose file can be sent with sendfile(). Iterating it still reads
+    the file in blocks, as range responses do.
+    """
+
+    def send(self, sock):
+        """
+        Response body writing the rest of the file to sock with sendfile().
+        """
+        try:
+            # The empty first chunk makes the server send the status line and headers
+            yield b""
+            sock.sendfile(self.file, self.file.tell())
+        finally:
+            self.close()
+
+
+class Sendfile:
+    """
+    WSGI middleware sending whole-file responses with sendfile().
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        sock = environ.get("werkzeug.socket")
+        if sock is None:
+            return self.app(environ, start_response)
+        environ["wsgi.file_wrapper"] = SendfileWrapper
+        response = self.app(environ, start_response)
+        # Range responses wrap the file in a reader of the requested bytes
+        if isinstance(response, SendfileWrapper):
+            return response.send(sock)
+        return response
+
+
+def make_server(host, port, app, threads, fd=None):
+    """
+    A werkzeug WSGI server that handles requests on a fixed pool of threads.
+    """
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        multithread = True
+
+        def __init__(self):
+            super().__init__(host, port, app, fd=fd)
+            self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="request")
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process_request_thread, request, client_address)
+
+        def _process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    return PooledWSGIServer()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=300):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class OwnerRouting:
+    """
+    WSGI middleware forwarding job, session and document requests to the worker that owns them.
+    """
+
+    def __init__(self, app, index, socket_path):
+        self.app = app
+        self.index = index
+        self.socket_path = socket_path
+
+    def __call__(self, environ, start_response):
+        match = _OWNED_PATH.match(environ.get("PATH_INFO", ""))
+        if not match or int(match.group(1)) == self.index:
+            return self.app(environ, start_response)
+        return self.forward(int(match.group(1)), environ, start_response)
+
+    def forward(self, owner, environ, start_response):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else None
+        headers = {name.replace("_", "-").title(): environ[name] for name in _FORWARDED_HEADERS if environ.get(name)}
+        path = environ["PATH_INFO"] + ("?" + environ["QUERY_STRING"] if environ.get("QUERY_STRING") else "")
+
+        connection = _UnixHTTPConnection(self.socket_path(owner))
+        try:
+            connection.request(environ["REQUEST_METHOD"], path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except OSError as e:
+            logger.warning("Worker %d unreachable: %s", owner, e)
+            start_response("404 NOT FOUND", [("Content-Type", "application/json")])
+            return [b'{"error": "Session ou t\\u00e2che inconnue ou expir\\u00e9e"}']
+        finally:
+            connection.close()
+
+        excluded = ("connection", "transfer-encoding", "keep-alive")
+        start_response(f"{response.status} {response.reason}",
+                       [(name, value) for name, value in response.getheaders() if name.lower() not in excluded])
+        return [data]
+
+
+def cpu_pools(whisper_cpus):
+    """
+    Split the CPUs this process may use into (request CPUs, Whisper CPUs).
+    """
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    whisper = [cpu for cpu in whisper_cpus if cpu in available]
+    requests = [cpu for cpu in available if cpu not in whisper] or available
+    return requests, whisper
+
+
+def run_worker(index, main, listener, args, socket_path):
+    """
+    Body of a forked worker: serve the shared socket until SIGTERM.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    request_cpus, whisper_cpus = cpu_pools(main.app.config['WHISPER_CPUS'])
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, request_cpus)
+    if "torch" in sys.modules and not whisper_cpus:
+        # Without a dedicated pool, split the cores between the workers' Whisper threads
+        sys.modules["torch"].set_num_threads(max(1, len(request_cpus) // args.workers))
+
+    # Ids of jobs, live sessions and documents tell which worker owns them
+    main.analysis_jobs.id_prefix = main.streams.id_prefix = main.documents.id_prefix = f"w{index}-"
+    app = OwnerRouting(Sendfile(main.app), index, socket_path)
+
+    # Private socket on which the other workers forward requests for our jobs, sessions and documents
+    private_path = socket_path(index)
+    if os.path.exists(private_path):
+        os.unlink(private_path)
+    private = make_server(f"unix://{private_path}", 0, main.app, args.threads)
+    threading.Thread(target=private.serve_forever, name="forwarded", daemon=True).start()
+
+    server = make_server(args.host, args.port, app, args.threads, fd=listener.fileno())
+    logger.info("Worker %d (pid %d) serving with %d threads", index, os.getpid(), args.threads)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Nuansa French tutor with preforked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per worker")
+    parser.add_argument("--preload", default=DEFAULT_PRELOAD,
+                        help=f"Comma-separated components loaded before forking, or 'all' (default: {DEFAULT_PRELOAD})")
+    parser.add_argument("--whisper-cpus", help="CPUs reserved for Whisper decoding, e.g. 0-3 (sets NUANSA_WHISPER_CPUS)")
+    parser.add_argument("--languagetool-servers", type=int,
+                        default=int(os.environ.get("NUANSA_LANGUAGETOOL_POOL_SIZE", DEFAULT_LANGUAGETOOL_SERVERS)),
+                        help="LanguageTool servers started by each worker (sets NUANSA_LANGUAGETOOL_POOL_SIZE, "
+                             f"default {DEFAULT_LANGUAGETOOL_SERVERS})")
+    args = parser.parse_args()
+
+    if args.whisper_cpus is not None:
+        os.environ["NUANSA_WHISPER_CPUS"] = args.whisper_cpus
+    os.environ["NUANSA_LANGUAGETOOL_POOL_SIZE"] = str(args.languagetool_servers)
+
+    from app import main as app_main
+
+    # Keep torch from starting its thread pool in the parent: pools do not survive fork()
+    components = app_main.COMPONENTS if args.preload == "all" else [c.strip() for c in args.preload.split(",") if c.strip()]
+    if {"whisper", "whisper_fast", "feedback"} & set(components):
+        try:
+            import torch
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+    try:
+        logger.info("Preloaded components: %s", app_main.analyzer.warmup(components))
+    except ValueError as e:
+        parser.error(str(e))
+
+    listener = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(128)
+
+    socket_dir = tempfile.mkdtemp(prefix="nuansa-workers-")
+
+    def socket_path(index):
+        return os.path.join(socket_dir, f"worker-{index}.sock")
+
+    # Objects created so far (the models above all) are never collected: the
+    # collector would otherwise touch their pages and un-share them in every worker
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, app_main, listener, args, socket_path)
+            finally:
+                os._exit(0)
+        workers[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.workers):
+        spawn(index)
+    logger.info("Listening on http://%s:%d with %d workers", args.host, args.port, args.workers)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is not None and not stopping:
+            logger.warning("Worker %d (pid %d) exited with status %d, restarting it", index, pid, status)
+            time.sleep(1)
+            spawn(index)
+
+    listener.close()
+    for index in range(args.workers):
+        if os.path.exists(socket_path(index)):
+            os.unlink(socket_path(index))
+    os.rmdir(socket_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Benchmarks of the analysis pipeline.
+
+Runs the text analysis, the corrections, the speech analysis and the Flask
+routes over a fixed corpus of short and long texts and synthetic audio clips,
+and reports p50/p95/p99 latency, throughput and peak RSS per scenario.
+Text-to-speech uses the offline stub backend and LanguageTool is off unless
+--language-tool is given, so a run needs no network. Scenarios whose
+dependencies are missing (e.g. Whisper) are reported as skipped.
+
+Usage, from nuansa-french-tutor/:
+    python -m benchmarks.bench --output bench.json
+    python -m benchmarks.bench --compare bench.json   # exit code 1 on regressions
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SAMPLE_RATE = 16000
+
+# Latency percentiles reported for every scenario
+PERCENTILES = (50, 95, 99)
+
+# A scenario is flagged when a compared metric is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.2
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+SHORT_TEXTS = [
+    "Je vais à le marché.",
+    "Je suis aller chez mon mère.",
+    "Elle mange un pomme.",
+    "Je mange à école.",
+    "Il est une belle fille.",
+    "Nous sommes allé au cinéma hier soir avec mes amis.",
+    "Je suis content de te voir.",
+    "Ils a parlé de le livre à le professeur.",
+]
+
+# About 1,500 characters: a paragraph of homework
+LONG_TEXT = " ".join(SHORT_TEXTS * 6)
+
+
+def synthetic_clip(seconds, seed=0):
+    """
+    A voiced-like test signal: a harmonic tone with a syllable-rate envelope and noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    clip = 0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def wav_bytes(clip):
+    """
+    Encode float32 samples as a 16-bit mono .wav file.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(clip, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies, wall_seconds):
+    """
+    Summarize per-call latencies (seconds) measured over wall_seconds.
+    """
+    ms = np.asarray(latencies) * 1000
+    summary = {"iterations": len(ms), "mean_ms": round(float(ms.mean()), 3)}
+    for percentile, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        summary[f"p{percentile}_ms"] = round(float(value), 3)
+    summary["max_ms"] = round(float(ms.max()), 3)
+    summary["throughput_per_s"] = round(len(ms) / wall_seconds, 2) if wall_seconds > 0 else None
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+
+def measure(func, inputs, iterations, warmup):
+    """
+    Call func on the inputs in turn: warmup untimed calls, then iterations timed ones.
+    """
+    for index in range(warmup):
+        func(inputs[index % len(inputs)])
+
+    latencies = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        call_started = time.perf_counter()
+        func(inputs[index % len(inputs)])
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_scenario(func, inputs, iterations, warmup):
+    """
+    measure() a scenario. Only a missing optional dependency skips it ({"skipped": cause}):
+    any other error is a failure ({"failed": cause}), which compare() reports.
+    """
+    try:
+        return measure(func, inputs, iterations, warmup)
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    except Exception as e:
+        return {"failed": f"{type(e).__name__}: {e}"}
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, metrics=COMPARED_METRICS):
+    """
+    Return the scenarios slower than the baseline by more than threshold (0.2 = 20%),
+    and every scenario that failed (metric "failed", with its error).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if "failed" in result:
+            regressions.append({"scenario": name, "metric": "failed", "error": result["failed"]})
+            continue
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "skipped" in result or "skipped" in previous or "failed" in previous:
+            continue
+        for metric in metrics:
+            if previous.get(metric) and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append({
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                    "change": round(result[metric] / previous[metric] - 1, 3)
+                })
+    return regressions
+
+
+def build_scenarios(app_module, gender="masculine"):
+    """
+    Return (name, function, inputs) for every benchmark, given the loaded app module.
+    """
+    analyzer = app_module.analyzer
+    client = app_module.app.test_client()
+    short_clips = [synthetic_clip(3, seed) for seed in range(4)]
+    long_clips = [synthetic_clip(20, seed) for seed in range(2)]
+
+    def post_json(route):
+        def call(body):
+            response = client.post(route, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} answered {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    def post_audio(data):
+        response = client.post("/analyze_audio", data={"audio": (io.BytesIO(data), "clip.wav"), "gender": gender},
+                               content_type="multipart/form-data")
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze_audio answered {response.status_code}")
+
+    return [
+        ("analyze_text.short", lambda text: analyzer.analyze_text(text, speaker_gender=gender), SHORT_TEXTS),
+        ("analyze_text.long", lambda text: analyzer.analyze_text(text, speaker_gender=gender), [LONG_TEXT]),
+        ("analyze_texts.batch32", lambda texts: analyzer.analyze_texts(texts, speaker_gender=gender),
+         [SHORT_TEXTS * 4]),
+        ("apply_corrections.short", lambda text: analyzer.apply_corrections(text, [], speaker_gender=gender),
+         SHORT_TEXTS),
+        ("apply_corrections.long", lambda text: analyzer.apply_corrections(text, [], speaker_gender=gender),
+         [LONG_TEXT]),
+        ("analyze_speech.3s", lambda clip: analyzer.analyze_speech(clip, speaker_gender=gender), short_clips),
+        ("analyze_speech.20s", lambda clip: analyzer.analyze_speech(clip, speaker_gender=gender), long_clips),
+        ("route.analyze_text", post_json("/analyze_text"),
+         [{"text": text, "gender": gender} for text in SHORT_TEXTS]),
+        ("route.analyze_text_batch", post_json("/analyze_text/batch"),
+         [{"texts": SHORT_TEXTS * 4, "gender": gender}]),
+        ("route.tts", post_json("/tts"), [{"text": text, "lang": "fr"} for text in SHORT_TEXTS]),
+        ("route.analyze_audio", post_audio, [wav_bytes(clip) for clip in short_clips]),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_app(language_tool, cache_dir):
+    """
+    Import the Flask app configured for offline benchmarking. The result cache is
+    off: scenarios replay the same inputs, which would otherwise only measure cache hits.
+    """
+    os.environ.setdefault("NUANSA_LOG_LEVEL", "WARNING")
+    os.environ["NUANSA_TTS_BACKENDS"] = "stub"
+    os.environ["NUANSA_RESULT_CACHE_SIZE"] = "0"
+    os.environ["NUANSA_RESULT_CACHE_DB"] = ""
+    os.environ["NUANSA_LANGUAGETOOL_POOL_SIZE"] = os.environ.get("NUANSA_LANGUAGETOOL_POOL_SIZE", "2") if language_tool else "0"
+
+    from app import main
+    from src.tts_cache import AudioCache
+
+    # Keep synthesized audio out of the app's static folder
+    main.tts_service.cache = AudioCache(cache_dir)
+    # Let route errors propagate, so a scenario is skipped or fails with the actual cause
+    main.app.testing = True
+    return main
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app_module = load_app(args.language_tool, cache_dir)
+
+        results = {}
+        for name, func, inputs in build_scenarios(app_module):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            results[name] = run_scenario(func, inputs, args.iterations, args.warmup)
+            print(format_result(name, results[name]), file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "language_tool": args.language_tool
+        },
+        "results": results
+    }
+
+
+def format_result(name, result):
+    if "skipped" in result:
+        return f"{name:28s} skipped ({result['skipped']})"
+    if "failed" in result:
+        return f"{name:28s} FAILED ({result['failed']})"
+    return (f"{name:28s} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+            f"p99 {result['p99_ms']:9.2f} ms  {result['throughput_per_s']:8.2f}/s  rss {result['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Nuansa analysis pipeline")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per scenario")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls per scenario (model loading, caches)")
+    parser.add_argument("--only", nargs="*", help="Run only the scenarios starting with these prefixes")
+    parser.add_argument("--language-tool", action="store_true", help="Include LanguageTool (needs Java)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Flag regressions against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+        for regression in report["regressions"]:
+            if "error" in regression:
+                print(f"FAILED {regression['scenario']}: {regression['error']}", file=sys.stderr)
+                continue
+            print(f"REGRESSION {regression['scenario']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']} ms (+{regression['change']:.0%})",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
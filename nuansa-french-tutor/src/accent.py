@@ -0,0 +1,198 @@
+"""
+Accent classification of speech features, with optional SHAP explanations.
+
+Clips are classified as a batch: their feature vectors are stacked into one
+matrix and predicted in a single call. The SHAP explainer is built once, when
+the model is loaded, over a small fixed background summary, so explaining a
+prediction only costs the explainer's evaluation and not its construction.
+"""
+
+import logging
+import os
+import pickle
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Background rows kept for explainers that need reference data (k-means summary)
+DEFAULT_BACKGROUND_SIZE = 10
+
+# Model evaluations per explained clip for the model-agnostic (kernel) explainer
+KERNEL_NSAMPLES = 100
+
+
+def load_background(model_path):
+    """
+    Load the background features saved next to the model as <name>_background.npy, if any.
+    """
+    path = os.path.splitext(model_path)[0] + "_background.npy"
+    return np.load(path) if os.path.exists(path) else None
+
+
+def is_tree_model(model):
+    """
+    True for the tree models SHAP's TreeExplainer supports: scikit-learn trees and
+    tree ensembles, XGBoost and LightGBM models.
+    """
+    if hasattr(model, "tree_") or hasattr(model, "get_booster") or hasattr(model, "booster_"):
+        return True
+    estimators = getattr(model, "estimators_", None)
+    return estimators is not None and len(estimators) > 0 and \
+        all(hasattr(estimator, "tree_") for estimator in np.ravel(estimators))
+
+
+def decision_scores(model):
+    """
+    model.decision_function with one column per class. Binary models (e.g. an SVC
+    trained without probability estimates) return a single score for classes_[1],
+    which becomes the pair (-score, score).
+    """
+    def scores(features):
+        values = np.asarray(model.decision_function(features), dtype=float)
+        return np.column_stack([-values, values]) if values.ndim == 1 else values
+    return scores
+
+
+def build_explainer(model, background=None, background_size=DEFAULT_BACKGROUND_SIZE):
+    """
+    Build the fastest SHAP explainer that fits the model.
+    Tree models get an exact TreeExplainer, linear models a LinearExplainer, and
+    anything else a KernelExplainer over a k-means summary of the background,
+    explaining predict_proba or, without it, decision_function (class labels
+    cannot be explained). Except for trees, background must hold real feature
+    rows: an arbitrary reference such as all-zero features would make the
+    contributions meaningless. Raises ValueError when the model cannot be explained.
+    Returns (explainer, kind).
+    """
+    if is_tree_model(model):
+        import shap
+        return shap.TreeExplainer(model), "tree"
+
+    if background is None or not len(background):
+        raise ValueError("SHAP explanations of this model need background feature rows "
+                         "(a \"background\" entry in the pickle or a _background.npy file)")
+    background = np.atleast_2d(np.asarray(background, dtype=float))[:, :model.n_features_in_]
+
+    if hasattr(model, "coef_"):
+        import shap
+        return shap.LinearExplainer(model, background), "linear"
+
+    if hasattr(model, "predict_proba"):
+        predict = model.predict_proba
+    elif hasattr(model, "decision_function"):
+        predict = decision_scores(model)
+    else:
+        raise ValueError(f"cannot explain a {type(model).__name__} without predict_proba or decision_function")
+
+    import shap
+    if len(background) > background_size:
+        background = shap.kmeans(background, background_size)
+    return shap.KernelExplainer(predict, background), "kernel"
+
+
+def select_class_values(values, class_indices):
+    """
+    Reduce SHAP output to one contribution vector per clip, for its predicted class.
+    values is what explainer.shap_values returned: a list with one (clips, features)
+    array per class, a (clips, features, classes) array, or a (clips, features)
+    array when the explainer has a single output.
+    """
+    if isinstance(values, list):
+        values = np.stack(values, axis=-1)
+    values = np.asarray(values)
+    if values.ndim == 2:
+        return values
+    return values[np.arange(len(values)), :, class_indices]
+
+
+class AccentClassifier:
+    """
+    Wraps a scikit-learn style accent model (predict, optionally predict_proba/classes_).
+    explainer, when given, is a prebuilt SHAP explainer of kind "tree", "linear" or "kernel".
+    """
+
+    def __init__(self, model, explainer=None, explainer_kind=None):
+        self.model = model
+        self.explainer = explainer
+        self.explainer_kind = explainer_kind
+
+    @classmethod
+    def load(cls, path, explain=False, background_size=DEFAULT_BACKGROUND_SIZE):
+        """
+        Load a pickled model. Returns None when the file does not exist.
+        The pickle holds either the model itself or a dict with "model" and
+        "background" (feature rows used as the explainer's reference data).
+        With explain=True the SHAP explainer is built now, once; when it cannot be
+        built, the failure is logged and the classifier loads without explanations.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+
+        background = None
+        if isinstance(model, dict):
+            model, background = model["model"], model.get("background")
+        if background is None:
+            background = load_background(path)
+
+        if not explain:
+            return cls(model)
+        # Explanations are optional: a model that cannot be explained still classifies
+        try:
+            explainer, kind = build_explainer(model, background, background_size)
+        except Exception as e:
+            logger.warning("Accent explanations disabled, no SHAP explainer for the classifier: %s", e)
+            return cls(model)
+        logger.info("Built %s SHAP explainer for the accent classifier", kind)
+        return cls(model, explainer, kind)
+
+    @property
+    def explains(self):
+        return self.explainer is not None
+
+    def prepare(self, features):
+        """
+        Stack features into a (clips, features) matrix of the width the model was trained on.
+        Feature vectors start with the 13 MFCC means, so a model trained on those
+        alone gets the first columns of the richer vectors.
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        width = getattr(self.model, "n_features_in_", None)
+        if width is not None and features.shape[1] > width:
+            features = features[:, :width]
+        return features
+
+    def predict(self, features):
+        """
+        Predict the accent of every row of a (clips, features) matrix in one call.
+        """
+        return self.model.predict(self.prepare(features))
+
+    def explain(self, features, labels):
+        """
+        Return the SHAP contributions of each feature towards each clip's predicted label.
+        """
+        features = self.prepare(features)
+        if self.explainer_kind == "kernel":
+            values = self.explainer.shap_values(features, nsamples=KERNEL_NSAMPLES, silent=True)
+        else:
+            values = self.explainer.shap_values(features)
+
+        classes = list(getattr(self.model, "classes_", []))
+        class_indices = [classes.index(label) if label in classes else 0 for label in labels]
+        return select_class_values(values, class_indices)
+
+    def classify(self, features, explain=True):
+        """
+        Classify a batch of clips. Returns one dict per row with "accent" and
+        "shap_values" (a list of floats, or None when explanations are off).
+        """
+        features = self.prepare(features)
+        labels = self.predict(features).tolist()
+
+        explanations = [None] * len(labels)
+        if explain and self.explains:
+            explanations = [row.tolist() for row in self.explain(features, labels)]
+
+        return [{"accent": label, "shap_values": values} for label, values in zip(labels, explanations)]
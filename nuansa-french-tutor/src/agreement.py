@@ -0,0 +1,224 @@
+"""
+Gender and number agreement checks backed by the inflection lexicon.
+
+Two agreements are checked for any word the lexicon knows:
+
+- determiner and noun ("un pomme" → "une pomme", "les chat" → "les chats"):
+  the noun's gender decides the determiner, and the determiner, which is
+  what can be heard, decides the number of the noun. A noun that has a form
+  of the determiner's gender sounding the same (ami/amie) takes that form
+  instead of changing the determiner.
+- subject, être and adjective or past participle ("elles sont venu" →
+  "venues", "je suis né" → "née" for a female speaker).
+
+Hits have the format of the rule engine's (see src.rules.RuleEngine.scan).
+"""
+
+import re
+
+from src.inflections import ADJECTIVE, GENDERS, PARTICIPLE, SLOTS, VERB
+from src.phonetics import phonetic_key
+
+# Forms of each family of determiners, in slot order (ms, fs, mp, fp)
+DETERMINERS = {
+    "indefinite": ("un", "une", "des", "des"),
+    "definite": ("le", "la", "les", "les"),
+    "mon": ("mon", "ma", "mes", "mes"),
+    "ton": ("ton", "ta", "tes", "tes"),
+    "son": ("son", "sa", "ses", "ses"),
+    "ce": ("ce", "cette", "ces", "ces"),
+    "notre": ("notre", "notre", "nos", "nos"),
+    "votre": ("votre", "votre", "vos", "vos"),
+    "leur": ("leur", "leur", "leurs", "leurs"),
+}
+
+# Families whose determiners are also object pronouns before a verb ("je la porte")
+_PRONOUN_FAMILIES = ("definite", "leur")
+
+# Families whose singular form depends on the next word starting with a vowel (cet ami, mon amie)
+_VOWEL_FAMILIES = ("ce", "mon", "ton", "son")
+
+# {determiner: (family, gender, number)}, gender None when the determiner serves both
+_DETERMINER_INFO = {"cet": ("ce", "m", "s")}
+for _family, _forms in DETERMINERS.items():
+    for (_gender, _number), _slot in SLOTS.items():
+        _known = _DETERMINER_INFO.get(_forms[_slot])
+        _DETERMINER_INFO[_forms[_slot]] = (_family, None if _known and _known[1] != _gender else _gender, _number)
+
+# Subjects of être: (gender, number), gender "speaker" for je and None when the subject does not tell
+SUBJECTS = {"je": ("speaker", "s"), "tu": (None, "s"), "il": ("m", "s"), "elle": ("f", "s"),
+            "nous": (None, "p"), "ils": ("m", "p"), "elles": ("f", "p")}
+
+_ETRE = ("suis", "es", "est", "sommes", "êtes", "sont", "étais", "était", "étions", "étiez", "étaient",
+         "serai", "seras", "sera", "serons", "serez", "seront",
+         "serais", "serait", "serions", "seriez", "seraient")
+
+# Adverbs allowed between être and the adjective ("je ne suis pas prête")
+_ADVERBS = ("pas", "plus", "jamais", "très", "trop", "si", "bien", "vraiment", "aussi", "déjà", "toujours",
+            "tellement", "assez")
+
+_WORD = r"[^\W\d_]+(?:-[^\W\d_]+)*"
+_VOWELS = "aeiouyàâéèêëîïôûùüœ"
+
+_DETERMINER_NOUN = re.compile(rf"\b({'|'.join(sorted(_DETERMINER_INFO, key=len, reverse=True))})\s+({_WORD})\b",
+                              flags=re.IGNORECASE)
+_SUBJECT_ETRE = re.compile(
+    rf"\b({'|'.join(SUBJECTS)})\s+(?:ne\s+|n['’]\s*)?(?:{'|'.join(_ETRE)})\s+"
+    rf"(?:(?:{'|'.join(_ADVERBS)})\s+)*({_WORD})\b", flags=re.IGNORECASE)
+
+_GENDER_NAMES = {"m": "masculin", "f": "féminin"}
+_NUMBER_NAMES = {"s": "singulier", "p": "pluriel"}
+
+
+def _same_case(word, model):
+    """
+    word capitalized like model.
+    """
+    return word[:1].upper() + word[1:] if model[:1].isupper() else word
+
+
+def _readings_of(forms, word):
+    """
+    Genders in which word is one of forms ({(gender, number): form}).
+    """
+    return [gender for gender in GENDERS if any(forms.get((gender, number)) == word for number in ("s", "p"))]
+
+
+class AgreementChecker:
+    """
+    Finds agreement errors in a text with lookups in an InflectionLexicon.
+    """
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+
+    def scan(self, text, speaker_gender="m"):
+        """
+        Return the agreement hits of text, sorted by position. speaker_gender ("m" or "f")
+        is the gender agreeing with je.
+        """
+        hits = []
+        for match in _DETERMINER_NOUN.finditer(text):
+            hit = self._check_determiner(match)
+            if hit:
+                hits.append(hit)
+        for match in _SUBJECT_ETRE.finditer(text):
+            hit = self._check_etre(match, speaker_gender)
+            if hit:
+                hits.append(hit)
+        return sorted(hits, key=lambda hit: hit["start"])
+
+    def _check_determiner(self, match):
+        determiner, word = match.group(1), match.group(2)
+        # Capitalized words are taken for proper nouns
+        if word != word.lower():
+            return None
+        family, det_gender, number = _DETERMINER_INFO[determiner.lower()]
+        inflection = self.lexicon.lookup(word)
+        if not inflection or not inflection.noun:
+            return None
+        if family in _PRONOUN_FAMILIES and inflection.flags & VERB:
+            return None
+
+        if number == "s" and word[0] == "h":
+            # Mute or aspirated h (l'homme, le héros): the lexicon does not tell
+            if family in _VOWEL_FAMILIES or family == "definite":
+                return None
+        elif number == "s" and word[0] in _VOWELS:
+            if family == "definite":
+                # Elided to l': not a matter of gender
+                return None
+            if family in _VOWEL_FAMILIES and family != "ce":
+                # mon amie as well as mon ami
+                det_gender = None
+
+        # Agreeing already: the word reads as a noun of the determiner's gender and number,
+        # and the determiner fits the sound it starts with
+        for gender in (det_gender,) if det_gender else GENDERS:
+            if (gender, number) in inflection.noun_readings and \
+                    self._determiner(family, gender, number, word) == determiner.lower():
+                return None
+
+        forms = inflection.noun
+        if det_gender and (det_gender, number) in forms and \
+                phonetic_key(forms[(det_gender, number)]) == phonetic_key(word):
+            gender = det_gender
+        else:
+            gender = next((gender for gender in _readings_of(forms, word) if (gender, number) in forms), None)
+        if gender is None:
+            return None
+
+        noun = forms[(gender, number)]
+        expected_det = self._determiner(family, gender, number, noun)
+        if (expected_det, noun) == (determiner.lower(), word):
+            return None
+
+        messages = []
+        if expected_det != determiner.lower():
+            if det_gender and gender != det_gender:
+                messages.append(f"Accord de genre : '{noun}' est {_GENDER_NAMES[gender]}, utiliser '{expected_det}'.")
+            else:
+                messages.append(f"Utiliser '{expected_det}' et non '{determiner.lower()}' devant '{noun}'.")
+        if noun != word:
+            if not any(reading_number == number for _, reading_number in inflection.noun_readings):
+                messages.append(f"Accord au {_NUMBER_NAMES[number]} : '{word}' doit devenir '{noun}' "
+                                f"avec '{expected_det}'.")
+            else:
+                messages.append(f"Accord de genre : utiliser '{noun}' avec '{expected_det}'.")
+
+        replacement = f"{_same_case(expected_det, determiner)} {noun}"
+        return self._hit("accord_determinant", match.start(), match.end(), match.group(), replacement, " ".join(messages))
+
+    @staticmethod
+    def _determiner(family, gender, number, word):
+        """
+        Determiner of family for a noun of that gender and number starting like word.
+        """
+        if number == "s" and word[0] in _VOWELS:
+            if family == "ce" and gender == "m":
+                return "cet"
+            if family in _VOWEL_FAMILIES and family != "ce":
+                return family
+        return DETERMINERS[family][SLOTS[(gender, number)]]
+
+    def _check_etre(self, match, speaker_gender):
+        subject, word = match.group(1), match.group(2)
+        if word != word.lower():
+            return None
+        gender, number = SUBJECTS[subject.lower()]
+        if gender == "speaker":
+            gender = speaker_gender
+        inflection = self.lexicon.lookup(word)
+        if not inflection or not inflection.adjective:
+            return None
+
+        wanted = {(g, number) for g in ((gender,) if gender else GENDERS)}
+        if wanted & inflection.adjective_readings:
+            return None
+        forms = inflection.adjective
+        if not gender:
+            gender = next((g for g in _readings_of(forms, word) if (g, number) in forms), None)
+        expected = forms.get((gender, number))
+        if not expected or expected == word:
+            return None
+
+        kind = "du participe passé" if inflection.flags & PARTICIPLE and not inflection.flags & ADJECTIVE else "de l'adjectif"
+        if subject.lower() == "je":
+            who = "pour une locutrice" if gender == "f" else "pour un locuteur"
+        else:
+            who = f"avec '{subject.lower()}'"
+        return self._hit("accord_etre", match.start(2), match.end(2), word, expected,
+                         f"Accord {kind} avec être : utiliser '{expected}' {who}.")
+
+    @staticmethod
+    def _hit(rule_id, start, end, error, replacement, message):
+        return {
+            "rule_id": rule_id,
+            "source": "rules",
+            "start": start,
+            "end": end,
+            "error": error,
+            "replacement": replacement,
+            "suggestions": [replacement],
+            "message": message
+        }
@@ -1,127 +1,230 @@
-import language_tool_python
-import whisper
-import torch
-import librosa
-import numpy as np
-from transformers import pipeline
+import logging
 import os
-from sklearn.svm import SVC
-import pickle
-import shap
 import re
-import uuid
+import shutil
+import threading
 import time
-from gtts import gTTS
+from src.rules import RuleEngine, merge_hits, normalize_gender
+from src.grammar_pool import LanguageToolPool, matches_to_hits
+from src.tts import TTSService, create_backends
+from src.tts_cache import AudioCache
+from src.audio import SAMPLE_RATE, decode_audio
+from src.accent import AccentClassifier
+from src.features import FeatureExtractor, DEFAULT_CACHE_ENTRIES
+from src.metrics import timed
+from src.phonetics import PhoneticLexicon, DEFAULT_LEXICON_PATH
+from src.inflections import DEFAULT_INFLECTIONS_PATH
+from src.pronunciation import PronunciationScorer, DEFAULT_CPU_BUDGET, DEFAULT_WALL_BUDGET
+from src.result_cache import make_key as result_key
+from src.segment import split_sentences
+from src.transcription import BatchingTranscriber, DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH
+from src.whisper_models import ModelPolicy, load_whisper_model, model_label
+
+logger = logging.getLogger(__name__)
+
+# Models that can be loaded ahead of time with FrenchAnalyzer.warmup()
+COMPONENTS = ("grammar", "whisper", "whisper_fast", "classifier", "feedback", "lexicon")
+
+# Marks a component that has not been loaded yet (the classifier may legitimately load as None)
+_NOT_LOADED = object()
+
+# Pickled accent model (optional: accent is reported as Unknown without it)
+ACCENT_MODEL_PATH = "src/accent_classifier.pkl"
+
+# Feedback audio cache of the default TTS service: the folder the app serves under /static/audio/
+DEFAULT_AUDIO_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    "app", "static", "audio")
 
 class FrenchAnalyzer:
     """
     A comprehensive French language analyzer that provides grammar checking,
     speech recognition, accent classification, and audio feedback generation.
+
+    Models are loaded on first use (or ahead of time with warmup()), so
+    text-only workers never pay for Whisper or the transformers pipeline.
     """
 
-    def __init__(self):
+    def __init__(self, grammar_pool_size=1, preload=(), tts=None, audio_url="/static/audio/",
+                 whisper_batch_window=DEFAULT_BATCH_WINDOW, whisper_max_batch=DEFAULT_MAX_BATCH,
+                 whisper_cpus=None, explain_accent=False, feature_cache_size=DEFAULT_CACHE_ENTRIES,
+                 result_cache=None, whisper_model="base", whisper_fast_model=None, whisper_quantize=False,
+                 whisper_policy=None, lexicon_path=DEFAULT_LEXICON_PATH,
+                 inflections_path=DEFAULT_INFLECTIONS_PATH, score_pronunciation=False,
+                 pronunciation_budget=DEFAULT_CPU_BUDGET, pronunciation_wall_budget=DEFAULT_WALL_BUDGET):
         """
         Initialize the French analyzer with all necessary models and tools.
+        grammar_pool_size is the number of local LanguageTool servers (0 for rules-only analysis).
+        preload lists the COMPONENTS to load now instead of on first use.
+        tts is the TTSService producing feedback audio, which is served under the audio_url prefix
+        (by default, one caching in DEFAULT_AUDIO_FOLDER whatever the working directory).
+        Concurrent transcriptions are batched for up to whisper_batch_window seconds,
+        whisper_max_batch clips at a time, on the CPUs listed in whisper_cpus (all when None).
+        explain_accent builds a SHAP explainer with the accent classifier and
+        returns per-feature contributions with each accent prediction.
+        Acoustic features of the last feature_cache_size clips are kept in memory.
+        result_cache, a ResultCache, memoizes text analyses (None disables it).
+        whisper_model is the Whisper size used for accuracy and whisper_fast_model an optional
+        smaller one (e.g. "tiny") that whisper_policy, a ModelPolicy, picks for short clips and
+        under load. whisper_quantize loads both with int8-quantized linear layers, on the CPU.
+        lexicon_path is the French word list used to repair misspelled transcriptions.
+        inflections_path is the binary inflection lexicon of the agreement checks (None disables them).
+        score_pronunciation scores each spoken word against a synthesized reference, spending
+        at most pronunciation_budget CPU seconds and pronunciation_wall_budget seconds per
+        second of audio. It asks Whisper for word timestamps, so scored clips are not batched.
+        """
+        self.grammar_pool_size = grammar_pool_size
+        self.explain_accent = explain_accent
+
+        self.whisper_model_name = whisper_model
+        self.whisper_fast_model_name = whisper_fast_model or None
+        self.whisper_quantize = whisper_quantize
+        self.whisper_policy = whisper_policy or ModelPolicy()
+        self.lexicon_path = lexicon_path
+
+        # One batching queue per model: clips decoded together must go through the same model
+        self.transcriber = BatchingTranscriber(lambda: self.whisper_model, language='fr',
+                                               window=whisper_batch_window, max_batch=whisper_max_batch,
+                                               cpu_affinity=whisper_cpus)
+        self.fast_transcriber = None
+        if self.whisper_fast_model_name:
+            self.fast_transcriber = BatchingTranscriber(lambda: self.whisper_fast_model, language='fr',
+                                                        window=whisper_batch_window, max_batch=whisper_max_batch,
+                                                        cpu_affinity=whisper_cpus)
+
+        self.tts = tts or TTSService(create_backends("gtts,espeak"), AudioCache(DEFAULT_AUDIO_FOLDER))
+        self.audio_url = audio_url
+        self.pronunciation = None
+        if score_pronunciation:
+            self.pronunciation = PronunciationScorer(self.tts, cpu_budget=pronunciation_budget,
+                                                     wall_budget=pronunciation_wall_budget)
+
+        self.features = FeatureExtractor(max_entries=feature_cache_size)
+        self.result_cache = result_cache
+
+        self._models = {component: _NOT_LOADED for component in COMPONENTS}
+        self._model_locks = {component: threading.Lock() for component in COMPONENTS}
+        self._loaders = {
+            "grammar": self._load_grammar_tool,
+            "whisper": self._load_whisper_model,
+            "whisper_fast": self._load_whisper_fast_model,
+            "classifier": self._load_classifier,
+            "feedback": self._load_feedback_generator,
+            "lexicon": self._load_lexicon
+        }
+
+        # Correction rules are compiled once here and reused for every request
+        self.rule_engine = RuleEngine(inflections_path=inflections_path)
+
+        self.warmup(preload)
+
+    def _get_model(self, component):
+        """
+        Return a component, loading it on first use.
+        Double-checked locking: concurrent first requests load the model only once.
+        """
+        model = self._models[component]
+        if model is _NOT_LOADED:
+            with self._model_locks[component]:
+                model = self._models[component]
+                if model is _NOT_LOADED:
+                    started = time.time()
+                    model = self._loaders[component]()
+                    self._models[component] = model
+                    logger.info("Loaded %s in %.2fs", component, time.time() - started)
+        return model
+
+    def _load_grammar_tool(self):
+        return LanguageToolPool(size=self.grammar_pool_size, language='fr')
+
+    def _load_whisper_model(self):
+        return load_whisper_model(self.whisper_model_name, quantize=self.whisper_quantize)
+
+    def _load_whisper_fast_model(self):
+        if not self.whisper_fast_model_name:
+            return None
+        return load_whisper_model(self.whisper_fast_model_name, quantize=self.whisper_quantize)
+
+    def _load_classifier(self):
+        return AccentClassifier.load(ACCENT_MODEL_PATH, explain=self.explain_accent)
+
+    def _load_feedback_generator(self):
+        from transformers import pipeline
+        return pipeline("text-generation", model="distilgpt2")
+
+    def _load_lexicon(self):
+        # Inflected forms missing from the word list are correct words, not misspellings
+        return PhoneticLexicon.load(self.lexicon_path, known=self.rule_engine.inflections)
+
+    @property
+    def grammar_tool(self):
+        return self._get_model("grammar")
+
+    @property
+    def whisper_model(self):
+        return self._get_model("whisper")
+
+    @property
+    def whisper_fast_model(self):
+        return self._get_model("whisper_fast")
+
+    @property
+    def whisper_label(self):
+        """
+        Name of the accurate Whisper model as reported in responses.
         """
-        self.grammar_tool = language_tool_python.LanguageTool('fr')
-        self.grammar_tool.enabledCategories = 'GRAMMAR,TYPOGRAPHY,STYLE'
+        return model_label(self.whisper_model_name, self.whisper_quantize)
 
-        self.whisper_model = whisper.load_model("base")
+    @property
+    def classifier(self):
+        return self._get_model("classifier")
 
-        self.classifier = None
-        self.shap_explainer = None
+    @property
+    def feedback_generator(self):
+        return self._get_model("feedback")
 
-        if os.path.exists("src/accent_classifier.pkl"):
-            with open("src/accent_classifier.pkl", "rb") as f:
-                self.classifier = pickle.load(f)
+    @property
+    def lexicon(self):
+        return self._get_model("lexicon")
 
-        self.feedback_generator = pipeline("text-generation", model="distilgpt2")
+    def is_loaded(self, component):
+        """
+        Tell whether a component has been loaded, without loading it.
+        """
+        return self._models[component] is not _NOT_LOADED
 
-    def apply_corrections(self, text, matches, speaker_gender="masculine"):
+    def warmup(self, components=COMPONENTS):
+        """
+        Load the given components now and return the seconds each one took.
+        Components that are already loaded cost nothing.
+        """
+        unknown = [component for component in components if component not in COMPONENTS]
+        if unknown:
+            raise ValueError(f"Unknown components: {', '.join(unknown)}")
+
+        timings = {}
+        for component in components:
+            started = time.time()
+            self._get_model(component)
+            timings[component] = round(time.time() - started, 3)
+        return timings
+
+    def apply_corrections(self, text, matches, speaker_gender="masculine", hits=None):
         """
         Apply grammar corrections to French text with gender-aware adjustments.
         speaker_gender refers to the gender of the person speaking, not objects in the sentence.
+        matches are LanguageTool matches for text; their first replacement is applied
+        wherever no rule of our own already corrects the same span.
+        hits are merged hits already computed for text; they are built here when omitted.
         """
-        corrected = text.strip()
-        print(f"Initial text for correction: '{corrected}', Speaker gender: {speaker_gender}")
-
-        # Apply specific corrections based on common French errors
-
-        # 1. Handle contractions with prepositions
-        # à + le = au
-        corrected = re.sub(r'\bà\s+le\b', 'au', corrected, flags=re.IGNORECASE)
-        print(f"After 'à le -> au' correction: '{corrected}'")
-
-        # à + les = aux
-        corrected = re.sub(r'\bà\s+les\b', 'aux', corrected, flags=re.IGNORECASE)
-        print(f"After 'à les -> aux' correction: '{corrected}'")
-
-        # de + le = du
-        corrected = re.sub(r'\bde\s+le\b', 'du', corrected, flags=re.IGNORECASE)
-        print(f"After 'de le -> du' correction: '{corrected}'")
-
-        # de + les = des
-        corrected = re.sub(r'\bde\s+les\b', 'des', corrected, flags=re.IGNORECASE)
-        print(f"After 'de les -> des' correction: '{corrected}'")
-
-        # 2. Handle 'à l'école' correction (elision)
-        corrected = re.sub(r'\b[aà]\s+école\b', "à l'école", corrected, flags=re.IGNORECASE)
-        print(f"After 'à l'école' correction: '{corrected}'")
-
-        # 3. Plural noun corrections
-        corrected = re.sub(r'\bles chat\b', 'les chats', corrected, flags=re.IGNORECASE)
-        print(f"After plural noun correction: '{corrected}'")
-
-        # 4. Plural adjective agreement (chats are masculine, so "mignons")
-        corrected = re.sub(r'\bsont mignon(ne)?s?\b', 'sont mignons', corrected, flags=re.IGNORECASE)
-        print(f"After plural adjective correction: '{corrected}'")
-
-        # 5. Verb conjugation corrections
-        corrected = re.sub(r'\bnous mange\b', 'nous mangeons', corrected, flags=re.IGNORECASE)
-        print(f"After verb conjugation correction: '{corrected}'")
-
-        # 6. Preposition corrections
-        corrected = re.sub(r'\bdans la cantine\b', 'à la cantine', corrected, flags=re.IGNORECASE)
-        print(f"After preposition correction: '{corrected}'")
-
-        # 7. Noun gender corrections (determiners) - these are about the nouns themselves
-        corrected = re.sub(r'\bun pomme\b', 'une pomme', corrected, flags=re.IGNORECASE)
-        corrected = re.sub(r'\bmon mère\b', 'ma mère', corrected, flags=re.IGNORECASE)
-        corrected = re.sub(r'\bchez mon mère\b', 'chez ma mère', corrected, flags=re.IGNORECASE)
-        print(f"After noun gender corrections: '{corrected}'")
-
-        # 8. Speaker-specific corrections (only for self-reference)
-        # These corrections should only apply when the speaker is talking about themselves
-        if speaker_gender.lower() == "feminine":
-            # For feminine speakers talking about themselves
-            # "Je suis" + past participle agreements
-            if re.search(r'\bje suis\s+\w*é\b', corrected, flags=re.IGNORECASE):
-                # Make past participles agree with feminine speaker
-                corrected = re.sub(r'\bje suis ([^aeiou\s]*[^e])é\b', r'je suis \1ée', corrected, flags=re.IGNORECASE)
-                print(f"After feminine past participle agreement: '{corrected}'")
-
-            # Self-descriptive adjectives
-            corrected = re.sub(r'\bje suis ([^aeiou\s]*[^e])\b', r'je suis \1e', corrected, flags=re.IGNORECASE)
-            print(f"After feminine adjective agreement for speaker: '{corrected}'")
-
-        # 9. Fix obvious gender disagreements in sentences (semantic errors)
-        # "Il est une belle fille" -> "Elle est une belle fille" (regardless of speaker gender)
-        # This is about fixing the logic of the sentence, not the speaker's gender
-        if re.search(r'\bil est une\b.*\bfille\b', corrected, flags=re.IGNORECASE):
-            corrected = re.sub(r'\bil est une\b', 'Elle est une', corrected, flags=re.IGNORECASE)
-            print(f"After fixing semantic gender disagreement (il/fille): '{corrected}'")
-
-        if re.search(r'\belle est un\b.*\bgarçon\b', corrected, flags=re.IGNORECASE):
-            corrected = re.sub(r'\belle est un\b', 'Il est un', corrected, flags=re.IGNORECASE)
-            print(f"After fixing semantic gender disagreement (elle/garçon): '{corrected}'")
-
-        # 10. Past participle agreement with "aller" (only for speaker self-reference)
-        if re.search(r'\bje suis\s+aller?\b', corrected, flags=re.IGNORECASE):
-            if speaker_gender.lower() == "feminine":
-                corrected = re.sub(r'\bje suis aller?\b', 'je suis allée', corrected, flags=re.IGNORECASE)
-            else:
-                corrected = re.sub(r'\bje suis aller?\b', 'je suis allé', corrected, flags=re.IGNORECASE)
-            print(f"After past participle correction for speaker: '{corrected}'")
+        logger.debug("Initial text for correction: '%s', Speaker gender: %s", text.strip(), speaker_gender)
+
+        if hits is None:
+            hits = merge_hits(self.rule_engine.scan(text, speaker_gender=speaker_gender),
+                              matches_to_hits(text, matches))
+
+        # Rewrite the spans found by the rule engine scan and LanguageTool
+        corrected = self.rule_engine.rewrite(text, hits)
+        logger.debug("After rule engine and LanguageTool corrections: '%s'", corrected.strip())
 
         # Clean up extra spaces globally BEFORE final capitalization
         corrected = re.sub(r'\s+', ' ', corrected).strip()
@@ -143,235 +246,219 @@ class FrenchAnalyzer:
         corrected = re.sub(r'([.!?]\s*)([a-z])', lambda m: m.group(1) + m.group(2).upper(), corrected)
 
 
-        print(f"Final corrected text: '{corrected}'")
+        logger.debug("Final corrected text: '%s'", corrected)
         return corrected
 
-    def analyze_text(self, text, speaker_gender="masculine"):
+    def analyze_text(self, text, speaker_gender="masculine", use_language_tool=True):
         """
         Analyze French text for grammar errors and provide corrections.
         speaker_gender refers to the gender of the person speaking.
+        use_language_tool=False is the rules-only fast mode that skips LanguageTool.
+        Errors and the corrected text come from the same hits, so they always agree.
+        Texts of several sentences are analyzed sentence by sentence (see analyze_texts).
         """
-        matches = self.grammar_tool.check(text)
-        errors = []
-
-        print(f"Original text: '{text}', Speaker gender: {speaker_gender}")
-        print(f"LanguageTool found {len(matches)} matches")
-
-        # Capture the original text as it was passed to analyze_text
-        original_input_text = text
-
-        # Helper function to determine if a phrase starts the original input text
-        def is_phrase_at_sentence_start(phrase, full_text_context):
-            return full_text_context.strip().lower().startswith(phrase.strip().lower())
+        return self.analyze_texts([text], speaker_gender=speaker_gender, use_language_tool=use_language_tool)[0]
 
-        # Function to capitalize a string if the given condition is true
-        def capitalize_if(text_to_capitalize, condition):
-            return text_to_capitalize.capitalize() if condition else text_to_capitalize
+    def analyze_texts(self, texts, speaker_gender="masculine", use_language_tool=True):
+        """
+        Analyze a batch of French texts, e.g. a homework set.
+        Every text is split into sentences and all the sentences are analyzed together:
+        sentences found in the result cache are not analyzed again, and LanguageTool
+        checks the others in as few requests as possible, spread over its servers.
+        Returns one (errors, corrected_text) pair per text, in order, with error
+        offsets relative to the text.
+        """
+        segmented = [self._segment(text) for text in texts]
+        sentences = [text[start:end] for text, spans in zip(texts, segmented) for start, end in spans]
+        results = iter(self._analyze_sentences(sentences, speaker_gender, use_language_tool))
 
-        # Vérifier les erreurs spécifiques que nous traitons et les ajouter à la liste d'erreurs
+        return [self._merge_sentences(text, spans, [next(results) for _ in spans])
+                for text, spans in zip(texts, segmented)]
 
-        # 1. Erreurs de contraction
-        if re.search(r'\bà\s+le\b', text, flags=re.IGNORECASE):
-            found_error = re.search(r'\bà\s+le\b', text, flags=re.IGNORECASE).group()
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("au", should_capitalize)],
-                "message": "Contraction obligatoire : 'à le' devient 'au'."
-            })
-
-        if re.search(r'\bà\s+les\b', text, flags=re.IGNORECASE):
-            found_error = re.search(r'\bà\s+les\b', text, flags=re.IGNORECASE).group()
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("aux", should_capitalize)],
-                "message": "Contraction obligatoire : 'à les' devient 'aux'."
-            })
+    def analyze_document(self, text, known=None, speaker_gender="masculine", use_language_tool=True):
+        """
+        Analyze text the way analyze_text does, reusing the sentence analyses in
+        known ({sentence: (errors, corrected_text)}, as returned by an earlier call
+        on a previous version of the text), so that after an edit only the new or
+        changed sentences are analyzed.
+        Returns (errors, corrected_text, sentences), sentences being the analyses
+        of the sentences of text, to pass as known for the next version.
+        """
+        spans = self._segment(text)
+        sentences = [text[start:end] for start, end in spans]
+        results = self._analyze_sentences(sentences, speaker_gender, use_language_tool, known=known)
+        errors, corrected_text = self._merge_sentences(text, spans, results)
+        return errors, corrected_text, dict(zip(sentences, results))
 
-        if re.search(r'\bde\s+le\b', text, flags=re.IGNORECASE):
-            found_error = re.search(r'\bde\s+le\b', text, flags=re.IGNORECASE).group()
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("du", should_capitalize)],
-                "message": "Contraction obligatoire : 'de le' devient 'du'."
-            })
+    def _segment(self, text):
+        """
+        Sentence spans of text; a text of one sentence is kept whole, surrounding spaces included.
+        """
+        spans = split_sentences(text)
+        return spans if len(spans) > 1 else [(0, len(text))]
 
-        if re.search(r'\bde\s+les\b', text, flags=re.IGNORECASE):
-            found_error = re.search(r'\bde\s+les\b', text, flags=re.IGNORECASE).group()
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("des", should_capitalize)],
-                "message": "Contraction obligatoire : 'de les' devient 'des'."
-            })
+    def _merge_sentences(self, text, spans, results):
+        """
+        Join the analyses of the sentences of text into one, shifting error offsets.
+        The corrected sentences keep the text between them (spaces, line and paragraph breaks).
+        """
+        if len(spans) == 1 and spans[0] == (0, len(text)):
+            return results[0]
 
-        # 2. Élision avec à + école
-        if re.search(r'\b[aà]\s+école\b', text, flags=re.IGNORECASE):
-            found_error = re.search(r'\b[aà]\s+école\b', text, flags=re.IGNORECASE).group()
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("à l'école", should_capitalize)],
-                "message": "Utiliser 'à l'' devant les mots commençant par une voyelle."
-            })
+        errors = []
+        corrected_text = ""
+        previous_end = None
+        for (start, end), (sentence_errors, corrected) in zip(spans, results):
+            errors += [dict(error, start=error["start"] + start, end=error["end"] + start)
+                       for error in sentence_errors]
+            if not corrected:
+                continue
+            if previous_end is not None:
+                corrected_text += text[previous_end:start]
+            corrected_text += corrected
+            previous_end = end
+        return errors, corrected_text
 
-        # 3. Accord des noms au pluriel
-        if re.search(r'\bles chat\b', text, flags=re.IGNORECASE):
-            found_error = "les chat"
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("les chats", should_capitalize)],
-                "message": "Accord au pluriel : 'chat' doit devenir 'chats' avec 'les'."
-            })
+    def _analyze_sentences(self, texts, speaker_gender, use_language_tool, known=None):
+        """
+        Analyze texts independently; only those missing from known ({text: result})
+        and from the result cache are analyzed.
+        """
+        keys = [self._result_key(text, speaker_gender, use_language_tool) for text in texts]
+        results = [None] * len(texts)
+        for index, key in enumerate(keys):
+            if known and texts[index] in known:
+                results[index] = tuple(known[texts[index]])
+            elif key:
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    results[index] = tuple(cached)
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if use_language_tool and missing:
+            with timed("languagetool"):
+                all_matches = self.grammar_tool.check_many([texts[index] for index in missing])
+        else:
+            all_matches = [[] for _ in missing]
 
-        # 4. Accord des adjectifs au pluriel
-        if re.search(r'\bsont mignon(ne)?s?\b', text, flags=re.IGNORECASE):
-            match = re.search(r'\bsont mignon(ne)?s?\b', text, flags=re.IGNORECASE)
-            if match and 'mignons' not in match.group().lower():
-                found_error = match.group()
-                should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-                errors.append({
-                    "error": capitalize_if(found_error, should_capitalize),
-                    "suggestions": [capitalize_if("sont mignons", should_capitalize)],
-                    "message": "Accord de l'adjectif : le masculin pluriel utilise 'mignons'."
-                })
-
-        # 5. Conjugaison des verbes
-        if re.search(r'\bnous mange\b', text, flags=re.IGNORECASE):
-            found_error = "nous mange"
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("nous mangeons", should_capitalize)],
-                "message": "Conjugaison : 'mange' doit être 'mangeons' avec 'nous'."
-            })
+        with timed("rules"):
+            for index, matches in zip(missing, all_matches):
+                results[index] = self._analyze_with_matches(texts[index], matches, speaker_gender)
+                if keys[index]:
+                    self.result_cache.set(keys[index], results[index])
+        return results
 
-        # 6. Préposition
-        if re.search(r'\bdans la cantine\b', text, flags=re.IGNORECASE):
-            found_error = "dans la cantine"
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("à la cantine", should_capitalize)],
-                "message": "Préposition : utiliser 'à' et non 'dans' avec 'la cantine'."
-            })
+    def _result_key(self, text, speaker_gender, use_language_tool):
+        """
+        Result cache key of a text analysis, or None when there is no result cache.
+        """
+        if self.result_cache is None:
+            return None
+        return result_key(text, normalize_gender(speaker_gender),
+                          "full" if use_language_tool else "rules", self.rule_engine.version)
 
-        # 7. Genre des noms - déterminants
-        if re.search(r'\bun pomme\b', text, flags=re.IGNORECASE):
-            found_error = "un pomme"
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("une pomme", should_capitalize)],
-                "message": "Accord de genre : 'pomme' est féminin, utiliser 'une'."
-            })
+    def _analyze_with_matches(self, text, matches, speaker_gender):
+        """
+        Build the errors and corrected text of one text from its LanguageTool matches
+        and a single rule engine scan.
+        """
+        logger.debug("Original text: '%s', Speaker gender: %s", text, speaker_gender)
+        logger.debug("LanguageTool found %d matches", len(matches))
 
-        if re.search(r'\bmon mère\b', text, flags=re.IGNORECASE):
-            found_error = "mon mère"
-            should_capitalize = is_phrase_at_sentence_start(found_error, original_input_text)
-            errors.append({
-                "error": capitalize_if(found_error, should_capitalize),
-                "suggestions": [capitalize_if("ma mère", should_capitalize)],
-                "message": "Accord de genre : 'mère' est féminin, utiliser 'ma'."
-            })
+        # Single pass over the text: every hit is both an error record and a rewrite.
+        # Our gender-aware rules take precedence over LanguageTool on overlapping spans.
+        hits = merge_hits(self.rule_engine.scan(text, speaker_gender=speaker_gender),
+                          matches_to_hits(text, matches))
 
-        # 8. Erreurs sémantiques de genre (phrases illogiques)
-        if re.search(r'\bil est une\b.*\bfille\b', text, flags=re.IGNORECASE):
-            found_error = "il est une ... fille" # Placeholder, actual capture depends on full match
-            # For semantic errors spanning larger text, checking exact start is tricky
-            # Instead, we can assume if the input starts with 'il est une' AND matches 'fille',
-            # it might be the start of the sentence for capitalization.
-            should_capitalize = is_phrase_at_sentence_start("il est une", original_input_text)
-            errors.append({
-                "error": capitalize_if("il est une ... fille", should_capitalize),
-                "suggestions": [capitalize_if("elle est une ... fille", should_capitalize)],
-                "message": "Erreur sémantique : utiliser 'elle' pour parler d'une fille."
-            })
+        # Offset of the first character of the input, used to capitalize errors that start it
+        sentence_start = len(text) - len(text.lstrip())
 
-        if re.search(r'\belle est un\b.*\bgarçon\b', text, flags=re.IGNORECASE):
-            found_error = "elle est un ... garçon" # Placeholder
-            should_capitalize = is_phrase_at_sentence_start("elle est un", original_input_text)
+        errors = []
+        for hit in hits:
+            # LanguageTool already cases its suggestions; our rules emit lowercase phrases
+            should_capitalize = hit["source"] == "rules" and hit["start"] == sentence_start
             errors.append({
-                "error": capitalize_if("elle est un ... garçon", should_capitalize),
-                "suggestions": [capitalize_if("il est un ... garçon", should_capitalize)],
-                "message": "Erreur sémantique : utiliser 'il' pour parler d'un garçon."
+                "error": hit["error"].capitalize() if should_capitalize else hit["error"],
+                "suggestions": [suggestion.capitalize() if should_capitalize else suggestion
+                                for suggestion in hit["suggestions"]],
+                "message": hit["message"],
+                "start": hit["start"],
+                "end": hit["end"],
+                "source": hit["source"]
             })
 
-        # 9. Accord du participe passé pour l'auto-référence du locuteur
-        # Capture the exact "je suis [form of aller]" if it exists
-        # Group 1: The entire "je suis [participle]" phrase (e.g., "je suis aller")
-        # Group 2: Just the participle (e.g., "aller")
-        match_aller = re.search(r'\b(je suis\s+(aller|allé|allée|allés|allées))\b', text, flags=re.IGNORECASE)
-
-        if match_aller:
-            found_error_phrase = match_aller.group(1) # e.g., "je suis aller", "je suis allé"
-            current_participle = match_aller.group(2) # e.g., "aller", "allé"
-
-            suggestion_text = ""
-            error_message = ""
-            add_error = False
-
-            # This flag determines if both the 'error' and 'suggestion' should be capitalized.
-            should_capitalize = is_phrase_at_sentence_start(found_error_phrase, original_input_text)
-
-            if speaker_gender.lower() == "feminine":
-                # If current participle is not 'allée' (or 'allee' transcribed), then it's an error for feminine speaker
-                if current_participle.lower() not in ["allée", "allee"]:
-                    suggestion_text = "je suis allée"
-                    error_message = "Accord du participe passé : utiliser 'allée' pour une locutrice avec être."
-                    add_error = True
-            else: # Masculine or default (treat as masculine)
-                # If current participle is not 'allé' (or 'alle' for common typo) then it's an error for masculine speaker
-                if current_participle.lower() not in ["allé", "alle"]:
-                    suggestion_text = "je suis allé"
-                    error_message = "Accord du participe passé : utiliser 'allé' pour un locuteur masculin avec être."
-                    add_error = True
-
-            if add_error:
-                errors.append({
-                    "error": capitalize_if(found_error_phrase, should_capitalize),
-                    "suggestions": [capitalize_if(suggestion_text, should_capitalize)],
-                    "message": error_message
-                })
-
         # Apply corrections (this will now also handle final capitalization)
-        corrected_text = self.apply_corrections(text, matches, speaker_gender=speaker_gender)
+        corrected_text = self.apply_corrections(text, matches, speaker_gender=speaker_gender, hits=hits)
 
-        print(f"Found {len(errors)} total errors")
-        print(f"Corrected text: '{corrected_text}'")
+        logger.debug("Found %d total errors, corrected text: '%s'", len(errors), corrected_text)
 
         return errors, corrected_text
 
-    def analyze_speech(self, audio_file, speaker_gender="masculine"):
+    def analyze_speech(self, audio_file, speaker_gender="masculine", accuracy=None):
         """
         Analyze French speech audio for pronunciation and grammar errors.
         speaker_gender refers to the gender of the person speaking.
+        audio_file may be a path, a file-like object, raw uploaded bytes or decoded samples;
+        it is decoded once and the same buffer feeds Whisper and feature extraction.
+        accuracy ("high" or "fast") overrides the choice of the Whisper model (see choose_transcriber).
+        With pronunciation scoring on, Whisper also returns word timestamps (such clips are
+        decoded on their own instead of in a batch) and every word is scored.
         """
-        audio, sr = librosa.load(audio_file, sr=16000)
+        with timed("decode"):
+            audio = decode_audio(audio_file)
 
-        result = self.whisper_model.transcribe(audio_file, language='fr')
-        # Ensure it's lowercase for consistent processing by analyze_text and regex rules
-        text = result["text"].replace(',', '').strip().lower()
+        transcriber, whisper_model = self.choose_transcriber(len(audio) / SAMPLE_RATE, accuracy)
+        options = {"word_timestamps": True} if self.pronunciation else {}
+        with timed("whisper"):
+            result = transcriber.transcribe(audio, **options)
 
+        words = [{"word": word["word"].strip(), "start": word["start"], "end": word["end"]}
+                 for segment in result.get("segments", []) for word in segment.get("words", [])
+                 if word["word"].strip()]
+        return self.analyze_transcription(result["text"], audio, speaker_gender=speaker_gender,
+                                          whisper_model=whisper_model, words=words)
 
-        pronunciation_corrections = []
-        if 'alair' in text:
-            text = text.replace('alair', 'aller')
-            pronunciation_corrections.append({"error": "alair", "corrected": "aller"})
-        if 'ecolay' in text:
-            text = text.replace('ecolay', 'école')
-            pronunciation_corrections.append({"error": "ecolay", "corrected": "école"})
+    def choose_transcriber(self, duration, accuracy=None):
+        """
+        Pick the Whisper model for a clip of duration seconds: the fast model, when there is
+        one, for short clips and while transcriptions are piling up, else the accurate one.
+        Returns (transcriber, model name as reported in responses).
+        """
+        if self.fast_transcriber and self.whisper_policy.use_fast(duration, self.transcriber.pending, accuracy):
+            return self.fast_transcriber, model_label(self.whisper_fast_model_name, self.whisper_quantize)
+        return self.transcriber, self.whisper_label
 
+    def repair_transcription(self, transcription):
+        """
+        Normalize a Whisper transcription for the regex rules and repair phonetic misspellings:
+        words missing from the lexicon are replaced by the lexicon word they sound like.
+        Returns the repaired text and the list of pronunciation corrections made.
+        """
+        # Repair before lowercasing: capitalized words inside a sentence are proper nouns
+        text, pronunciation_corrections = self.lexicon.repair(transcription.replace(',', '').strip())
 
-        print(f"Transcription for grammar analysis: {text}")
-        print(f"Pronunciation corrections: {pronunciation_corrections}")
+        # Ensure it's lowercase for consistent processing by analyze_text and regex rules
+        return text.lower(), pronunciation_corrections
+
+    def analyze_transcription(self, transcription, audio, speaker_gender="masculine", whisper_model=None,
+                              words=None):
+        """
+        Grammar, pronunciation, feedback audio and accent analysis of a transcribed clip.
+        audio is the decoded clip (float32 samples at SAMPLE_RATE) the transcription came from,
+        whisper_model the name of the model that transcribed it, reported in the result.
+        words, the transcribed words with their times ({"word", "start", "end"}), get a
+        pronunciation score each.
+        """
+        sr = SAMPLE_RATE
+        text, pronunciation_corrections = self.repair_transcription(transcription)
+
+        logger.debug("Transcription for grammar analysis: %s", text)
+        logger.debug("Pronunciation corrections: %s", pronunciation_corrections)
 
         # This call will now return a correctly capitalized sentence
         errors, corrected_text = self.analyze_text(text, speaker_gender=speaker_gender)
-        print(f"Errors in order: {[error['error'] for error in errors]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Errors in order: %s", [error['error'] for error in errors])
 
         feedback_parts = []
         if pronunciation_corrections:
@@ -385,98 +472,92 @@ class FrenchAnalyzer:
                                for error in errors if error['suggestions']]
 
         feedback_text = " ".join(feedback_parts) if feedback_parts else "Aucune erreur trouvée."
-        print(f"Feedback text: {feedback_text}")
+        logger.debug("Feedback text: %s", feedback_text)
 
         audio_path = self.generate_feedback_audio(feedback_text) if feedback_text.strip() else None
 
         features = self.extract_features(audio, sr)
 
-        if self.classifier:
-            accent = self.classifier.predict([features])[0]
-            shap_values = self.shap_explainer.shap_values([features]) if self.shap_explainer else None
-        else:
-            accent = "Unknown"
-            shap_values = None
+        accent = self.classify_accents([features])[0]
+
+        word_scores = self.score_words(audio, words) if words and self.pronunciation else None
 
         return {
             "transcription": text,
             "errors": errors,
             "corrected_text": corrected_text,
-            "accent": accent,
-            "shap_values": shap_values,
+            "accent": accent["accent"],
+            "shap_values": accent["shap_values"],
             "audio_path": audio_path,
-            "pronunciation_corrections": pronunciation_corrections
+            "pronunciation_corrections": pronunciation_corrections,
+            "word_scores": word_scores,
+            "whisper_model": whisper_model
         }
 
+    def score_words(self, audio, words):
+        """
+        Score the pronunciation of each timed word of a clip, out of 100, against a
+        synthesized reference of the word it was meant to be (misspellings repaired).
+        """
+        timed_words = []
+        for word in words:
+            spoken = word["word"].strip(".,!?;:«»\"'")
+            if not spoken:
+                continue
+            # Capitalized words may be proper nouns, which the lexicon does not know
+            expected = spoken if spoken[0].isupper() else self.lexicon.suggest(spoken)
+            timed_words.append(dict(word, word=spoken, expected=(expected or spoken).lower()))
+        with timed("pronunciation"):
+            return self.pronunciation.score(audio, timed_words)
+
+    def classify_accents(self, features):
+        """
+        Classify the accent of several clips at once from their stacked feature vectors.
+        Returns one dict per clip with "accent" and "shap_values".
+        """
+        classifier = self.classifier
+        if not classifier:
+            return [{"accent": "Unknown", "shap_values": None} for _ in features]
+        with timed("classifier"):
+            return classifier.classify(features, explain=self.explain_accent)
+
     def extract_features(self, audio, sr):
         """
-        Extract MFCC features from audio for accent classification.
+        Extract acoustic features (MFCC statistics, pitch, energy, speaking rate)
+        for accent classification. Clips analyzed before are served from the cache.
         """
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-        return np.mean(mfccs.T, axis=0)
+        with timed("features"):
+            return self.features.extract(audio, sr)
 
     def generate_feedback_audio(self, text, filename=None):
         """
-        Generate audio feedback using Google Text-to-Speech.
+        Generate audio feedback with the configured text-to-speech backends.
+        Feedback that was already synthesized is served from the TTS cache;
+        pass filename to also write a copy of the audio to that file and serve it.
         """
-        if not filename:
-            filename = f"static/correction_{uuid.uuid4()}.mp3"
-
         try:
             if not text.strip():
-                print("No feedback text to generate audio.")
+                logger.debug("No feedback text to generate audio.")
                 return None
 
-            static_dir = os.path.dirname(filename)
-            os.makedirs(static_dir, exist_ok=True)
-            if not os.access(static_dir, os.W_OK):
-                os.chmod(static_dir, 0o755)
-
             tts_text = text.replace("à l'", "a l").replace("à l", "a l")
-            print(f"TTS text: {tts_text}")
-
-            tts = gTTS(tts_text, lang='fr', slow=False)
-            tts.save(filename)
+            logger.debug("TTS text: %s", tts_text)
 
-            if os.path.exists(filename):
-                file_size = os.path.getsize(filename)
-                print(f"Audio saved to {filename} (Size: {file_size} bytes)")
+            with timed("tts"):
+                path, _ = self.tts.to_file(tts_text, lang='fr')
 
-                if file_size == 0:
-                    print(f"Audio file {filename} is empty, not serving.")
-                    os.unlink(filename)
-                    return None
+            if path and filename:
+                os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+                shutil.copyfile(path, filename)
+                path = filename
 
-                return "/static/" + os.path.basename(filename) + "?t=" + str(time.time())
+            if not path:
+                logger.warning("Audio file for feedback is empty, not serving.")
+                return None
 
-            print(f"Audio file {filename} not created.")
-            return None
+            logger.debug("Audio available at %s", path)
+            return self.audio_url + os.path.basename(path)
 
         except Exception as e:
-            print(f"Error generating audio: {e}")
+            logger.error("Error generating audio: %s", e)
             return None
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,30 @@
+"""
+Audio decoding shared by transcription and acoustic analysis.
+
+A clip is decoded once into a mono float32 buffer at SAMPLE_RATE, the rate
+Whisper expects, and that same buffer is reused by every later stage.
+"""
+
+import io
+import numpy as np
+
+# Whisper and the feature extraction both work at 16 kHz
+SAMPLE_RATE = 16000
+
+
+def decode_audio(source, sr=SAMPLE_RATE):
+    """
+    Decode audio into a mono float32 NumPy array at sr Hz.
+    source may be a path, a file-like object, the raw bytes of an uploaded
+    file, or samples that are already decoded (returned as float32).
+    """
+    if isinstance(source, np.ndarray):
+        return source.astype(np.float32, copy=False)
+
+    import librosa
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    audio, _ = librosa.load(source, sr=sr, mono=True)
+    return audio.astype(np.float32, copy=False)
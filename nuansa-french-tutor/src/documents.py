@@ -0,0 +1,177 @@
+"""
+Documents analyzed incrementally, for as-you-type feedback in an editor.
+
+A client analyzes its text once and gets an analysis id back. It then sends
+its edits (character ranges replaced by new text) instead of the whole text.
+The document remembers the analysis of each of its sentences, so only the
+sentences touched by the edits are checked again, and the response is a delta:
+the errors that appeared and the ids of those that went away. Errors keep
+their id while they exist, shifted along with the text around them.
+"""
+
+import threading
+import time
+import uuid
+
+# Seconds an untouched document is kept
+DEFAULT_DOCUMENT_TTL = 1800
+
+# Fields that identify an error between two versions of a document
+_ERROR_IDENTITY = ("start", "end", "error", "message", "source")
+
+
+def apply_edits(text, edits):
+    """
+    Apply edits to text and return the new text. Each edit is
+    {"start": int, "end": int, "text": str} and replaces text[start:end];
+    edits apply in order, each on the result of the previous ones.
+    Raises ValueError on a malformed or out-of-range edit.
+    """
+    if not isinstance(edits, list):
+        raise ValueError("edits must be a list")
+    for edit in edits:
+        start, end, replacement = _parse_edit(edit)
+        if not 0 <= start <= end <= len(text):
+            raise ValueError(f"edit [{start}, {end}) is outside the text (length {len(text)})")
+        text = text[:start] + replacement + text[end:]
+    return text
+
+
+def _parse_edit(edit):
+    if not isinstance(edit, dict):
+        raise ValueError("each edit must be an object with start, end and text")
+    start, end, replacement = edit.get("start"), edit.get("end", edit.get("start")), edit.get("text", "")
+    if type(start) is not int or type(end) is not int or not isinstance(replacement, str):
+        raise ValueError("edit start and end must be integers and text a string")
+    return start, end, replacement
+
+
+def shift_errors(errors, edits):
+    """
+    Map errors (with start/end offsets) through edits already validated by
+    apply_edits. Errors before an edit stay, errors after it move by the change
+    in length, and errors overlapping or touching the edited range are dropped.
+    """
+    for edit in edits:
+        start, end, replacement = _parse_edit(edit)
+        delta = len(replacement) - (end - start)
+        shifted = []
+        for error in errors:
+            if error["end"] < start:
+                shifted.append(error)
+            elif error["start"] > end:
+                shifted.append(dict(error, start=error["start"] + delta, end=error["end"] + delta))
+        errors = shifted
+    return errors
+
+
+def _identity(error):
+    return tuple(error[field] for field in _ERROR_IDENTITY) + (tuple(error["suggestions"]),)
+
+
+class Document:
+    """
+    One text under analysis: its current version, errors (with ids) and the
+    analysis of each of its sentences. Hold lock while reading or updating it.
+    """
+
+    def __init__(self, text, speaker_gender="masculine", use_language_tool=True):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.speaker_gender = speaker_gender
+        self.use_language_tool = use_language_tool
+        self.version = 0
+        self.errors = []
+        self.corrected_text = ""
+        # {sentence: (errors, corrected_text)} of the sentences of the current text
+        self.sentences = {}
+        self.last_activity = time.time()
+        self.lock = threading.Lock()
+        self._next_error_id = 1
+
+    def update(self, text, errors, corrected_text, sentences, edits=None):
+        """
+        Store a new analysis of the document and return the delta from the previous one:
+        (added errors, with new ids; ids of the removed errors). With edits, the previous
+        errors are first shifted through them, so errors outside the edits keep their id.
+        """
+        previous = shift_errors(self.errors, edits) if edits else self.errors
+        previous_ids = {}
+        for error in previous:
+            previous_ids.setdefault(_identity(error), []).append(error["id"])
+
+        kept = set()
+        numbered = []
+        added = []
+        for error in errors:
+            ids = previous_ids.get(_identity(error))
+            if ids:
+                error = dict(error, id=ids.pop(0))
+                kept.add(error["id"])
+            else:
+                error = dict(error, id=self._next_error_id)
+                self._next_error_id += 1
+                added.append(error)
+            numbered.append(error)
+
+        removed = [error["id"] for error in self.errors if error["id"] not in kept]
+
+        self.text = text
+        self.errors = numbered
+        self.corrected_text = corrected_text
+        self.sentences = sentences
+        self.version += 1
+        self.last_activity = time.time()
+        return added, removed
+
+
+class DocumentStore:
+    """
+    Keeps the documents, bounded in number (the least recently edited one is
+    dropped first) and dropped after inactivity.
+    """
+
+    def __init__(self, max_documents=256, document_ttl=DEFAULT_DOCUMENT_TTL, id_prefix=""):
+        self.max_documents = max_documents
+        self.document_ttl = document_ttl
+        # Prepended to document ids, e.g. to tell which server process owns a document
+        self.id_prefix = id_prefix
+
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def create(self, text, speaker_gender="masculine", use_language_tool=True):
+        """
+        Open a document (not analyzed yet: its version is 0 until the first update).
+        """
+        document = Document(text, speaker_gender=speaker_gender, use_language_tool=use_language_tool)
+        document.id = self.id_prefix + document.id
+        with self._lock:
+            self._expire()
+            while self._documents and len(self._documents) >= self.max_documents:
+                oldest = min(self._documents.values(), key=lambda doc: doc.last_activity)
+                del self._documents[oldest.id]
+            self._documents[document.id] = document
+        return document
+
+    def get(self, document_id):
+        with self._lock:
+            self._expire()
+            return self._documents.get(document_id)
+
+    def close(self, document_id):
+        with self._lock:
+            return self._documents.pop(document_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._documents), "max_documents": self.max_documents}
+
+    def _expire(self):
+        """
+        Drop idle documents. Must be called with the lock held.
+        """
+        cutoff = time.time() - self.document_ttl
+        for document_id in [document_id for document_id, document in self._documents.items()
+                            if document.last_activity < cutoff]:
+            del self._documents[document_id]
@@ -0,0 +1,176 @@
+"""
+Acoustic features of a clip for accent and pronunciation scoring.
+
+The signal is framed once: a single power spectrogram feeds the MFCCs (and
+their deltas), the frame energy and the onset envelope used for speaking
+rate; pitch is tracked with YIN on the same hop. Each feature is a summary
+statistic over frames, computed with array operations, so the whole vector
+costs little more than the MFCCs alone.
+
+Vectors are cached by a hash of the audio samples, so analyzing the same
+recording again skips extraction.
+
+The first 13 values are the MFCC means with librosa's default analysis
+parameters, i.e. the features of the original pipeline: models trained on
+those keep working on the first 13 columns.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from src.audio import SAMPLE_RATE
+
+# Bump when the features change, so cached vectors are not reused
+FEATURE_VERSION = 1
+
+N_MFCC = 13
+
+# Framing shared by every feature (librosa's defaults: 128 ms windows, 32 ms hop at 16 kHz)
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+# Pitch search range in Hz, covering adult voices
+FMIN = 65.0
+FMAX = 400.0
+
+# Frames quieter than this (dB below the loudest frame) count as silence
+SILENCE_DB = -35.0
+
+# Number of feature vectors kept in memory
+DEFAULT_CACHE_ENTRIES = 512
+
+FEATURE_NAMES = tuple(
+    [f"mfcc{i}_mean" for i in range(N_MFCC)]
+    + [f"mfcc{i}_std" for i in range(N_MFCC)]
+    + [f"mfcc{i}_delta_std" for i in range(N_MFCC)]
+    + [f"mfcc{i}_delta2_std" for i in range(N_MFCC)]
+    + ["pitch_mean", "pitch_std", "pitch_range_semitones", "voiced_ratio",
+       "rms_mean", "rms_std", "rms_range_db",
+       "onsets_per_second", "pause_ratio"]
+)
+
+
+def _deltas(mfcc, order):
+    """
+    MFCC deltas over the widest odd window (at most 9 frames) the clip allows.
+    """
+    import librosa
+
+    width = min(9, mfcc.shape[1] - (1 - mfcc.shape[1] % 2))
+    if width < 3:
+        return np.zeros_like(mfcc)
+    return librosa.feature.delta(mfcc, width=width, order=order, mode="nearest")
+
+
+def compute_features(audio, sr=SAMPLE_RATE):
+    """
+    Compute the feature vector (ordered as FEATURE_NAMES) of float32 samples at sr Hz.
+    """
+    import librosa
+
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < N_FFT:
+        audio = np.pad(audio, (0, N_FFT - len(audio)))
+
+    # One framing pass: everything below is derived from this spectrogram
+    power = np.abs(librosa.stft(audio, n_fft=N_FFT, hop_length=HOP_LENGTH)) ** 2
+    log_mel = librosa.power_to_db(librosa.feature.melspectrogram(S=power, sr=sr, n_mels=N_MELS))
+    mfcc = librosa.feature.mfcc(S=log_mel, n_mfcc=N_MFCC)
+    delta = _deltas(mfcc, 1)
+    delta2 = _deltas(mfcc, 2)
+
+    # Frame energy and silence
+    rms = librosa.feature.rms(S=np.sqrt(power), frame_length=N_FFT)[0]
+    rms_db = 20 * np.log10(np.maximum(rms, 1e-10) / max(rms.max(), 1e-10))
+    voiced = rms_db > SILENCE_DB
+    loud = rms_db[voiced] if voiced.any() else rms_db
+
+    # Pitch of the frames that are loud enough and inside the search range
+    f0 = librosa.yin(audio, fmin=FMIN, fmax=FMAX, sr=sr, frame_length=N_FFT, hop_length=HOP_LENGTH)
+    frames = min(len(f0), len(voiced))
+    pitched = f0[:frames][voiced[:frames] & (f0[:frames] > FMIN * 1.05) & (f0[:frames] < FMAX * 0.95)]
+    if len(pitched):
+        low, high = np.percentile(pitched, [10, 90])
+        pitch = [pitched.mean(), pitched.std(), 12 * np.log2(high / low)]
+    else:
+        pitch = [0.0, 0.0, 0.0]
+
+    # Speaking rate: acoustic onsets (roughly syllables) per second of speech
+    onset_envelope = librosa.onset.onset_strength(S=log_mel, sr=sr)
+    onsets = librosa.onset.onset_detect(onset_envelope=onset_envelope, sr=sr, hop_length=HOP_LENGTH)
+    speech_seconds = max(voiced.sum(), 1) * HOP_LENGTH / sr
+
+    return np.concatenate([
+        mfcc.mean(axis=1),
+        mfcc.std(axis=1),
+        delta.std(axis=1),
+        delta2.std(axis=1),
+        pitch,
+        [len(pitched) / max(frames, 1),
+         rms.mean(), rms.std(), np.percentile(loud, 95) - np.percentile(loud, 5),
+         len(onsets) / speech_seconds, 1.0 - voiced.mean()]
+    ]).astype(np.float32)
+
+
+def audio_key(audio, sr=SAMPLE_RATE):
+    """
+    Hash of the samples, the sample rate and FEATURE_VERSION.
+    """
+    digest = hashlib.sha256(f"{FEATURE_VERSION}:{sr}:".encode())
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class FeatureExtractor:
+    """
+    Computes feature vectors and keeps the most recent ones in an in-memory LRU,
+    keyed by audio content. compute is the extraction function (compute_features).
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, compute=compute_features):
+        self.max_entries = max_entries
+        self.compute = compute
+
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extract(self, audio, sr=SAMPLE_RATE):
+        """
+        Return the feature vector of a clip, computing it only on a cache miss.
+        """
+        key = audio_key(audio, sr)
+        with self._lock:
+            features = self._vectors.get(key)
+            if features is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return features
+
+        features = self.compute(audio, sr)
+        features.setflags(write=False)
+
+        with self._lock:
+            self.misses += 1
+            if self.max_entries > 0:
+                self._vectors[key] = features
+                while len(self._vectors) > self.max_entries:
+                    self._vectors.popitem(last=False)
+        return features
+
+    def stats(self):
+        """
+        Return the cache counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._vectors)
+        }
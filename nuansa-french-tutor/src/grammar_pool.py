@@ -0,0 +1,171 @@
+"""
+Pool of local LanguageTool servers shared by the request threads.
+
+language_tool_python starts one JVM server per LanguageTool instance, and a
+single instance handles one check at a time. The pool keeps several servers
+and lends one to each check so concurrent Flask workers do not queue on one JVM.
+"""
+
+import bisect
+import copy
+import math
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Maximum number of replacements kept per LanguageTool match
+MAX_SUGGESTIONS = 5
+
+# Texts checked together are joined as separate paragraphs
+BATCH_SEPARATOR = "\n\n"
+
+# Upper bound on the characters sent to LanguageTool in one batched check
+BATCH_MAX_CHARS = 20000
+
+# Rules that compare neighbouring sentences or paragraphs. In a batched check they would compare
+# different texts, so their matches are dropped there (checks of a single text keep them)
+CROSS_TEXT_RULES = frozenset((
+    "PARAGRAPH_REPEAT_BEGINNING_RULE",
+    "WORD_REPEAT_BEGINNING_RULE",
+    "STYLE_REPEATED_WORD_RULE_FR",
+))
+
+# Batches are split across the pool's servers only above this size (smaller ones are not worth a request)
+PARALLEL_MIN_CHARS = 2000
+
+
+class LanguageToolPool:
+    """
+    Fixed-size pool of local LanguageTool servers.
+    A pool of size 0 never starts a server and returns no matches (rules-only mode).
+    """
+
+    def __init__(self, size=1, language='fr', tool_factory=None):
+        """
+        tool_factory(language) starts one server; by default a language_tool_python.LanguageTool.
+        """
+        self.size = size
+        self.language = language
+        self._idle = queue.Queue()
+        # Runs the batches of one check_many call on several servers at once
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="languagetool") if size > 1 else None
+
+        for _ in range(size):
+            self._idle.put((tool_factory or start_server)(language))
+
+    def check(self, text):
+        """
+        Check text on the first idle server, waiting for one if all are busy.
+        """
+        if self.size == 0:
+            return []
+
+        tool = self._idle.get()
+        try:
+            return tool.check(text)
+        finally:
+            self._idle.put(tool)
+
+    def check_many(self, texts):
+        """
+        Check several texts with as few LanguageTool requests as possible.
+        Texts are joined into paragraphs (up to BATCH_MAX_CHARS per request) and the
+        matches are split back per text, with offsets relative to their own text.
+        Large inputs are split into one batch per server and checked in parallel.
+        Matches of CROSS_TEXT_RULES are dropped from batches of several texts, and
+        matches spanning the separator between two texts are dropped.
+        Returns one list of matches per text.
+        """
+        results = [[] for _ in texts]
+        if self.size == 0:
+            return results
+
+        total_chars = sum(len(text) + len(BATCH_SEPARATOR) for text in texts)
+        batch_limit = min(BATCH_MAX_CHARS, max(PARALLEL_MIN_CHARS, math.ceil(total_chars / self.size)))
+
+        batches = []
+        batch = []
+        batch_chars = 0
+        for index, text in enumerate(texts):
+            if batch and batch_chars + len(text) > batch_limit:
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(index)
+            batch_chars += len(text) + len(BATCH_SEPARATOR)
+        if batch:
+            batches.append(batch)
+
+        if self._executor is None or len(batches) == 1:
+            for batch in batches:
+                self._check_batch(texts, batch, results)
+        else:
+            # Batches fill disjoint entries of results, so they can run concurrently
+            for future in [self._executor.submit(self._check_batch, texts, batch, results) for batch in batches]:
+                future.result()
+        return results
+
+    def _check_batch(self, texts, indexes, results):
+        starts = []
+        position = 0
+        for index in indexes:
+            starts.append(position)
+            position += len(texts[index]) + len(BATCH_SEPARATOR)
+
+        matches = self.check(BATCH_SEPARATOR.join(texts[index] for index in indexes))
+
+        for match in matches:
+            if len(indexes) > 1 and match.ruleId in CROSS_TEXT_RULES:
+                continue
+            # Find the text the match starts in
+            slot = bisect.bisect_right(starts, match.offset) - 1
+            index = indexes[slot]
+            offset = match.offset - starts[slot]
+            if offset + match.errorLength > len(texts[index]):
+                # Spans the paragraph separator, so it belongs to no single text
+                continue
+            rebased = copy.copy(match)
+            rebased.offset = offset
+            results[index].append(rebased)
+
+    def close(self):
+        """
+        Stop every server of the pool.
+        """
+        for _ in range(self.size):
+            self._idle.get().close()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.size = 0
+
+
+def start_server(language):
+    """
+    Start a local LanguageTool server checking grammar, typography and style.
+    """
+    import language_tool_python
+
+    tool = language_tool_python.LanguageTool(language)
+    tool.enabledCategories = 'GRAMMAR,TYPOGRAPHY,STYLE'
+    return tool
+
+
+def matches_to_hits(text, matches):
+    """
+    Convert LanguageTool matches into rule engine style hits (see src.rules.RuleEngine.scan).
+    Matches without any replacement are kept as errors but have no replacement to apply.
+    """
+    hits = []
+    for match in matches:
+        start = match.offset
+        end = match.offset + match.errorLength
+        suggestions = list(match.replacements[:MAX_SUGGESTIONS])
+        hits.append({
+            "rule_id": f"languagetool:{match.ruleId}",
+            "source": "languagetool",
+            "start": start,
+            "end": end,
+            "error": text[start:end],
+            "replacement": suggestions[0] if suggestions else None,
+            "suggestions": suggestions,
+            "message": match.message
+        })
+    return hits
@@ -0,0 +1,282 @@
+"""
+Compact, memory-mapped French inflection lexicon.
+
+The lexicon tells, for any word form, whether it can be a noun, an adjective,
+a past participle or another verb form, and gives the four forms (masculine
+and feminine, singular and plural) of its noun and adjective lemmas, which is
+what gender and number agreement checks need.
+
+It is built offline from a tab-separated table in the format of Lexique 3
+(http://www.lexique.org: columns ortho, lemme, cgram, genre, nombre, infover;
+other columns are ignored) into a binary file of fixed-size records:
+
+    header   magic, format version, counts, table size, digest of the content
+    forms    one 16-byte record per form: string offset and length, flags,
+             the (gender, number) readings of the form as a noun and as an
+             adjective or participle, and the index of its noun lemma and of
+             its adjective/participle lemma
+    lemmas   four form indices per lemma (ms, fs, mp, fp; -1 when missing)
+    table    open-addressing hash table of form indices (crc32 of the form)
+    strings  the UTF-8 forms, back to back
+
+The file is memory-mapped, not loaded: a lookup hashes the word and reads a
+few records, and the pages are shared by every process that maps the file
+(forked workers included) instead of each building a large dict.
+
+Build the full lexicon from Lexique 3, from nuansa-french-tutor/:
+    python -m src.inflections Lexique383.tsv --output src/data/inflections_fr.bin
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import zlib
+from collections import namedtuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Small lexicon shipped with the app (common nouns, adjectives and participles), and its source
+DEFAULT_INFLECTIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "inflections_fr.bin")
+DEFAULT_SOURCE_PATH = os.path.join(os.path.dirname(__file__), "data", "inflections_fr.tsv")
+
+MAGIC = b"NFLX"
+FORMAT_VERSION = 1
+
+# magic, version, form count, lemma count, table size, strings size, content digest
+_HEADER = struct.Struct("<4sIIIII16s")
+_HEADER_SIZE = 48
+
+_FORM = np.dtype([("offset", "<u4"), ("length", "u1"), ("flags", "u1"), ("noun_readings", "u1"),
+                  ("adjective_readings", "u1"), ("noun", "<i4"), ("adjective", "<i4")])
+
+# Longer forms (in UTF-8 bytes) are left out
+MAX_FORM_BYTES = 255
+
+# Form flags
+NOUN = 1
+ADJECTIVE = 2
+PARTICIPLE = 4
+VERB = 8
+
+GENDERS = ("m", "f")
+NUMBERS = ("s", "p")
+# Position of each (gender, number) in a lemma's four forms
+SLOTS = {("m", "s"): 0, ("f", "s"): 1, ("m", "p"): 2, ("f", "p"): 3}
+
+Inflection = namedtuple("Inflection", "form flags noun_readings adjective_readings noun adjective")
+Inflection.__doc__ = """
+A word form of the lexicon. noun_readings and adjective_readings are the sets of
+(gender, number) the form has as a noun and as an adjective or participle, over
+all its lemmas. noun and adjective are the {(gender, number): form} dicts of its
+first lemma of each kind (None when it has none).
+"""
+
+
+def _hash(encoded):
+    return zlib.crc32(encoded)
+
+
+def read_lexique(path):
+    """
+    Yield (form, lemma, cgram, gender, number, infover) rows of a Lexique-style table.
+    Column names may carry Lexique 3's numeric prefixes ("1_ortho").
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader((line for line in f if not line.startswith("#")), delimiter="\t", quoting=csv.QUOTE_NONE)
+        header = [re.sub(r"^\d+_", "", name.strip()) for name in next(reader)]
+        columns = [header.index(name) for name in ("ortho", "lemme", "cgram", "genre", "nombre")]
+        infover = header.index("infover") if "infover" in header else None
+        for row in reader:
+            if not row:
+                continue
+            values = [row[column].strip() if column < len(row) else "" for column in columns]
+            values.append(row[infover].strip() if infover is not None and infover < len(row) else "")
+            yield tuple(values)
+
+
+def build(rows, path):
+    """
+    Write the binary lexicon of (form, lemma, cgram, gender, number, infover) rows to path.
+    The output only depends on the rows, so the same table always builds the same file.
+    Returns the number of forms.
+    """
+    flags = {}
+    # {form: [noun readings, adjective readings]}, each a bit mask of slots
+    readings = {}
+    # {(kind, lemma): {slot: form}}, kind being "NOM", "ADJ" or "PAR"
+    lemmas = {}
+    for form, lemma, cgram, gender, number, infover in rows:
+        form = form.lower()
+        if not form or " " in form or len(form.encode("utf-8")) > MAX_FORM_BYTES:
+            continue
+        participle = cgram.startswith("VER") and "par:pas" in infover
+        if cgram == "NOM":
+            kind, flag = "NOM", NOUN
+        elif cgram == "ADJ":
+            kind, flag = "ADJ", ADJECTIVE
+        elif participle:
+            kind, flag = "PAR", PARTICIPLE
+        elif cgram.startswith(("VER", "AUX")):
+            kind, flag = None, VERB
+        else:
+            continue
+        # A participle row also standing for a conjugated form ("dit": ind:pre:3s;par:pas)
+        if participle and any(not part.startswith("par") for part in infover.split(";") if part):
+            flag |= VERB
+        flags[form] = flags.get(form, 0) | flag
+        if kind is None:
+            continue
+
+        slots = lemmas.setdefault((kind, lemma.lower()), {})
+        masks = readings.setdefault(form, [0, 0])
+        # An empty gender or number means the form serves both
+        for g in (gender,) if gender in GENDERS else GENDERS:
+            for n in (number,) if number in NUMBERS else NUMBERS:
+                slots.setdefault(SLOTS[(g, n)], form)
+                masks[kind != "NOM"] |= 1 << SLOTS[(g, n)]
+
+    forms = sorted(flags)
+    form_index = {form: index for index, form in enumerate(forms)}
+    lemma_keys = sorted(lemmas)
+
+    lemma_table = np.full((len(lemma_keys), 4), -1, dtype="<i4")
+    records = np.zeros(len(forms), dtype=_FORM)
+    records["noun"] = records["adjective"] = -1
+    for index, key in enumerate(lemma_keys):
+        for slot, form in lemmas[key].items():
+            lemma_table[index, slot] = form_index[form]
+    # Forms shared by several lemmas point to the first one, adjectives before participles
+    for index in sorted(range(len(lemma_keys)), key=lambda index: (lemma_keys[index][0] == "PAR", index)):
+        field = "noun" if lemma_keys[index][0] == "NOM" else "adjective"
+        for form in lemmas[lemma_keys[index]].values():
+            if records[field][form_index[form]] == -1:
+                records[field][form_index[form]] = index
+
+    strings = bytearray()
+    table_size = 1
+    while table_size < 2 * len(forms):
+        table_size *= 2
+    table = np.zeros(table_size, dtype="<u4")
+    for index, form in enumerate(forms):
+        encoded = form.encode("utf-8")
+        records["offset"][index] = len(strings)
+        records["length"][index] = len(encoded)
+        records["flags"][index] = flags[form]
+        records["noun_readings"][index], records["adjective_readings"][index] = readings.get(form, (0, 0))
+        strings += encoded
+
+        slot = _hash(encoded) & (table_size - 1)
+        while table[slot]:
+            slot = (slot + 1) & (table_size - 1)
+        table[slot] = index + 1
+
+    content = records.tobytes() + lemma_table.tobytes() + table.tobytes() + bytes(strings)
+    digest = hashlib.sha256(content).digest()[:16]
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(forms), len(lemma_keys), table_size, len(strings), digest)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.ljust(_HEADER_SIZE, b"\0"))
+        f.write(content)
+    os.replace(temp_path, path)
+    return len(forms)
+
+
+class InflectionLexicon:
+    """
+    Read-only view of a binary inflection lexicon, memory-mapped from its file.
+    """
+
+    def __init__(self, path=DEFAULT_INFLECTIONS_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_forms, n_lemmas, table_size, n_strings, digest = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not an inflection lexicon of format {FORMAT_VERSION}")
+        # Identifies the content, e.g. in cache keys of results computed with it
+        self.digest = digest.hex()
+
+        offset = _HEADER_SIZE
+        self._forms = np.frombuffer(self._map, dtype=_FORM, count=n_forms, offset=offset)
+        offset += self._forms.nbytes
+        self._lemmas = np.frombuffer(self._map, dtype="<i4", count=4 * n_lemmas, offset=offset).reshape(n_lemmas, 4)
+        offset += self._lemmas.nbytes
+        self._table = np.frombuffer(self._map, dtype="<u4", count=table_size, offset=offset)
+        self._strings = offset + self._table.nbytes
+        if self._strings + n_strings > len(self._map):
+            raise ValueError(f"{path} is truncated: its forms end past the end of the file")
+        self._mask = table_size - 1
+        logger.info("Mapped %d inflected forms of %d lemmas from %s", n_forms, n_lemmas, path)
+
+    def __len__(self):
+        return len(self._forms)
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def _find(self, word):
+        """
+        Index of the form word (lowercase), or None.
+        """
+        encoded = word.encode("utf-8")
+        slot = _hash(encoded) & self._mask
+        while True:
+            entry = int(self._table[slot])
+            if not entry:
+                return None
+            if self._form_bytes(entry - 1) == encoded:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def _form_bytes(self, index):
+        record = self._forms[index]
+        start = self._strings + int(record["offset"])
+        return self._map[start:start + int(record["length"])]
+
+    @staticmethod
+    def _readings(mask):
+        return frozenset(key for key, slot in SLOTS.items() if mask & (1 << slot))
+
+    def _lemma_forms(self, lemma):
+        if lemma < 0:
+            return None
+        forms = {}
+        for key, slot in SLOTS.items():
+            index = int(self._lemmas[lemma, slot])
+            if index >= 0:
+                forms[key] = self._form_bytes(index).decode("utf-8")
+        return forms
+
+    def lookup(self, word):
+        """
+        Return the Inflection of word (lowercase), or None when the lexicon does not know it.
+        """
+        index = self._find(word)
+        if index is None:
+            return None
+        record = self._forms[index]
+        return Inflection(word, int(record["flags"]),
+                          self._readings(int(record["noun_readings"])), self._readings(int(record["adjective_readings"])),
+                          self._lemma_forms(int(record["noun"])), self._lemma_forms(int(record["adjective"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the binary French inflection lexicon")
+    parser.add_argument("source", nargs="?", default=DEFAULT_SOURCE_PATH,
+                        help="Lexique-style table (ortho, lemme, cgram, genre, nombre, infover columns)")
+    parser.add_argument("--output", default=DEFAULT_INFLECTIONS_PATH, help="Binary lexicon to write")
+    args = parser.parse_args()
+
+    count = build(read_lexique(args.source), args.output)
+    print(f"Wrote {count} forms to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Bounded background job queue for long-running analyses.
+
+A request submits a job and gets its id back immediately; a fixed pool of
+worker threads runs the jobs and clients poll for the result. When too many
+jobs are waiting, submit() raises QueueFull so the caller can answer 429
+instead of piling up work.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Seconds a finished job's result stays available for polling
+DEFAULT_RESULT_TTL = 600
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+
+class JobQueue:
+    """
+    Runs jobs on a fixed pool of threads and keeps their status and result.
+    Threads share the analyzer's models, and Whisper/PyTorch release the GIL
+    while they compute, so threads are enough to keep several jobs running.
+    """
+
+    def __init__(self, workers=2, max_pending=8, result_ttl=DEFAULT_RESULT_TTL, id_prefix=""):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        # Prepended to job ids, e.g. to tell which server process owns a job
+        self.id_prefix = id_prefix
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule func(*args, **kwargs) and return the job id.
+        Raises QueueFull when max_pending jobs are already queued or running.
+        """
+        with self._lock:
+            self._expire()
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+
+            job_id = self.id_prefix + uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "finished_at": None
+            }
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        with self._lock:
+            self._jobs[job_id]["status"] = "running"
+
+        try:
+            result = func(*args, **kwargs)
+            outcome = {"status": "done", "result": result}
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job_id, e)
+            outcome = {"status": "failed", "error": str(e)}
+
+        with self._lock:
+            self._jobs[job_id].update(outcome, finished_at=time.time())
+            self._pending -= 1
+
+    def get(self, job_id):
+        """
+        Return a copy of the job's record, or None if it is unknown or expired.
+        """
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        """
+        Return the number of pending jobs and the queue capacity.
+        """
+        with self._lock:
+            return {"pending": self._pending, "max_pending": self.max_pending, "workers": self.workers}
+
+    def _expire(self):
+        """
+        Drop finished jobs older than result_ttl. Must be called with the lock held.
+        """
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,142 @@
+"""
+Per-stage latency metrics of the analysis pipeline.
+
+Each stage (decode, whisper, languagetool, rules, tts, features, classifier,
+pronunciation) is wrapped in timed(stage), which records its duration in a
+histogram of the process-wide registry. The histograms are exported in the
+Prometheus text format by the /metrics route. A request can also collect the durations of its
+own stages with collect(), to return them as a timing breakdown.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds (Prometheus convention)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Durations of the stages run by the current request, when it collects them
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """
+    Counts observations per bucket, with their sum. Not thread-safe on its own.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """
+        Return (upper bound, observations <= bound) pairs, ending with +Inf.
+        """
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class StageMetrics:
+    """
+    Thread-safe registry of one latency histogram per stage.
+    """
+
+    def __init__(self, name="nuansa_stage_seconds", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """
+        Record one duration of a stage, also in the current request's timings if collected.
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage):
+        """
+        Time the enclosed block as one run of stage (also when it raises).
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        """
+        Return {stage: {"count": n, "sum": seconds}}.
+        """
+        with self._lock:
+            return {stage: {"count": histogram.count, "sum": histogram.sum}
+                    for stage, histogram in self._histograms.items()}
+
+    def render(self):
+        """
+        Return the histograms in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} Time spent in each analysis stage.",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for stage in sorted(self._histograms):
+                histogram = self._histograms[stage]
+                for bound, count in histogram.cumulative_counts():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{self.name}_bucket{{stage="{stage}",le="{le}"}} {count}')
+                lines.append(f'{self.name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{self.name}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the analysis pipeline
+metrics = StageMetrics()
+
+
+def timed(stage):
+    """
+    Time a block as one run of stage in the process-wide registry.
+    """
+    return metrics.timed(stage)
+
+
+@contextmanager
+def collect():
+    """
+    Collect the stage durations of the enclosed block (in this thread or context).
+    Yields a dict filled with {stage: total seconds} as the stages run.
+    """
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def as_milliseconds(timings):
+    """
+    Round collected timings to a {stage: milliseconds} breakdown for a JSON response.
+    """
+    return {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
@@ -0,0 +1,282 @@
+"""
+Repair of misspelled words in transcriptions with a phonetic index of a French lexicon.
+
+Whisper writes down what it hears, so a learner's approximate "aller" can come
+back as "alair". Such tokens are not words of the lexicon but sound like one.
+Every lexicon word is indexed under a phonetic key, a rough code of its French
+pronunciation ("aller", "allé" and "allez" share one), and every key also
+under its one-character deletions. The keys at most one edit away from a
+token's key are then found with a few dictionary lookups (symmetric delete
+search), so the cost of a lookup does not grow with the size of the lexicon.
+
+A word list of lemmas and frequent forms cannot tell a misspelling from an
+inflected form it lacks ("contentes", "mangerez"), which sounds like a listed
+form once its silent ending is dropped. Such tokens are left alone: tokens
+known to a full-form lexicon (see src.inflections) and futures or conditionals
+of a listed infinitive are never repaired, and neither is a token that only
+differs from its suggestion by an inflectional or tense ending or that does
+not start with the same sound.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Frequent French words, one per line, most frequent first
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "lexicon_fr.txt")
+
+# Shorter tokens are never repaired (too many words are one edit apart)
+MIN_REPAIR_LENGTH = 3
+
+_VOWELS = "aeiouyàâéèêëîïôûùü"
+
+# Personal endings of the future (after the infinitive's r) and of the conditional
+_FUTURE_ENDINGS = ("ai", "as", "a", "ons", "ez", "ont", "ais", "ait", "ions", "iez", "aient")
+
+# Inflectional endings of nouns, adjectives and verbs, without accents: two words that only
+# differ by these are forms of one word ("contente"/"contentes", "mangerai"/"mangerez"),
+# including another tense ("mangerons"/"mangeons", "finirons"/"finissons")
+_ENDINGS = frozenset(("", "e", "s", "x", "z", "t", "d", "r", "es", "ee", "ees", "ez", "er", "ai", "ais", "ait",
+                      "ant", "ent", "aient", "ons", "ont", "iez", "ions")
+                     + tuple("r" + ending for ending in _FUTURE_ENDINGS)
+                     + tuple("ss" + ending for ending in ("e", "es", "ent", "ons", "ez", "ant", "ais", "ait",
+                                                          "ions", "iez", "aient")))
+
+# Future and conditional of a verb: its infinitive (without the e of -re) and a personal ending
+_FUTURE = re.compile(rf"(?<=\w\wr)(?:{'|'.join(sorted(_FUTURE_ENDINGS, key=len, reverse=True))})$")
+
+# Pronunciation rules, applied in order to a lowercase word. Digraphs become
+# uppercase sound codes so that later rules on single letters leave them alone.
+_PHONETIC_RULES = [(re.compile(pattern), replacement) for pattern, replacement in [
+    # Ligatures and cedilla
+    (r"œ", "e"), (r"æ", "e"), (r"ç", "s"),
+    # A vowel before n/m and a mute e is not nasal ("pome" sounds like "pomme", "lune" unlike "l'un"):
+    # doubling the consonant keeps the nasal rules below off once the e is dropped
+    (rf"(?<=[{_VOWELS}])([nm])es?$", r"\1\1"),
+    # Silent endings: mute e, plural s/x, final t/d/p; -er, -ez, -et sound like é/è
+    (r"(?<=\w\w)es$", ""), (r"(?<=\w\w)e$", ""), (r"(?<=\w\w)[sxz]$", ""),
+    (r"(?<=\w\w)er$", "é"), (r"(?<=\w)ez$", "é"), (r"(?<=\w)et$", "è"),
+    (rf"(?<=[{_VOWELS}])[tdp]$", ""),
+    # Nasal vowels (not followed by a vowel or another n/m)
+    (rf"ien(?![{_VOWELS}nm])", "i1"),
+    (rf"(?:ain|aim|ein|in|yn|un|um)(?![{_VOWELS}nm])", "1"),
+    (r"im(?=[bp])", "1"),
+    (rf"(?:an|am|en|em)(?![{_VOWELS}nm])", "2"),
+    (rf"o[nm](?![{_VOWELS}nm])", "3"),
+    # Vowel digraphs
+    (r"eau|au", "O"), (r"o[uùû]", "U"), (r"o[iy]", "WA"), (r"a[iy]|e[iy]", "E"),
+    # Consonants
+    (r"sch|ch|sh", "S"), (r"ph", "f"), (r"th", "t"), (r"gn", "N"),
+    (r"qu|ck|q", "k"), (r"gu(?=[eiyéèêë])", "g"), (r"g(?=[eiyéèêë])", "j"), (r"c(?=[eiyéèêë])", "s"),
+    (r"c", "k"), (r"h", ""), (r"w", "v"), (r"x", "ks"), (r"z", "s"),
+    (rf"(?<=[{_VOWELS}EOUA])s(?=[{_VOWELS}EOUWA])", "z"),
+    # Single vowels
+    (r"[éèêëe]", "E"), (r"[aàâ]", "A"), (r"[oô]", "O"), (r"[uûùü]", "Y"), (r"[iîïy]", "I"),
+]]
+
+_REPEATED = re.compile(r"(.)\1+")
+_NOT_A_SOUND = re.compile(r"[^A-Z0-9]")
+
+# A word, with its elisions and hyphenated parts (l'école, peut-être)
+_TOKEN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+_TOKEN_SEPARATORS = re.compile(r"(['’-])")
+
+# Characters after which a capitalized word starts a sentence instead of being a proper noun
+# ("" is the start of the text)
+_SENTENCE_ENDS = ("", ".", "!", "?", "…", ":", "«", '"')
+
+
+def strip_accents(word):
+    return "".join(char for char in unicodedata.normalize("NFD", word) if not unicodedata.combining(char))
+
+
+def phonetic_key(word):
+    """
+    Rough code of the French pronunciation of word: "aller", "allé" and "allez" → "ALE".
+    """
+    key = word.lower()
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return _REPEATED.sub(r"\1", _NOT_A_SOUND.sub("", key.upper()))
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance between two strings.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def inflection_of(word, other):
+    """
+    True when word is other with another inflectional ending ("contentes" of "contente",
+    "mangerez" of "mangerai"), accents ignored. A word without an ending of its own
+    ("verr" for "verre") is a truncated spelling, not an inflection.
+    """
+    word, other = strip_accents(word), strip_accents(other)
+    common = 0
+    while common < min(len(word), len(other)) and word[common] == other[common]:
+        common += 1
+    # A stem must remain: "as" and "es" are different words
+    return common >= 2 and word[common:] != "" and word[common:] in _ENDINGS and other[common:] in _ENDINGS
+
+
+def _deletions(key):
+    return {key[:index] + key[index + 1:] for index in range(len(key))}
+
+
+class PhoneticLexicon:
+    """
+    French lexicon indexed by phonetic key, suggesting the word a misspelled token was meant to be.
+    """
+
+    def __init__(self, words, known=None):
+        """
+        words are lowercase lexicon words, most frequent first (the rank breaks ties).
+        known is an optional container of further correct forms (e.g. an InflectionLexicon),
+        never repaired but not suggested either.
+        """
+        self.known = known
+        self._rank = {}
+        # {phonetic key: words with that key, most frequent first}
+        self._keys = {}
+        # {key with one character deleted: keys it comes from}
+        self._deletes = {}
+
+        for word in words:
+            if word in self._rank:
+                continue
+            self._rank[word] = len(self._rank)
+            key = phonetic_key(word)
+            if key not in self._keys:
+                self._keys[key] = []
+                for deletion in _deletions(key):
+                    self._deletes.setdefault(deletion, []).append(key)
+            self._keys[key].append(word)
+
+    @classmethod
+    def load(cls, path=DEFAULT_LEXICON_PATH, known=None):
+        """
+        Build the index of a word list file (one word per line, most frequent first;
+        blank lines and lines starting with # are skipped). known is passed to the lexicon.
+        """
+        with open(path, encoding="utf-8") as f:
+            words = [line.strip().lower() for line in f if line.strip() and not line.startswith("#")]
+        lexicon = cls(words, known)
+        logger.info("Indexed %d words under %d phonetic keys", len(lexicon), len(lexicon._keys))
+        return lexicon
+
+    def __len__(self):
+        return len(self._rank)
+
+    def __contains__(self, word):
+        return word in self._rank
+
+    def is_known(self, word):
+        """
+        True when word (lowercase) is a correct form: a lexicon word, a known form, or
+        the future or conditional of a lexicon infinitive ("mangerons", "prendrait").
+        """
+        if word in self._rank or (self.known is not None and word in self.known):
+            return True
+        future = _FUTURE.search(word)
+        if future:
+            infinitive = word[:future.start()]
+            return infinitive in self._rank or infinitive + "e" in self._rank
+        return False
+
+    def _similar_keys(self, key):
+        """
+        Keys of the lexicon at most one edit away from key.
+        """
+        found = set()
+        for variant in _deletions(key) | {key}:
+            if variant in self._keys:
+                found.add(variant)
+            found.update(self._deletes.get(variant, ()))
+        return [other for other in found if edit_distance(key, other) <= 1]
+
+    def suggest(self, token):
+        """
+        Return the lexicon word token (lowercase) was most likely meant to be, or None
+        when token is a known word, too short, or sounds like no word written closely
+        enough. Words with the same key as token come first, then the closest in spelling.
+        A suggestion that is only another inflection of token, or that does not start
+        with the same sound, is not made.
+        """
+        if len(token) < MIN_REPAIR_LENGTH or self.is_known(token):
+            return None
+        key = phonetic_key(token)
+        if not key:
+            return None
+
+        same_key = key in self._keys
+        keys = [key] if same_key else self._similar_keys(key)
+        plain = strip_accents(token)
+        best = None
+        for other in keys:
+            for word in self._keys[other]:
+                candidate = (edit_distance(plain, strip_accents(word)), self._rank[word], word)
+                if best is None or candidate < best:
+                    best = candidate
+
+        # Sounding alike is not enough: the spelling must stay close too, closer
+        # for words that only sound nearly alike
+        limit = max(3, len(token) * 4 // 5) if same_key else max(2, len(token) // 3)
+        if best is None or best[0] > limit:
+            return None
+        # "contentes" is not a misspelling of "contente", nor "louvre" of "ouvre"
+        if inflection_of(token, best[2]) or phonetic_key(best[2])[:1] != key[:1]:
+            return None
+        return best[2]
+
+    def repair(self, text):
+        """
+        Replace the misspelled words of text by the words they sound like, in lowercase.
+        Capitalized words inside a sentence are taken for proper nouns and left alone.
+        Returns the repaired text and the corrections made, as {"error", "corrected"}
+        dicts in lowercase (one per distinct misspelling, in order of appearance).
+        """
+        corrections = []
+        # {part: its suggestion or None}, so a repeated misspelling is looked up once
+        suggestions = {}
+        # End of the previous token: only the text since then is looked at, keeping repair linear
+        previous_end = 0
+
+        def repair_token(match):
+            nonlocal previous_end
+            token = match.group()
+            gap = text[previous_end:match.start()].rstrip()
+            # Last character before the token that is not a space ("" at the start of the text)
+            before = gap[-1:] if gap or not previous_end else text[previous_end - 1]
+            previous_end = match.end()
+            if token[0].isupper() and before not in _SENTENCE_ENDS:
+                return token
+            if self.is_known(token.lower()):
+                return token
+
+            parts = _TOKEN_SEPARATORS.split(token.lower())
+            repaired = False
+            for index in range(0, len(parts), 2):
+                if parts[index] not in suggestions:
+                    suggestions[parts[index]] = self.suggest(parts[index])
+                    if suggestions[parts[index]]:
+                        corrections.append({"error": parts[index], "corrected": suggestions[parts[index]]})
+                suggestion = suggestions[parts[index]]
+                if suggestion:
+                    parts[index] = suggestion
+                    repaired = True
+            return "".join(parts) if repaired else token
+
+        return _TOKEN.sub(repair_token, text), corrections
@@ -0,0 +1,244 @@
+"""
+Word-level pronunciation scoring.
+
+Whisper's word timestamps locate each word in the decoded clip. The slice of
+every word is compared with a reference pronunciation of the word, synthesized
+by the TTS service, by dynamic time warping (DTW) over MFCC frames: the lower
+the alignment cost, the closer the learner's word is to the reference. The DTW
+recurrence is evaluated one anti-diagonal at a time, each diagonal as a single
+NumPy operation, within a band around the diagonal.
+
+Scoring has CPU and wall-clock budgets proportional to the length of the
+clip: once the scoring thread has spent either, the remaining words are
+returned without a score. References are never synthesized while a clip is
+scored: a word whose reference is not cached yet goes unscored and is
+synthesized on a background thread, for the next clips to use.
+"""
+
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+from src.audio import SAMPLE_RATE, decode_audio
+
+logger = logging.getLogger(__name__)
+
+# MFCC framing for words: 25 ms windows every 10 ms
+N_FFT = 400
+HOP_LENGTH = 160
+N_MELS = 40
+N_MFCC = 13
+
+# Longer frame sequences are subsampled to this many frames before alignment
+MAX_FRAMES = 100
+
+# Sakoe-Chiba band: how far (as a fraction of the longer sequence) a path may leave the diagonal
+DEFAULT_BAND = 0.25
+
+# Seconds of audio kept on each side of a word (timestamps are approximate)
+WORD_PADDING = 0.05
+
+# Words shorter than this (seconds, before padding) are not scored
+MIN_WORD_SECONDS = 0.08
+
+# CPU seconds of scoring allowed per second of audio
+DEFAULT_CPU_BUDGET = 0.15
+
+# Wall-clock seconds of scoring allowed per second of audio (decoding references runs ffmpeg)
+DEFAULT_WALL_BUDGET = 0.3
+
+# Alignment distance that scores 50 out of 100
+SCORE_HALF_DISTANCE = 2.0
+
+# Reference pronunciations kept in memory
+DEFAULT_CACHE_ENTRIES = 1024
+
+# Words waiting for their reference to be synthesized in the background; more are dropped
+MAX_PENDING_REFERENCES = 256
+
+
+def normalize_frames(frames):
+    """
+    Cepstral mean and variance normalization of frames (frames × coefficients),
+    so that loudness and recording channel do not count, then subsampling to MAX_FRAMES.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    frames = frames - frames.mean(axis=0)
+    std = frames.std(axis=0)
+    frames = frames / np.where(std > 1e-8, std, 1.0)
+    if len(frames) > MAX_FRAMES:
+        frames = frames[np.linspace(0, len(frames) - 1, MAX_FRAMES).round().astype(int)]
+    return frames
+
+
+def mfcc_frames(audio, sr=SAMPLE_RATE):
+    """
+    Normalized MFCC frames of a short clip, without the energy coefficient.
+    """
+    import librosa
+
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < N_FFT:
+        audio = np.pad(audio, (0, N_FFT - len(audio)))
+    mfcc = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=N_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS)
+    return normalize_frames(mfcc[1:].T)
+
+
+def dtw_distance(a, b, band=DEFAULT_BAND):
+    """
+    DTW alignment cost of frame sequences a (n × d) and b (m × d) with Euclidean
+    frame distances, divided by n + m. band limits the path to a Sakoe-Chiba band
+    (None for no limit).
+    """
+    n, m = len(a), len(b)
+    if not n or not m:
+        return math.inf
+
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    if band is not None and n > 1 and m > 1:
+        slope = (m - 1) / (n - 1)
+        # Wide enough for consecutive rows to overlap, so a path always exists
+        radius = max(band * max(n, m), slope + 1)
+        offset = np.abs(np.arange(n)[:, None] * slope - np.arange(m)[None, :])
+        cost = np.where(offset <= radius, cost, np.inf)
+
+    # acc[i + 1, j + 1] is the cost of the best path from (0, 0) to (i, j). The cells of
+    # anti-diagonal k (i + j = k) only depend on diagonals k - 1 and k - 2, so each
+    # diagonal is computed at once.
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for k in range(n + m - 1):
+        i = np.arange(max(0, k - m + 1), min(k, n - 1) + 1)
+        j = k - i
+        acc[i + 1, j + 1] = cost[i, j] + np.minimum(np.minimum(acc[i, j + 1], acc[i + 1, j]), acc[i, j])
+    return float(acc[n, m] / (n + m))
+
+
+def distance_to_score(distance):
+    """
+    Map an alignment distance to a score out of 100 (100 for identical frames).
+    """
+    if not math.isfinite(distance):
+        return 0
+    return int(round(100 * 2 ** (-distance / SCORE_HALF_DISTANCE)))
+
+
+class PronunciationScorer:
+    """
+    Scores the words of a clip against reference pronunciations synthesized by a TTSService.
+    """
+
+    def __init__(self, tts, cpu_budget=DEFAULT_CPU_BUDGET, band=DEFAULT_BAND, cache_size=DEFAULT_CACHE_ENTRIES,
+                 wall_budget=DEFAULT_WALL_BUDGET):
+        self.tts = tts
+        self.cpu_budget = cpu_budget
+        self.wall_budget = wall_budget
+        self.band = band
+        self.cache_size = cache_size
+
+        self._references = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Words whose reference is synthesized by the background thread
+        self._pending = queue.Queue(maxsize=MAX_PENDING_REFERENCES)
+        self._queued = set()
+        self._synthesizer_pid = None
+
+    def frames(self, audio, sr=SAMPLE_RATE):
+        return mfcc_frames(audio, sr)
+
+    def reference(self, word, synthesize=False):
+        """
+        Frames of the reference pronunciation of word, or None when there is none.
+        Synthesized audio is cached on disk by the TTS service and its frames in memory here.
+        Without synthesize, only cached audio is used and a missing reference is queued
+        for synthesis in the background instead.
+        """
+        with self._lock:
+            if word in self._references:
+                self._references.move_to_end(word)
+                return self._references[word]
+
+        if synthesize:
+            path, _ = self.tts.to_file(word, lang="fr")
+        else:
+            path = self.tts.cached_file(word, lang="fr")
+            if not path:
+                self._synthesize_later(word)
+        if not path:
+            return None
+        frames = self.frames(decode_audio(path))
+
+        with self._lock:
+            self._references[word] = frames
+            while len(self._references) > self.cache_size:
+                self._references.popitem(last=False)
+        return frames
+
+    def prefetch(self, words):
+        """
+        Synthesize and load the references of words now (e.g. the words of an exercise).
+        """
+        for word in words:
+            self.reference(word, synthesize=True)
+
+    def _synthesize_later(self, word):
+        with self._lock:
+            if word in self._queued:
+                return
+            try:
+                self._pending.put_nowait(word)
+            except queue.Full:
+                return
+            self._queued.add(word)
+            # One thread per process: a forked worker starts its own
+            start = self._synthesizer_pid != os.getpid()
+            self._synthesizer_pid = os.getpid()
+        if start:
+            threading.Thread(target=self._synthesize_forever, name="pronunciation-references", daemon=True).start()
+
+    def _synthesize_forever(self):
+        while True:
+            word = self._pending.get()
+            try:
+                self.reference(word, synthesize=True)
+            except Exception as e:
+                logger.warning("Could not prepare the reference pronunciation of %r: %s", word, e)
+            finally:
+                with self._lock:
+                    self._queued.discard(word)
+                self._pending.task_done()
+
+    def score(self, audio, words, sr=SAMPLE_RATE):
+        """
+        Score words, a list of {"word", "expected", "start", "end"} dicts (times in seconds
+        into audio, expected being the word the learner meant to say). Returns copies of
+        the dicts with a "score" out of 100, or None for words that were too short, have no
+        reference yet, or came after the budget ran out (cpu_budget CPU seconds or wall_budget
+        seconds per second of audio).
+        """
+        duration = len(audio) / sr
+        started = time.thread_time()
+        deadline = time.monotonic() + self.wall_budget * duration
+
+        scored = []
+        for word in words:
+            entry = dict(word, score=None)
+            scored.append(entry)
+            if time.thread_time() - started > self.cpu_budget * duration or time.monotonic() > deadline:
+                continue
+
+            if word["end"] - word["start"] < MIN_WORD_SECONDS:
+                continue
+            start = max(0, int((word["start"] - WORD_PADDING) * sr))
+            end = min(len(audio), int((word["end"] + WORD_PADDING) * sr))
+            reference = self.reference(word["expected"])
+            if reference is None:
+                continue
+            entry["score"] = distance_to_score(dtw_distance(self.frames(audio[start:end], sr), reference, self.band))
+        return scored
@@ -0,0 +1,180 @@
+"""
+Memoization of text analysis results.
+
+The same sentences are submitted again and again (the demo sentences, class
+exercises), so analyze_text results are cached under a key made of the text,
+the speaker gender, the analysis mode and the rule table version. Editing the
+rules therefore invalidates every cached result automatically.
+
+Results live in a bounded in-memory LRU with a time to live. An optional
+SQLite file shares them between the worker processes of one machine: a miss
+in memory is looked up there before the analysis runs again. Writers purge
+the file of expired rows every minute and keep it to a bounded number of
+rows, dropping the oldest first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Bump when the layout of cached results changes
+CACHE_FORMAT = 1
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL = 3600
+
+# Rows kept in the SQLite file
+DEFAULT_MAX_ROWS = 100000
+
+# Seconds between two purges of the SQLite file by one process
+PURGE_INTERVAL = 60
+
+
+def normalize_text(text):
+    """
+    Normalize text the way it is keyed. Errors carry character offsets into the
+    text, so only trailing whitespace (which no error can cover) is dropped.
+    """
+    return text.rstrip()
+
+
+def make_key(text, speaker_gender, mode, rules_version):
+    """
+    Return the cache key of one analysis.
+    """
+    payload = "\0".join([str(CACHE_FORMAT), rules_version, mode, speaker_gender, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of JSON-serializable results, optionally backed by SQLite.
+    Values are stored serialized, so every get() returns a fresh copy the caller may modify.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, path=None, max_rows=DEFAULT_MAX_ROWS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_rows = max_rows
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._connection = None
+        self._connection_pid = None
+        self._next_purge = 0.0
+        if path:
+            with self._lock:
+                self._purge(time.time())
+
+    @property
+    def _db(self):
+        """
+        The SQLite connection of this process (None without a path). A connection
+        must not cross fork(), so forked server workers open their own.
+        """
+        if not self.path:
+            return None
+        if self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_expires ON results (expires)")
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        """
+        Return the cached value of key, or None.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[1])
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM results WHERE key = ? AND expires >= ?",
+                                       (key, now)).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.shared_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Cache value (JSON-serializable) under key for ttl seconds.
+        """
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        expires = now + self.ttl
+        with self._lock:
+            self._remember(key, serialized, expires)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                                 (key, serialized, expires))
+                self._db.commit()
+                if now >= self._next_purge:
+                    self._purge(now)
+
+    def _purge(self, now):
+        """
+        Delete the expired rows of the SQLite file, then the oldest rows beyond max_rows.
+        Call with the lock held.
+        """
+        self._db.execute("DELETE FROM results WHERE expires < ?", (now,))
+        excess = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_rows
+        if excess > 0:
+            # Rows expire ttl seconds after they are written: the first to expire are the oldest
+            self._db.execute("DELETE FROM results WHERE key IN "
+                             "(SELECT key FROM results ORDER BY expires LIMIT ?)", (excess,))
+        self._db.commit()
+        self._next_purge = now + PURGE_INTERVAL
+
+    def _remember(self, key, serialized, expires):
+        """
+        Store an entry in memory and evict the least recently used ones. Call with the lock held.
+        """
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (expires, serialized)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Return the cache counters.
+        """
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries)
+        }
@@ -0,0 +1,264 @@
+"""
+Declarative French correction rules and the single-pass engine that applies them.
+
+Every rule is a plain dict with a regex pattern, a replacement template,
+a speaker gender condition (None means the rule applies to every speaker)
+and the French explanation shown to the learner. The rules are compiled
+once into a single alternation per speaker gender, so a text is scanned
+left to right exactly once no matter how many rules are in the table.
+
+Determiner–noun and être–participle agreement is not written as rules: it is
+checked for every word of the inflection lexicon by src.agreement.
+"""
+
+import bisect
+import hashlib
+import json
+import re
+
+from src.agreement import AgreementChecker
+from src.inflections import DEFAULT_INFLECTIONS_PATH, InflectionLexicon
+
+GENDERS = ("masculine", "feminine")
+
+# Order matters: when two rules match at the same position, the first one wins.
+# Gender and number agreement ("un pomme", "les chat", "je suis né") is left to
+# src.agreement, which knows every noun and adjective of the inflection lexicon.
+RULES = [
+    # 1. Contractions avec les prépositions
+    {
+        "id": "contraction_a_le",
+        "pattern": r"\bà\s+le\b",
+        "replacement": "au",
+        "gender": None,
+        "message": "Contraction obligatoire : 'à le' devient 'au'."
+    },
+    {
+        "id": "contraction_a_les",
+        "pattern": r"\bà\s+les\b",
+        "replacement": "aux",
+        "gender": None,
+        "message": "Contraction obligatoire : 'à les' devient 'aux'."
+    },
+    {
+        "id": "contraction_de_le",
+        "pattern": r"\bde\s+le\b",
+        "replacement": "du",
+        "gender": None,
+        "message": "Contraction obligatoire : 'de le' devient 'du'."
+    },
+    {
+        "id": "contraction_de_les",
+        "pattern": r"\bde\s+les\b",
+        "replacement": "des",
+        "gender": None,
+        "message": "Contraction obligatoire : 'de les' devient 'des'."
+    },
+    # 2. Élision avec à + école
+    {
+        "id": "elision_ecole",
+        "pattern": r"\b[aà]\s+école\b",
+        "replacement": "à l'école",
+        "gender": None,
+        "message": "Utiliser 'à l'' devant les mots commençant par une voyelle."
+    },
+    # 3. Accord des adjectifs au pluriel (chats are masculine, so "mignons")
+    {
+        "id": "pluriel_mignons",
+        "pattern": r"\bsont mignon(?:ne)?s?\b",
+        "replacement": "sont mignons",
+        "gender": None,
+        "message": "Accord de l'adjectif : le masculin pluriel utilise 'mignons'."
+    },
+    # 4. Conjugaison des verbes
+    {
+        "id": "conjugaison_mangeons",
+        "pattern": r"\bnous mange\b",
+        "replacement": "nous mangeons",
+        "gender": None,
+        "message": "Conjugaison : 'mange' doit être 'mangeons' avec 'nous'."
+    },
+    # 5. Préposition
+    {
+        "id": "preposition_cantine",
+        "pattern": r"\bdans la cantine\b",
+        "replacement": "à la cantine",
+        "gender": None,
+        "message": "Préposition : utiliser 'à' et non 'dans' avec 'la cantine'."
+    },
+    # 6. Erreurs sémantiques de genre (phrases illogiques)
+    {
+        "id": "semantique_elle_fille",
+        "pattern": r"\bil est une\b(?=.*\bfille\b)",
+        "replacement": "Elle est une",
+        "gender": None,
+        "message": "Erreur sémantique : utiliser 'elle' pour parler d'une fille."
+    },
+    {
+        "id": "semantique_il_garcon",
+        "pattern": r"\belle est un\b(?=.*\bgarçon\b)",
+        "replacement": "Il est un",
+        "gender": None,
+        "message": "Erreur sémantique : utiliser 'il' pour parler d'un garçon."
+    },
+    # 7. Accord du participe passé de "aller" pour le locuteur
+    # Every written form is matched; hits that are already correct are dropped by scan()
+    {
+        "id": "participe_allee",
+        "pattern": r"\bje suis\s+(?:aller|alle|allé|allée|allés|allées|allee)\b",
+        "replacement": "je suis allée",
+        "gender": "feminine",
+        "message": "Accord du participe passé : utiliser 'allée' pour une locutrice avec être."
+    },
+    {
+        "id": "participe_alle",
+        "pattern": r"\bje suis\s+(?:aller|alle|allé|allée|allés|allées|allee)\b",
+        "replacement": "je suis allé",
+        "gender": "masculine",
+        "message": "Accord du participe passé : utiliser 'allé' pour un locuteur masculin avec être."
+    },
+]
+
+
+def _normalize_phrase(phrase):
+    """
+    Fold case and whitespace so a hit that only restates the text can be recognized.
+    """
+    return " ".join(phrase.split()).lower()
+
+
+def merge_hits(primary, secondary):
+    """
+    Merge two lists of hits into one list sorted by position without overlaps.
+    primary hits (the rule engine's) always win; a secondary hit overlapping
+    a kept hit is dropped.
+    """
+    merged = sorted(primary, key=lambda hit: hit["start"])
+    starts = [hit["start"] for hit in merged]
+
+    for hit in sorted(secondary, key=lambda hit: (hit["start"], hit["end"])):
+        index = bisect.bisect_right(starts, hit["start"])
+        overlaps_previous = index > 0 and merged[index - 1]["end"] > hit["start"]
+        overlaps_next = index < len(merged) and merged[index]["start"] < hit["end"]
+        if overlaps_previous or overlaps_next:
+            continue
+        merged.insert(index, hit)
+        starts.insert(index, hit["start"])
+
+    return merged
+
+
+def normalize_gender(speaker_gender):
+    """
+    Map the speaker gender sent by the client onto one of GENDERS (masculine by default).
+    """
+    return "feminine" if (speaker_gender or "").lower() == "feminine" else "masculine"
+
+
+def rules_version(rules):
+    """
+    Fingerprint of a rule table: changes whenever a rule is added, removed, reordered or edited.
+    """
+    fields = [[rule["id"], rule["pattern"], rule["replacement"], rule["gender"], rule["message"]] for rule in rules]
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class RuleEngine:
+    """
+    Compiles a rule table into one regex alternation per speaker gender and
+    applies it in a single left-to-right scan, followed by the agreement checks.
+    """
+
+    def __init__(self, rules=None, inflections_path=DEFAULT_INFLECTIONS_PATH):
+        """
+        inflections_path is the binary inflection lexicon of the agreement checks
+        (see src.inflections); None leaves agreement to the rule table alone.
+        """
+        self.rules = []
+        for rule in (RULES if rules is None else rules):
+            rule = dict(rule)
+            rule["regex"] = re.compile(rule["pattern"], flags=re.IGNORECASE)
+            # Only templated replacements need the rule's own groups re-read
+            rule["templated"] = "\\" in rule["replacement"]
+            self.rules.append(rule)
+
+        # Results computed with another rule table must not be reused (see ResultCache)
+        self.version = rules_version(self.rules)
+
+        # The inflection lexicon is also the list of correct forms of the transcription repair
+        self.inflections = self.agreement = None
+        if inflections_path:
+            self.inflections = InflectionLexicon(inflections_path)
+            self.agreement = AgreementChecker(self.inflections)
+            self.version = hashlib.sha256(f"{self.version}:{self.inflections.digest}".encode("utf-8")).hexdigest()[:16]
+
+        self._combined = {gender: self._compile(gender) for gender in GENDERS}
+
+    def _compile(self, gender):
+        """
+        Build the alternation of every rule active for the given speaker gender.
+        Each rule is wrapped in a named group r<index> so a hit maps back to its rule.
+        """
+        alternatives = [f"(?P<r{index}>{rule['pattern']})"
+                        for index, rule in enumerate(self.rules)
+                        if rule["gender"] in (None, gender)]
+        if not alternatives:
+            # A pattern that never matches keeps scan() free of special cases
+            return re.compile(r"(?!)")
+        return re.compile("|".join(alternatives), flags=re.IGNORECASE)
+
+    def scan(self, text, speaker_gender="masculine"):
+        """
+        Return the hits of text, one per rule match or agreement error, sorted by
+        position and without overlaps (rule matches win). start/end are offsets
+        into text. Matches whose replacement is the text already written
+        (e.g. 'sont mignons') are not errors and are skipped.
+        """
+        gender = normalize_gender(speaker_gender)
+        hits = list(self._scan_rules(text, gender))
+        if self.agreement is None:
+            return hits
+        return merge_hits(hits, self.agreement.scan(text, "f" if gender == "feminine" else "m"))
+
+    def _scan_rules(self, text, gender):
+        for match in self._combined[gender].finditer(text):
+            rule = self.rules[int(match.lastgroup[1:])]
+            replacement = rule["replacement"]
+            if rule["templated"]:
+                replacement = rule["regex"].match(text, match.start()).expand(replacement)
+            if _normalize_phrase(replacement) == _normalize_phrase(match.group()):
+                continue
+
+            yield {
+                "rule_id": rule["id"],
+                "source": "rules",
+                "start": match.start(),
+                "end": match.end(),
+                "error": match.group(),
+                "replacement": replacement,
+                "suggestions": [replacement],
+                "message": rule["message"]
+            }
+
+    def apply(self, text, speaker_gender="masculine"):
+        """
+        Return text with every rule hit replaced.
+        """
+        return self.rewrite(text, self.scan(text, speaker_gender))
+
+    @staticmethod
+    def rewrite(text, hits):
+        """
+        Replace the spans of already computed hits (sorted, non-overlapping) in text.
+        Hits without a replacement are reported errors only and leave the text unchanged.
+        """
+        pieces = []
+        position = 0
+        for hit in hits:
+            if hit["replacement"] is None:
+                continue
+            pieces.append(text[position:hit["start"]])
+            pieces.append(hit["replacement"])
+            position = hit["end"]
+        pieces.append(text[position:])
+        return "".join(pieces)
@@ -0,0 +1,60 @@
+"""
+Sentence segmentation of French text, with character offsets.
+
+Long texts are analyzed sentence by sentence: each sentence is checked on its
+own (so a rule cannot match across two sentences), sentences are cached
+individually, and only the sentences that changed are analyzed again.
+"""
+
+import re
+
+# Closing quotes and brackets kept with the sentence they end (French puts a space before »)
+_CLOSING = "\"'»”’)]"
+
+# End of a sentence: final punctuation (and closing quotes or brackets) before
+# whitespace or the end of the text, or a line break
+_SENTENCE_END = re.compile(r"[.!?…]+(?:[ \u00a0\u202f]*[" + re.escape(_CLOSING) + r"])*(?=\s|$)|\n")
+
+_LAST_WORD = re.compile(r"(\w+)$")
+
+# Abbreviations whose period does not end the sentence (compared in lowercase)
+ABBREVIATIONS = {
+    "m", "mm", "mme", "mmes", "mlle", "mlles", "dr", "pr", "st", "ste",
+    "etc", "ex", "cf", "env", "av", "bd", "vol", "chap", "éd", "fig", "tél", "p"
+}
+
+
+def _is_abbreviation(text, period):
+    """
+    Tell whether the period at index period closes an abbreviation or an initial.
+    """
+    word = _LAST_WORD.search(text, 0, period)
+    if not word:
+        return False
+    word = word.group(1)
+    return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+
+def split_sentences(text):
+    """
+    Split text into sentences. Returns (start, end) offsets into text, without
+    the surrounding whitespace; text[start:end] is the sentence.
+    """
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if match.group().rstrip(_CLOSING + " \u00a0\u202f") == "." and _is_abbreviation(text, match.start()):
+            continue
+        _append_span(spans, text, start, match.end())
+        start = match.end()
+    _append_span(spans, text, start, len(text))
+    return spans
+
+
+def _append_span(spans, text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        spans.append((start, end))
@@ -0,0 +1,228 @@
+"""
+Incremental transcription of audio streamed in chunks, for live speaking practice.
+
+The client sends short chunks of 16 kHz mono PCM while the learner speaks.
+Each session re-decodes a sliding window of not-yet-committed audio with
+Whisper (word timestamps on) once enough new audio has arrived. Words that
+two successive hypotheses agree on are considered stable ("local agreement"):
+they are committed, and the audio up to the end of the last committed word
+is dropped from the window. The committed text is passed back to Whisper as
+the prompt, so the window stays short without losing context.
+"""
+
+import threading
+import time
+import uuid
+import numpy as np
+
+from src.audio import SAMPLE_RATE
+from src.metrics import timed
+
+# Seconds of new audio required before the window is decoded again
+DEFAULT_STEP = 1.0
+
+# Seconds of uncommitted audio after which words are committed even without agreement
+DEFAULT_MAX_WINDOW = 15.0
+
+# Longest recording a session accepts, in seconds
+DEFAULT_MAX_DURATION = 300.0
+
+# Seconds of inactivity after which a session is dropped
+DEFAULT_SESSION_TTL = 120.0
+
+# Number of committed words given to Whisper as the prompt
+PROMPT_WORDS = 50
+
+
+def pcm16_to_float32(data):
+    """
+    Convert little-endian 16-bit PCM bytes to float32 samples in [-1, 1].
+    """
+    return np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _normalize_word(word):
+    return word.strip().strip(".,!?;:«»\"'").lower()
+
+
+class StreamingSession:
+    """
+    Transcription state of one live recording. Not thread-safe on its own:
+    StreamManager hands out sessions and callers hold session.lock.
+    """
+
+    def __init__(self, transcriber, speaker_gender="masculine", step=DEFAULT_STEP,
+                 max_window=DEFAULT_MAX_WINDOW, max_duration=DEFAULT_MAX_DURATION):
+        self.id = uuid.uuid4().hex
+        self.transcriber = transcriber
+        self.speaker_gender = speaker_gender
+        self.step = step
+        self.max_window = max_window
+        self.max_duration = max_duration
+
+        self.lock = threading.Lock()
+        self.last_activity = time.time()
+
+        # Every chunk received, for the final analysis of the whole recording
+        self._recording = []
+        self.duration = 0.0
+
+        # Uncommitted audio, the seconds of recording before it, and the words of
+        # the previous hypothesis over it
+        self._window = np.zeros(0, dtype=np.float32)
+        self._window_start = 0.0
+        self._new_samples = 0
+        self._previous = []
+
+        self.committed = []
+        # Committed words with their times in the recording: {"word", "start", "end"}
+        self.word_timings = []
+        self.unstable = []
+        self.finished = False
+
+        # Latest corrections of the stable text, kept by the caller between chunks
+        self.analysis = None
+
+    @property
+    def stable_text(self):
+        return " ".join(self.committed)
+
+    @property
+    def unstable_text(self):
+        return " ".join(self.unstable)
+
+    def add_chunk(self, samples):
+        """
+        Append samples and re-decode the window when at least `step` seconds are new.
+        Returns True when the transcript was updated.
+        """
+        if self.finished:
+            raise ValueError("session already finished")
+        if self.duration + len(samples) / SAMPLE_RATE > self.max_duration:
+            raise ValueError(f"recording longer than {self.max_duration:.0f} s")
+
+        self.last_activity = time.time()
+        self._recording.append(samples)
+        self.duration += len(samples) / SAMPLE_RATE
+        self._window = np.concatenate([self._window, samples])
+        self._new_samples += len(samples)
+
+        if self._new_samples < self.step * SAMPLE_RATE:
+            return False
+        self._new_samples = 0
+        self._update()
+        return True
+
+    def finish(self):
+        """
+        Decode what is left, commit every word and return the whole recording.
+        """
+        self.last_activity = time.time()
+        if not self.finished and len(self._window) > SAMPLE_RATE // 10:
+            self._commit(self._decode())
+        self.unstable = []
+        self.finished = True
+        return np.concatenate(self._recording) if self._recording else np.zeros(0, dtype=np.float32)
+
+    def _decode(self):
+        """
+        Transcribe the window and return its words as (word, start, end) tuples.
+        """
+        with timed("whisper"):
+            result = self.transcriber.transcribe(
+                self._window,
+                word_timestamps=True,
+                initial_prompt=" ".join(self.committed[-PROMPT_WORDS:]) or None,
+                condition_on_previous_text=False)
+
+        words = []
+        for segment in result.get("segments", []):
+            for word in segment.get("words", []):
+                if word["word"].strip():
+                    words.append((word["word"].strip(), word["start"], word["end"]))
+        return words
+
+    def _update(self):
+        hypothesis = self._decode()
+
+        # Local agreement: the common prefix of two successive hypotheses is stable
+        agreed = 0
+        while (agreed < min(len(hypothesis), len(self._previous))
+               and _normalize_word(hypothesis[agreed][0]) == _normalize_word(self._previous[agreed][0])):
+            agreed += 1
+
+        if not agreed and len(self._window) > self.max_window * SAMPLE_RATE:
+            # No agreement for too long: keep only the last word open
+            agreed = max(len(hypothesis) - 1, 0)
+            if not hypothesis:
+                # Nothing but silence: drop all but the last step of audio
+                kept = int(self.step * SAMPLE_RATE)
+                self._window_start += max(len(self._window) - kept, 0) / SAMPLE_RATE
+                self._window = self._window[-kept:]
+
+        cut = self._commit(hypothesis[:agreed])
+        self._previous = [(word, start - cut, end - cut) for word, start, end in hypothesis[agreed:]]
+        self.unstable = [word for word, _, _ in self._previous]
+
+    def _commit(self, words):
+        """
+        Commit words and drop the audio they cover. Returns the seconds dropped.
+        """
+        if not words:
+            return 0.0
+        self.committed.extend(word for word, _, _ in words)
+        self.word_timings.extend({"word": word, "start": self._window_start + start, "end": self._window_start + end}
+                                 for word, start, end in words)
+        cut = words[-1][2]
+        self._window = self._window[int(cut * SAMPLE_RATE):]
+        self._window_start += int(cut * SAMPLE_RATE) / SAMPLE_RATE
+        return cut
+
+
+class StreamManager:
+    """
+    Keeps the live sessions, bounded in number and dropped after inactivity.
+    """
+
+    def __init__(self, transcriber, max_sessions=16, session_ttl=DEFAULT_SESSION_TTL, id_prefix="",
+                 **session_options):
+        self.transcriber = transcriber
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        # Prepended to session ids, e.g. to tell which server process owns a session
+        self.id_prefix = id_prefix
+        self.session_options = session_options
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, speaker_gender="masculine"):
+        """
+        Open a session. Returns None when max_sessions are already open.
+        """
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = StreamingSession(self.transcriber, speaker_gender=speaker_gender, **self.session_options)
+            session.id = self.id_prefix + session.id
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def _expire(self):
+        """
+        Drop idle sessions. Must be called with the lock held.
+        """
+        cutoff = time.time() - self.session_ttl
+        for session_id in [session_id for session_id, session in self._sessions.items()
+                           if session.last_activity < cutoff]:
+            del self._sessions[session_id]
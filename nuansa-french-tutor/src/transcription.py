@@ -0,0 +1,209 @@
+"""
+Micro-batching transcription service around a Whisper model.
+
+Concurrent requests are collected for a short window (a few tens of
+milliseconds), their log-mel spectrograms are padded to Whisper's 30-second
+input and stacked, and the whole batch is decoded in one forward pass. Each
+caller then receives its own result. On CPU this raises throughput under
+load, since one batched pass is cheaper than the same passes run one by one.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent collecting requests after the first one arrives
+DEFAULT_BATCH_WINDOW = 0.03
+
+# Maximum number of clips decoded together
+DEFAULT_MAX_BATCH = 8
+
+
+def parse_cpu_list(spec):
+    """
+    Parse a CPU list such as "0-3,6" (the taskset/cgroup syntax) into a sorted list of CPU ids.
+    """
+    cpus = set()
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+class BatchingTranscriber:
+    """
+    Serializes access to a Whisper model and decodes concurrent requests together.
+    model_loader is called (once, from the worker thread) to get the model,
+    so the model stays lazily loaded.
+    cpu_affinity, a list of CPU ids, pins the decoding thread (and the torch
+    threads it starts) to those of them available to the process, away from
+    the request threads.
+    """
+
+    def __init__(self, model_loader, language="fr", window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH,
+                 cpu_affinity=None):
+        self.model_loader = model_loader
+        self.language = language
+        self.window = window
+        self.max_batch = max_batch
+        self.cpu_affinity = cpu_affinity
+
+        self.batches = 0
+        self.batched_clips = 0
+        # Transcriptions submitted and not finished yet
+        self.pending = 0
+        self._pending_lock = threading.Lock()
+
+        self._requests = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe a clip (float32 samples at 16 kHz, or a path decoded with ffmpeg).
+        Blocks until the result is ready and returns a dict with at least 'text'.
+        Extra options (e.g. word_timestamps, initial_prompt) are passed to
+        model.transcribe; such requests run on the same worker but are not batched.
+        """
+        future = Future()
+        with self._pending_lock:
+            self.pending += 1
+        try:
+            self._requests.put((audio, options, future))
+            # After queuing: a worker that stops from now on fails this request or is replaced
+            self._ensure_worker()
+            return future.result()
+        finally:
+            with self._pending_lock:
+                self.pending -= 1
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        try:
+            if self.cpu_affinity:
+                self._pin_to_cpus()
+            self._serve()
+        except Exception as e:
+            # Never leave callers blocked on a dead worker: fail the waiting requests,
+            # and let the next transcription start a new worker
+            logger.exception("Transcription worker stopped")
+            with self._start_lock:
+                self._worker = None
+            self._fail_queued(e)
+
+    def _serve(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _fail_queued(self, error):
+        while True:
+            try:
+                _, _, future = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if not future.done():
+                future.set_exception(error)
+
+    def _pin_to_cpus(self):
+        """
+        Restrict this thread to the CPUs of cpu_affinity available to the process (on
+        Linux, affinity is per thread) and size torch's thread pool to match. CPUs that
+        cannot be used are logged and decoding runs unpinned.
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            return
+        cpus = sorted(set(self.cpu_affinity) & os.sched_getaffinity(0))
+        if not cpus:
+            logger.warning("None of the Whisper CPUs %s is available, decoding is not pinned", self.cpu_affinity)
+            return
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            logger.warning("Could not pin Whisper decoding to CPUs %s: %s", cpus, e)
+            return
+        try:
+            import torch
+            torch.set_num_threads(len(cpus))
+        except ImportError:
+            pass
+
+    def _process(self, batch):
+        import whisper
+
+        model = self.model_loader()
+
+        short_clips = []
+        for audio, options, future in batch:
+            if isinstance(audio, str):
+                audio = whisper.load_audio(audio)
+            if options or len(audio) > whisper.audio.N_SAMPLES:
+                # Longer than one 30 s window (needs Whisper's sliding long-form decoding)
+                # or asking for timestamps/prompts: decode on its own
+                future.set_result(model.transcribe(audio, language=self.language, **options))
+            else:
+                short_clips.append((audio, future))
+
+        if short_clips:
+            for (_, future), result in zip(short_clips, self._decode_batch(model, [audio for audio, _ in short_clips])):
+                future.set_result(result)
+
+    def _decode_batch(self, model, clips):
+        """
+        Decode clips of at most 30 s in a single batched forward pass.
+        """
+        import torch
+        import whisper
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=model.dims.n_mels)
+            for audio in clips
+        ]).to(model.device)
+
+        options = whisper.DecodingOptions(language=self.language, without_timestamps=True,
+                                          fp16=model.device.type == "cuda")
+        results = whisper.decode(model, mels, options)
+
+        self.batches += 1
+        self.batched_clips += len(clips)
+        return [{"text": result.text, "language": result.language} for result in results]
+
+    def stats(self):
+        """
+        Return the number of batches decoded, the average batch size and the pending transcriptions.
+        """
+        return {
+            "pending": self.pending,
+            "batches": self.batches,
+            "clips": self.batched_clips,
+            "average_batch_size": round(self.batched_clips / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,298 @@
+"""
+Text-to-speech backends and the service that picks one of them.
+
+Each backend turns text into audio bytes. TTSService tries the configured
+backends in order, caches what they produce (see src.tts_cache) and skips a
+backend for a cool-down period after it fails, so an unreachable network
+service costs one timeout instead of one per request.
+
+Audio can also be streamed: the chunks a backend produces (gTTS synthesizes
+long text part by part) are passed on as they arrive, from memory, and the
+complete audio is cached once the last chunk is out.
+"""
+
+import hashlib
+import io
+import logging
+import math
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import wave
+
+from src.tts_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+# Seconds a single synthesis may take before the backend is considered failed
+DEFAULT_TIMEOUT = 10
+
+# Seconds a failed backend is skipped before it is tried again
+DEFAULT_COOLDOWN = 30
+
+# Size of the blocks in which cached audio is streamed
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class TTSError(Exception):
+    """
+    Raised when a backend cannot synthesize the requested text.
+    """
+
+
+class TTSBackend:
+    """
+    Base class of the speech synthesizers. Subclasses implement synthesize().
+    """
+
+    name = "base"
+    extension = "mp3"
+    mimetype = "audio/mpeg"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def is_available(self):
+        """
+        Tell whether the backend can run on this machine.
+        """
+        return True
+
+    def synthesize(self, text, lang="fr", slow=False):
+        """
+        Return the audio bytes for text.
+        """
+        raise NotImplementedError
+
+    def stream(self, text, lang="fr", slow=False):
+        """
+        Yield the audio in chunks as soon as they are ready.
+        Backends that cannot do better produce a single chunk.
+        """
+        yield self.synthesize(text, lang=lang, slow=slow)
+
+    def save(self, text, path, lang="fr", slow=False):
+        """
+        Write the audio for text to path.
+        """
+        with open(path, "wb") as f:
+            for chunk in self.stream(text, lang=lang, slow=slow):
+                f.write(chunk)
+
+
+class GTTSBackend(TTSBackend):
+    """
+    Google Text-to-Speech (network, mp3).
+    """
+
+    name = "gtts"
+
+    def _make_tts(self, text, lang, slow):
+        from gtts import gTTS
+        return gTTS(text, lang=lang, slow=slow, timeout=self.timeout)
+
+    def synthesize(self, text, lang="fr", slow=False):
+        return b"".join(self.stream(text, lang=lang, slow=slow))
+
+    def stream(self, text, lang="fr", slow=False):
+        from gtts.tts import gTTSError
+
+        try:
+            # gTTS splits long text and requests each part separately
+            yield from self._make_tts(text, lang, slow).stream()
+        except gTTSError as e:
+            raise TTSError(f"gTTS: {e}") from e
+
+
+class EspeakBackend(TTSBackend):
+    """
+    eSpeak NG speech synthesizer (local and offline, wav).
+    """
+
+    name = "espeak"
+    extension = "wav"
+    mimetype = "audio/wav"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def is_available(self):
+        return self.executable is not None
+
+    def synthesize(self, text, lang="fr", slow=False):
+        if not self.executable:
+            raise TTSError("espeak: executable not found")
+
+        command = [self.executable, "-v", lang, "-s", "130" if slow else "165", "--stdout"]
+        try:
+            result = subprocess.run(command, input=text.encode("utf-8"), capture_output=True,
+                                    timeout=self.timeout, check=True)
+        except (subprocess.SubprocessError, OSError) as e:
+            raise TTSError(f"espeak: {e}") from e
+        return result.stdout
+
+
+class StubBackend(TTSBackend):
+    """
+    Deterministic offline stand-in for tests and benchmarks: a short tone
+    whose pitch and length depend only on the text (wav).
+    """
+
+    name = "stub"
+    extension = "wav"
+    mimetype = "audio/wav"
+
+    SAMPLE_RATE = 16000
+
+    def synthesize(self, text, lang="fr", slow=False):
+        digest = hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).digest()
+        frequency = 220 + digest[0] * 2
+        seconds = min(0.05 * len(text) * (1.5 if slow else 1.0), 10.0)
+        samples = int(self.SAMPLE_RATE * seconds)
+
+        frames = struct.pack(f"<{samples}h", *(
+            int(8000 * math.sin(2 * math.pi * frequency * n / self.SAMPLE_RATE)) for n in range(samples)))
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(frames)
+        return buffer.getvalue()
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, EspeakBackend, StubBackend)}
+
+
+def create_backends(names, timeout=DEFAULT_TIMEOUT):
+    """
+    Build backends from a comma-separated list of names, e.g. "gtts,espeak".
+    Backends that cannot run on this machine are left out.
+    """
+    backends = []
+    for name in [name.strip() for name in names.split(",") if name.strip()]:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown TTS backend '{name}' (expected one of {', '.join(BACKENDS)})")
+        backend = BACKENDS[name](timeout=timeout)
+        if backend.is_available():
+            backends.append(backend)
+        else:
+            logger.warning("TTS backend %s is not available on this machine, skipping it.", name)
+    return backends
+
+
+class TTSService:
+    """
+    Synthesizes speech with the first healthy backend and caches the result.
+    """
+
+    def __init__(self, backends, cache, cooldown=DEFAULT_COOLDOWN):
+        self.backends = backends
+        self.cache = cache
+        self.cooldown = cooldown
+        self._failed_until = {}
+        self._lock = threading.Lock()
+
+    def healthy_backends(self):
+        """
+        Return the backends in order, without those cooling down after a failure.
+        """
+        now = time.time()
+        with self._lock:
+            return [backend for backend in self.backends
+                    if self._failed_until.get(backend.name, 0) <= now]
+
+    def mark_failed(self, backend, error):
+        logger.warning("TTS backend %s failed (%s), skipping it for %ss.", backend.name, error, self.cooldown)
+        with self._lock:
+            self._failed_until[backend.name] = time.time() + self.cooldown
+
+    def cache_key(self, backend, text, lang="fr", slow=False):
+        return make_key(text, lang=lang, voice=backend.name, speed="slow" if slow else "normal")
+
+    def to_file(self, text, lang="fr", slow=False):
+        """
+        Return (path, backend) of a cached audio file for text, or (None, None)
+        when every backend failed.
+        """
+        for backend in self.healthy_backends():
+            key = self.cache_key(backend, text, lang=lang, slow=slow)
+            try:
+                path = self.cache.get_or_create(
+                    key, lambda path: backend.save(text, path, lang=lang, slow=slow),
+                    extension=backend.extension)
+            except Exception as e:
+                self.mark_failed(backend, e)
+                continue
+            if path:
+                return path, backend
+            self.mark_failed(backend, "empty audio")
+        return None, None
+
+    def cached_file(self, text, lang="fr", slow=False):
+        """
+        Return the path of cached audio of text from any backend, or None. Never synthesizes.
+        """
+        for backend in self.backends:
+            path = self.cache.get(self.cache_key(backend, text, lang=lang, slow=slow), backend.extension)
+            if path:
+                return path
+        return None
+
+    def stream(self, text, lang="fr", slow=False):
+        """
+        Return (chunks, backend), chunks iterating over the audio for text, or (None, None)
+        when every backend failed. Cached audio is read from its file. Otherwise the first
+        chunk is synthesized before returning, so that a failing backend is still replaced
+        by the next one, and the others are passed on as the backend produces them.
+        """
+        for backend in self.healthy_backends():
+            key = self.cache_key(backend, text, lang=lang, slow=slow)
+            path = self.cache.get(key, backend.extension)
+            if path:
+                try:
+                    return _read_chunks(open(path, "rb")), backend
+                except FileNotFoundError:
+                    # Swept in the meantime: synthesize it again
+                    pass
+
+            chunks = backend.stream(text, lang=lang, slow=slow)
+            try:
+                first = next(chunks, b"")
+            except Exception as e:
+                self.mark_failed(backend, e)
+                continue
+            if not first:
+                self.mark_failed(backend, "empty audio")
+                continue
+            return self._tee(key, backend, first, chunks), backend
+        return None, None
+
+    def _tee(self, key, backend, first, chunks):
+        """
+        Yield first and the remaining chunks, then cache the complete audio.
+        """
+        parts = [first]
+        yield first
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            # Part of the audio is already out: too late to fall back, and nothing to cache
+            self.mark_failed(backend, e)
+            return
+        self.cache.put(key, b"".join(parts), extension=backend.extension)
+
+
+def _read_chunks(f):
+    with f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,298 @@
+"""
+Content-addressed cache of synthesized speech files.
+
+Audio is stored as <sha256>.<extension>, where the hash covers the normalized
+text and every synthesis setting (language, voice, speed). Identical requests
+therefore map to the same file and are served from disk instead of being
+synthesized again. The cache is bounded by total size and file count and
+evicts the least recently used files first.
+
+Files unused for longer than a time to live are removed by a periodic sweep,
+which also deletes files the cache does not own (temporary files of
+interrupted syntheses, one-off files) and picks up the files written by other
+processes sharing the directory, so that the bounds hold for all of them.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Default bounds of the cache directory
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_FILES = 5000
+
+# Seconds between two sweeps of the directory
+DEFAULT_SWEEP_INTERVAL = 300
+
+# Files the cache does not own are removed once they are this many seconds old
+STRAY_FILE_AGE = 3600
+
+_CACHE_FILE = re.compile(r"^([0-9a-f]{64})\.(\w+)$")
+
+
+def normalize_text(text):
+    """
+    Normalize text the way it is keyed: Unicode NFC with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(text, lang="fr", voice="default", speed="normal"):
+    """
+    Return the cache key of a synthesis request.
+    """
+    payload = "\0".join([normalize_text(text), lang, voice, speed])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cache_file(name):
+    """
+    Tell whether a file name is one of the cache's: its content never changes.
+    """
+    return bool(_CACHE_FILE.match(name))
+
+
+class AudioCache:
+    """
+    LRU cache of audio files in one directory, safe to share between threads.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_files=DEFAULT_MAX_FILES, ttl=None):
+        """
+        ttl is the number of seconds after its last use that a file is removed by
+        sweep() (None keeps files until they are evicted).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._sweeper_pid = None
+
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # file name -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """
+        Rebuild the LRU order from the files already on disk (oldest access first).
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if _CACHE_FILE.match(name):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+        with self._lock:
+            self._evict()
+
+    def path_for(self, key, extension="mp3"):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, extension="mp3"):
+        """
+        Return the path of a cached file, or None on a miss.
+        """
+        name = f"{key}.{extension}"
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+
+        path = os.path.join(self.directory, name)
+        try:
+            # Persist the access time so the LRU order survives restarts
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back: forget it and report a miss
+            with self._lock:
+                self._forget(name)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return path
+
+    def get_or_create(self, key, producer, extension="mp3"):
+        """
+        Return the path of a cached file, calling producer(path) to write it on a miss.
+        Concurrent requests for the same key wait for a single synthesis.
+        Returns None if the producer fails or writes an empty file.
+        """
+        path = self.get(key, extension)
+        if path:
+            return path
+        return self._create(key, producer, extension)
+
+    def put(self, key, data, extension="mp3"):
+        """
+        Store audio produced elsewhere (e.g. while it was streamed to a client) and
+        return its path, or None if data is empty.
+        """
+        def write(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        return self._create(key, write, extension)
+
+    def _create(self, key, producer, extension):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have produced it while we were waiting
+            name = f"{key}.{extension}"
+            with self._lock:
+                if name in self._entries:
+                    self._entries.move_to_end(name)
+                    return os.path.join(self.directory, name)
+
+            path = self.path_for(key, extension)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                producer(temp_path)
+                size = os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+                if size == 0:
+                    return None
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+            with self._lock:
+                self._forget(name)
+                self._entries[name] = size
+                self._total_bytes += size
+                self._evict(keep=name)
+            return path
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self, keep=None):
+        """
+        Remove least recently used files until the cache fits its bounds.
+        Must be called with the lock held.
+        """
+        while self._entries and (self._total_bytes > self.max_bytes or len(self._entries) > self.max_files):
+            name = next(iter(self._entries))
+            if name == keep:
+                break
+            self._forget(name)
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def sweep(self):
+        """
+        Remove expired files and stray files, re-index the files on disk (including
+        those of other processes) and evict down to the bounds. Returns the number
+        of files removed.
+        """
+        now = time.time()
+        removed = 0
+        files = []
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if not _CACHE_FILE.match(entry.name):
+                    if stat.st_mtime < now - STRAY_FILE_AGE:
+                        os.remove(entry.path)
+                        removed += 1
+                    continue
+                if self.ttl and stat.st_mtime < now - self.ttl:
+                    os.remove(entry.path)
+                    removed += 1
+                    with self._lock:
+                        self.expirations += 1
+                    continue
+            except FileNotFoundError:
+                # Removed by another process in the meantime
+                continue
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        scanned = {name for _, name, _ in files}
+        with self._lock:
+            unscanned = [name for name in self._entries if name not in scanned]
+        # Files written by this process since the scan started stay indexed
+        recent = {name for name in unscanned if os.path.exists(os.path.join(self.directory, name))}
+
+        with self._lock:
+            entries = OrderedDict((name, size) for _, name, size in sorted(files))
+            for name, size in self._entries.items():
+                if name in recent:
+                    entries[name] = size
+            self._entries = entries
+            self._total_bytes = sum(entries.values())
+            evictions = self.evictions
+            self._evict()
+            removed += self.evictions - evictions
+
+        if removed:
+            logger.info("Audio cache sweep removed %d files", removed)
+        return removed
+
+    def start_sweeper(self, interval=DEFAULT_SWEEP_INTERVAL):
+        """
+        Sweep the directory now and then every interval seconds on a daemon thread.
+        Runs once per process: a forked worker starts its own on its first call.
+        """
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_forever, args=(interval,), name="audio-sweeper", daemon=True).start()
+
+    def _sweep_forever(self, interval):
+        while True:
+            try:
+                self.sweep()
+            except OSError as e:
+                logger.warning("Audio cache sweep failed: %s", e)
+            time.sleep(interval)
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "files": len(self._entries),
+                "bytes": self._total_bytes
+            }
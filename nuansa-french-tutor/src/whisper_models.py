@@ -0,0 +1,73 @@
+"""
+Whisper model loading and per-clip model selection.
+
+Whisper comes in several sizes; on CPU, "tiny" decodes several times faster
+than "base" for a small loss of accuracy. The analyzer keeps an accurate model
+and, optionally, a fast one, and ModelPolicy decides which one transcribes
+each clip: the fast model for short clips and when transcriptions are piling
+up, the accurate one otherwise, unless the request asks for one of them.
+
+Models can also be loaded with their linear layers quantized to int8 (PyTorch
+dynamic quantization: int8 weights, activations quantized on the fly), which
+speeds up CPU inference and shrinks the model in memory.
+"""
+
+# Clips up to this many seconds go to the fast model
+DEFAULT_FAST_MAX_SECONDS = 8.0
+
+# From this many transcriptions waiting or running, new clips go to the fast model
+DEFAULT_BUSY_PENDING = 4
+
+# Values of the per-request accuracy option
+ACCURACY_HIGH = "high"
+ACCURACY_FAST = "fast"
+
+
+def model_label(name, quantize=False):
+    """
+    Name of a loaded model as reported in responses, e.g. "tiny-int8".
+    """
+    return f"{name}-int8" if quantize else name
+
+
+def load_whisper_model(name, quantize=False):
+    """
+    Load a Whisper model by size name. With quantize, the model is loaded on the
+    CPU and its linear layers are replaced by int8 dynamically quantized ones.
+    """
+    import whisper
+
+    if not quantize:
+        return whisper.load_model(name)
+
+    import torch
+
+    model = whisper.load_model(name, device="cpu")
+    # Whisper's Linear subclass only casts its weights to the input dtype, which is a
+    # no-op in float32; turned back into plain nn.Linear, the quantizer recognizes them
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+class ModelPolicy:
+    """
+    Latency budget policy choosing between the accurate and the fast Whisper model.
+    """
+
+    def __init__(self, fast_max_seconds=DEFAULT_FAST_MAX_SECONDS, busy_pending=DEFAULT_BUSY_PENDING):
+        self.fast_max_seconds = fast_max_seconds
+        self.busy_pending = busy_pending
+
+    def use_fast(self, duration, pending, accuracy=None):
+        """
+        Tell whether a clip of duration seconds should go to the fast model, given the
+        number of transcriptions pending on the accurate one and the requested accuracy
+        (ACCURACY_HIGH, ACCURACY_FAST, or None to let the policy decide).
+        """
+        if accuracy == ACCURACY_HIGH:
+            return False
+        if accuracy == ACCURACY_FAST:
+            return True
+        return duration <= self.fast_max_seconds or pending >= self.busy_pending
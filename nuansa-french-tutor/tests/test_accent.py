@@ -0,0 +1,127 @@
+"""
+Tests for batch accent classification.
+The model and the SHAP explainer are replaced by small fakes.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.accent import AccentClassifier, build_explainer, decision_scores, is_tree_model, select_class_values
+
+class ThresholdModel:
+    """Predicts 'natif' when the first feature is positive; counts predict calls."""
+    classes_ = np.array(["natif", "non-natif"])
+    n_features_in_ = 3
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        return np.where(features[:, 0] > 0, "natif", "non-natif")
+
+class SVCLike:
+    """Like an SVC trained without probability estimates: labels and a binary decision score only."""
+    classes_ = np.array(["natif", "non-natif"])
+    n_features_in_ = 3
+
+    def predict(self, features):
+        return np.where(features[:, 0] > 0, "non-natif", "natif")
+
+    def decision_function(self, features):
+        return features[:, 0]
+
+class FakeExplainer:
+    """Returns one (clips, features) array per class, like older SHAP versions."""
+
+    def shap_values(self, features):
+        return [features, -features]
+
+class TestAccentClassifier(unittest.TestCase):
+    def setUp(self):
+        self.features = np.array([[1.0, 2.0, 3.0], [-1.0, 0.5, 0.0]])
+
+    def test_batch_is_predicted_in_one_call(self):
+        """Test that a matrix of clips is classified with a single predict call."""
+        model = ThresholdModel()
+        results = AccentClassifier(model).classify(self.features)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual([result["accent"] for result in results], ["natif", "non-natif"])
+        self.assertEqual([result["shap_values"] for result in results], [None, None])
+
+    def test_explanations_use_the_predicted_class(self):
+        """Test that each clip gets the contributions towards its own label."""
+        classifier = AccentClassifier(ThresholdModel(), FakeExplainer(), "tree")
+        results = classifier.classify(self.features)
+        self.assertEqual(results[0]["shap_values"], [1.0, 2.0, 3.0])
+        self.assertEqual(results[1]["shap_values"], [1.0, -0.5, 0.0])
+
+    def test_explanations_can_be_skipped(self):
+        """Test that explain=False skips the explainer."""
+        classifier = AccentClassifier(ThresholdModel(), FakeExplainer(), "tree")
+        self.assertIsNone(classifier.classify(self.features, explain=False)[0]["shap_values"])
+
+    def test_shap_output_layouts(self):
+        """Test the reduction of the (clips, features, classes) and single-output layouts."""
+        values = np.arange(12).reshape(2, 3, 2)
+        np.testing.assert_array_equal(select_class_values(values, [1, 0]), [[1, 3, 5], [6, 8, 10]])
+        np.testing.assert_array_equal(select_class_values(values[:, :, 0], [1, 0]), values[:, :, 0])
+
+    def test_wider_features_are_trimmed_to_the_model(self):
+        """Test that a model trained on the first columns gets only those."""
+        classifier = AccentClassifier(ThresholdModel())
+        wide = np.hstack([self.features, np.ones((2, 5))])
+        self.assertEqual(classifier.prepare(wide).shape, (2, 3))
+        self.assertEqual(classifier.predict(wide).tolist(), ["natif", "non-natif"])
+
+    def test_binary_decision_scores_have_a_column_per_class(self):
+        """Test that a single binary decision score becomes one score per class."""
+        scores = decision_scores(SVCLike())(self.features)
+        np.testing.assert_array_equal(scores, [[-1.0, 1.0], [1.0, -1.0]])
+
+    def test_tree_models_are_recognized_by_type(self):
+        class Tree:
+            tree_ = object()
+
+        class Forest:
+            estimators_ = [Tree(), Tree()]
+
+        self.assertTrue(is_tree_model(Tree()))
+        self.assertTrue(is_tree_model(Forest()))
+        self.assertFalse(is_tree_model(SVCLike()))
+
+    def test_explainer_needs_background_data(self):
+        """Test that a kernel explanation is refused without real reference rows."""
+        with self.assertRaises(ValueError):
+            build_explainer(SVCLike())
+
+    def test_labels_alone_cannot_be_explained(self):
+        """Test that a model with neither probabilities nor decision scores is refused."""
+        with self.assertRaises(ValueError):
+            build_explainer(ThresholdModel(), background=self.features)
+
+    def test_explainer_failure_keeps_the_classifier(self):
+        """Test that a model that cannot be explained still loads and classifies."""
+        with tempfile.NamedTemporaryFile(suffix=".pkl", delete=False) as f:
+            pickle.dump(SVCLike(), f)
+        try:
+            with self.assertLogs("src.accent", level="WARNING"):
+                classifier = AccentClassifier.load(f.name, explain=True)
+        finally:
+            os.unlink(f.name)
+        self.assertFalse(classifier.explains)
+        self.assertEqual(classifier.classify(self.features)[0]["accent"], "non-natif")
+
+    def test_missing_model(self):
+        """Test that a missing model file loads as None."""
+        self.assertIsNone(AccentClassifier.load("does/not/exist.pkl"))
+
+if __name__ == '__main__':
+    unittest.main()
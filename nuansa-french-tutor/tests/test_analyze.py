@@ -0,0 +1,255 @@
+"""
+Tests for the analyzer's lazily loaded components, its analysis of batches and multi-sentence texts,
+and its feedback audio.
+Models and LanguageTool are replaced by stubs, so these tests run without them.
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.main import app, analyzer as app_analyzer
+from src.analyze import COMPONENTS, DEFAULT_AUDIO_FOLDER, _NOT_LOADED, FrenchAnalyzer
+from src.tts import StubBackend, TTSBackend, TTSError, TTSService
+from src.tts_cache import AudioCache
+
+class StubPool:
+    """
+    Stands in for a LanguageToolPool: flags every "fin" and records the texts of each check_many call.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def check_many(self, texts):
+        self.calls.append(list(texts))
+        return [[types.SimpleNamespace(offset=found.start(), errorLength=3, ruleId="FAKE_FAIM",
+                                       replacements=["faim"], message="Vouliez-vous dire « faim » ?")
+                 for found in re.finditer(r"\bfin\b", text)]
+                for text in texts]
+
+def make_analyzer(directory, **kwargs):
+    return FrenchAnalyzer(tts=TTSService([], AudioCache(directory)), inflections_path=None, **kwargs)
+
+class StubLoaders:
+    """
+    Loaders returning a placeholder model per component and counting their calls.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = {component: 0 for component in COMPONENTS}
+        self._lock = threading.Lock()
+
+    def loader(self, component):
+        def load():
+            with self._lock:
+                self.calls[component] += 1
+            time.sleep(self.delay)
+            # The classifier legitimately loads as None when there is no model file
+            return None if component == "classifier" else f"{component} model"
+        return load
+
+    def install(self, analyzer):
+        return mock.patch.dict(analyzer._loaders, {component: self.loader(component) for component in COMPONENTS})
+
+class TestLazyLoading(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.analyzer = make_analyzer(self.directory)
+        self.loaders = StubLoaders()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_components_load_on_first_use(self):
+        self.assertFalse(any(self.analyzer.is_loaded(component) for component in COMPONENTS))
+        with self.loaders.install(self.analyzer):
+            self.assertEqual(self.analyzer.lexicon, "lexicon model")
+            self.assertEqual(self.analyzer.lexicon, "lexicon model")
+        self.assertEqual(self.loaders.calls["lexicon"], 1)
+        self.assertTrue(self.analyzer.is_loaded("lexicon"))
+        self.assertFalse(self.analyzer.is_loaded("whisper"))
+
+    def test_none_is_a_loaded_model(self):
+        """Test that a component loaded as None is not loaded again (the _NOT_LOADED sentinel)."""
+        with self.loaders.install(self.analyzer):
+            self.assertIsNone(self.analyzer.classifier)
+            self.assertIsNone(self.analyzer.classifier)
+        self.assertEqual(self.loaders.calls["classifier"], 1)
+        self.assertTrue(self.analyzer.is_loaded("classifier"))
+
+    def test_concurrent_first_uses_load_once(self):
+        loaders = StubLoaders(delay=0.05)
+        with loaders.install(self.analyzer):
+            threads = [threading.Thread(target=lambda: self.analyzer.grammar_tool) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(loaders.calls["grammar"], 1)
+
+    def test_warmup(self):
+        with self.loaders.install(self.analyzer):
+            timings = self.analyzer.warmup(["grammar", "lexicon"])
+            self.assertEqual(self.analyzer.warmup(["grammar"]).keys(), {"grammar"})
+        self.assertEqual(timings.keys(), {"grammar", "lexicon"})
+        self.assertEqual(self.loaders.calls["grammar"], 1)
+        self.assertEqual([c for c in COMPONENTS if self.analyzer.is_loaded(c)], ["grammar", "lexicon"])
+
+    def test_unknown_components_load_nothing(self):
+        with self.loaders.install(self.analyzer):
+            with self.assertRaises(ValueError):
+                self.analyzer.warmup(["grammar", "spellcheck"])
+        self.assertEqual(sum(self.loaders.calls.values()), 0)
+
+    def test_preload(self):
+        with mock.patch.object(FrenchAnalyzer, "_load_lexicon", return_value="lexicon model"):
+            analyzer = make_analyzer(self.directory, preload=("lexicon",))
+        self.assertTrue(analyzer.is_loaded("lexicon"))
+        self.assertFalse(analyzer.is_loaded("grammar"))
+
+class TestWarmupRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.loaders = StubLoaders()
+        # The app's analyzer is shared by every test: start from unloaded components and restore them after
+        self.models = mock.patch.dict(app_analyzer._models, {component: _NOT_LOADED for component in COMPONENTS})
+        self.models.start()
+        self.addCleanup(self.models.stop)
+
+    def test_warmup(self):
+        with self.loaders.install(app_analyzer):
+            response = self.client.post('/warmup', json={'components': ['grammar', 'lexicon']})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["loaded"].keys(), {"grammar", "lexicon"})
+        self.assertEqual(body["ready"], {component: component in ("grammar", "lexicon") for component in COMPONENTS})
+
+    def test_default_components(self):
+        """Test that an empty body loads every component but the unused feedback pipeline."""
+        with self.loaders.install(app_analyzer):
+            response = self.client.post('/warmup')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.loaders.calls, {component: int(component != "feedback") for component in COMPONENTS})
+
+    def test_unknown_component(self):
+        with self.loaders.install(app_analyzer):
+            response = self.client.post('/warmup', json={'components': ['spellcheck']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("spellcheck", response.get_json()["error"])
+
+class TestAnalyzeTexts(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.analyzer = make_analyzer(self.directory)
+        self.pool = StubPool()
+        self.analyzer._loaders["grammar"] = lambda: self.pool
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def languagetool_errors(self, errors):
+        return [(error["start"], error["end"]) for error in errors if error["source"] == "languagetool"]
+
+    def test_sentence_offsets_are_shifted_to_the_text(self):
+        """Test that errors of later sentences point into the submitted text."""
+        texts = ["Bonjour. J'ai fin.", "Tu as fin."]
+        (errors, corrected), (other_errors, _) = self.analyzer.analyze_texts(texts)
+        # Every sentence of the batch goes to LanguageTool in one call
+        self.assertEqual(self.pool.calls, [["Bonjour.", "J'ai fin.", "Tu as fin."]])
+        self.assertEqual(self.languagetool_errors(errors), [(14, 17)])
+        self.assertEqual(texts[0][14:17], "fin")
+        self.assertEqual(self.languagetool_errors(other_errors), [(6, 9)])
+        self.assertEqual(corrected, "Bonjour. J'ai faim.")
+
+    def test_single_sentence_is_passed_through(self):
+        """Test that a text of one sentence is analyzed whole, surrounding spaces included."""
+        text = "  J'ai fin.  "
+        ((errors, corrected),) = self.analyzer.analyze_texts([text])
+        self.assertEqual(self.pool.calls, [[text]])
+        self.assertEqual(self.languagetool_errors(errors), [(7, 10)])
+        self.assertEqual(corrected, "J'ai faim.")
+
+        result = ([], "Bonjour.")
+        self.assertIs(self.analyzer._merge_sentences("Bonjour.", [(0, 8)], [result]), result)
+
+    def test_merge_sentences(self):
+        error = {"error": "fin", "suggestions": ["faim"], "message": "", "start": 5, "end": 8, "source": "rules"}
+        errors, corrected = self.analyzer._merge_sentences("Salut. J'ai fin.", [(0, 6), (7, 16)],
+                                                           [([], "Salut."), ([error], "J'ai faim.")])
+        self.assertEqual([(error["start"], error["end"]) for error in errors], [(12, 15)])
+        self.assertEqual(error["start"], 5)
+        self.assertEqual(corrected, "Salut. J'ai faim.")
+
+    def test_layout_is_kept(self):
+        """Test that the corrected text keeps the line and paragraph breaks between sentences."""
+        text = "Je vais à le marché.\n\nJe mange à école.\nJ'ai fin."
+        errors, corrected = self.analyzer.analyze_text(text)
+        self.assertEqual(corrected, "Je vais au marché.\n\nJe mange à l'école.\nJ'ai faim.")
+        for error in errors:
+            self.assertEqual(text[error["start"]:error["end"]].lower(), error["error"].lower())
+
+    def test_rules_only_mode_skips_languagetool(self):
+        ((errors, _),) = self.analyzer.analyze_texts(["J'ai fin. Il part."], use_language_tool=False)
+        self.assertEqual(self.languagetool_errors(errors), [])
+        self.assertEqual(self.pool.calls, [])
+        self.assertFalse(self.analyzer.is_loaded("grammar"))
+
+class FailingBackend(TTSBackend):
+    name = "failing"
+
+    def synthesize(self, text, lang="fr", slow=False):
+        raise TTSError("network unreachable")
+
+class TestFeedbackAudio(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = AudioCache(os.path.join(self.directory, "audio"))
+        self.analyzer = FrenchAnalyzer(tts=TTSService([FailingBackend(), StubBackend()], self.cache),
+                                       audio_url="/audio/", inflections_path=None)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cached_feedback_falls_back(self):
+        with self.assertLogs("src.tts", level="WARNING"):
+            url = self.analyzer.generate_feedback_audio("Bonjour.")
+        self.assertTrue(url.startswith("/audio/"))
+        self.assertTrue(os.path.exists(os.path.join(self.cache.directory, url[len("/audio/"):])))
+
+    def test_file_feedback_falls_back(self):
+        """Test that a one-off file is written by whichever backend works, like cached feedback."""
+        filename = os.path.join(self.directory, "out", "feedback.wav")
+        with self.assertLogs("src.tts", level="WARNING"):
+            self.assertEqual(self.analyzer.generate_feedback_audio("Bonjour.", filename=filename),
+                             "/audio/feedback.wav")
+        with open(filename, "rb") as f:
+            self.assertEqual(f.read(), StubBackend().synthesize("Bonjour."))
+
+    def test_default_cache_is_the_served_folder(self):
+        """Test that without a TTS service, feedback audio goes where the app serves it, wherever it runs from."""
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            analyzer = FrenchAnalyzer(inflections_path=None)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(analyzer.tts.cache.directory, DEFAULT_AUDIO_FOLDER)
+        self.assertEqual(os.path.realpath(DEFAULT_AUDIO_FOLDER), os.path.realpath(app.config['TTS_CACHE_FOLDER']))
+        self.assertEqual(os.listdir(self.directory), ["audio"])
+
+    def test_no_text(self):
+        self.assertIsNone(self.analyzer.generate_feedback_audio("  "))
+
+if __name__ == '__main__':
+    unittest.main()
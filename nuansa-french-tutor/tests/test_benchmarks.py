@@ -0,0 +1,62 @@
+"""
+Tests for the benchmark statistics and regression comparison.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench import compare, run_scenario, summarize
+
+class TestBenchmarkReport(unittest.TestCase):
+    def test_summary(self):
+        """Test the percentiles and throughput of a set of latencies."""
+        summary = summarize([0.001 * (index + 1) for index in range(100)], wall_seconds=5.0)
+        self.assertEqual(summary["iterations"], 100)
+        self.assertAlmostEqual(summary["p50_ms"], 50.5)
+        self.assertAlmostEqual(summary["p99_ms"], 99.01)
+        self.assertEqual(summary["throughput_per_s"], 20.0)
+        self.assertGreater(summary["peak_rss_mb"], 0)
+
+    def test_slowdowns_beyond_the_threshold_are_flagged(self):
+        """Test that only slowdowns larger than the threshold are regressions."""
+        baseline = {"results": {"fast": {"p50_ms": 10.0, "p95_ms": 20.0},
+                                "slow": {"p50_ms": 10.0, "p95_ms": 20.0}}}
+        current = {"results": {"fast": {"p50_ms": 11.0, "p95_ms": 21.0},
+                               "slow": {"p50_ms": 15.0, "p95_ms": 21.0}}}
+        regressions = compare(current, baseline, threshold=0.2)
+        self.assertEqual([(r["scenario"], r["metric"]) for r in regressions], [("slow", "p50_ms")])
+        self.assertEqual(regressions[0]["change"], 0.5)
+
+    def test_skipped_and_new_scenarios_are_not_compared(self):
+        """Test that scenarios missing from either run are ignored."""
+        baseline = {"results": {"speech": {"skipped": "no whisper"}}}
+        current = {"results": {"speech": {"p50_ms": 900.0, "p95_ms": 990.0},
+                               "new": {"p50_ms": 1.0, "p95_ms": 1.0}}}
+        self.assertEqual(compare(current, baseline), [])
+
+    def test_failures_are_flagged(self):
+        """Test that a scenario that crashes is reported, with or without a baseline."""
+        baseline = {"results": {"route": {"p50_ms": 10.0, "p95_ms": 20.0}}}
+        current = {"results": {"route": {"failed": "RuntimeError: /analyze_text answered 500"},
+                               "new": {"failed": "ZeroDivisionError: division by zero"}}}
+        regressions = compare(current, baseline)
+        self.assertEqual([(r["scenario"], r["metric"]) for r in regressions], [("route", "failed"), ("new", "failed")])
+        self.assertIn("500", regressions[0]["error"])
+
+    def test_only_missing_dependencies_skip_a_scenario(self):
+        def missing(_):
+            raise ModuleNotFoundError("No module named 'whisper'")
+
+        def crashing(_):
+            raise RuntimeError("/analyze_text answered 500")
+
+        self.assertIn("skipped", run_scenario(missing, [None], iterations=1, warmup=0))
+        self.assertEqual(run_scenario(crashing, [None], iterations=1, warmup=0),
+                         {"failed": "RuntimeError: /analyze_text answered 500"})
+        self.assertIn("p50_ms", run_scenario(lambda _: None, [None], iterations=2, warmup=0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the incremental analysis of edited documents.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.documents import Document, DocumentStore, apply_edits, shift_errors
+
+def error(start, end, text, message="Accord"):
+    return {"error": text, "suggestions": [text.upper()], "message": message,
+            "start": start, "end": end, "source": "rules"}
+
+class TestApplyEdits(unittest.TestCase):
+    def test_edits_apply_in_order(self):
+        """Test that each edit applies to the text left by the previous one."""
+        text = apply_edits("Je vais à le marché.", [{"start": 8, "end": 12, "text": "au"},
+                                                     {"start": 0, "end": 2, "text": "Tu"}])
+        self.assertEqual(text, "Tu vais au marché.")
+
+    def test_insertion_and_deletion(self):
+        """Test empty ranges (insertions) and empty replacements (deletions)."""
+        self.assertEqual(apply_edits("Elle mange.", [{"start": 10, "end": 10, "text": " un pomme"}]),
+                         "Elle mange un pomme.")
+        self.assertEqual(apply_edits("Elle mange un pomme.", [{"start": 10, "end": 19, "text": ""}]),
+                         "Elle mange.")
+
+    def test_invalid_edits_raise(self):
+        """Test that out-of-range and malformed edits are rejected."""
+        for edits in ([{"start": 5, "end": 50, "text": ""}], [{"start": 4, "end": 2, "text": ""}],
+                      [{"start": "0", "end": 1, "text": ""}], ["abc"], {"start": 0}):
+            with self.assertRaises(ValueError):
+                apply_edits("Bonjour", edits)
+
+class TestShiftErrors(unittest.TestCase):
+    def test_errors_around_an_edit(self):
+        """Test that errors before an edit stay, errors after it move and overlapping ones are dropped."""
+        errors = [error(0, 2, "Je"), error(5, 9, "vais"), error(15, 20, "marché")]
+        shifted = shift_errors(errors, [{"start": 5, "end": 9, "text": "allons"}])
+        self.assertEqual([(e["start"], e["end"]) for e in shifted], [(0, 2), (17, 22)])
+
+class TestDocument(unittest.TestCase):
+    def test_unchanged_errors_keep_their_id(self):
+        """Test that the delta lists only the errors that appeared or went away."""
+        document = Document("Je vais à le marché. Elle mange un pomme.")
+        added, removed = document.update(document.text, [error(8, 12, "à le"), error(32, 40, "un pomme")], "", {})
+        self.assertEqual([e["id"] for e in added], [1, 2])
+        self.assertEqual(removed, [])
+
+        # "à le" -> "au": the first error goes away, the second one moves by -2
+        edits = [{"start": 8, "end": 12, "text": "au"}]
+        text = apply_edits(document.text, edits)
+        added, removed = document.update(text, [error(30, 38, "un pomme")], "", {}, edits=edits)
+        self.assertEqual(added, [])
+        self.assertEqual(removed, [1])
+        self.assertEqual(document.errors, [dict(error(30, 38, "un pomme"), id=2)])
+        self.assertEqual(document.version, 2)
+
+    def test_new_errors_get_new_ids(self):
+        """Test that an error reappearing after an edit gets a new id."""
+        document = Document("Il est une belle fille.")
+        document.update(document.text, [error(0, 2, "Il")], "", {})
+        edits = [{"start": 0, "end": 2, "text": "Il"}]
+        added, removed = document.update(document.text, [error(0, 2, "Il")], "", {}, edits=edits)
+        self.assertEqual([e["id"] for e in added], [2])
+        self.assertEqual(removed, [1])
+
+class TestDocumentStore(unittest.TestCase):
+    def test_least_recently_edited_document_is_dropped(self):
+        """Test the bound on the number of documents and the id prefix."""
+        store = DocumentStore(max_documents=2, id_prefix="w1-")
+        first = store.create("Un.")
+        second = store.create("Deux.")
+        first.last_activity = second.last_activity - 1
+        third = store.create("Trois.")
+        self.assertTrue(third.id.startswith("w1-"))
+        self.assertIsNone(store.get(first.id))
+        self.assertIs(store.get(second.id), second)
+
+    def test_idle_documents_expire(self):
+        store = DocumentStore(document_ttl=60)
+        document = store.create("Bonjour.")
+        document.last_activity -= 120
+        self.assertIsNone(store.get(document.id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Tests for the cached acoustic feature pipeline.
+Extraction itself needs librosa; the cache is tested with a counting stand-in.
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.audio import SAMPLE_RATE
+from src.features import FEATURE_NAMES, FeatureExtractor, compute_features
+
+class CountingCompute:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, audio, sr):
+        self.calls += 1
+        return np.full(len(FEATURE_NAMES), float(self.calls), dtype=np.float32)
+
+def tone(frequency, duration=1.0):
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+class TestFeatureExtractor(unittest.TestCase):
+    def test_same_audio_is_extracted_once(self):
+        """Test that a repeated clip is served from the cache."""
+        compute = CountingCompute()
+        extractor = FeatureExtractor(compute=compute)
+        first = extractor.extract(tone(220))
+        second = extractor.extract(tone(220))
+        self.assertEqual(compute.calls, 1)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(extractor.stats()["hits"], 1)
+
+    def test_different_audio_is_extracted_again(self):
+        """Test that the cache is keyed by the audio content."""
+        compute = CountingCompute()
+        extractor = FeatureExtractor(compute=compute)
+        extractor.extract(tone(220))
+        extractor.extract(tone(330))
+        self.assertEqual(compute.calls, 2)
+
+    def test_least_recently_used_vectors_are_evicted(self):
+        """Test that the cache keeps at most max_entries vectors."""
+        compute = CountingCompute()
+        extractor = FeatureExtractor(max_entries=2, compute=compute)
+        for frequency in (220, 330, 440):
+            extractor.extract(tone(frequency))
+        self.assertEqual(extractor.stats()["entries"], 2)
+        extractor.extract(tone(220))
+        self.assertEqual(compute.calls, 4)
+
+    def test_cached_vectors_are_read_only(self):
+        """Test that callers cannot alter a cached vector."""
+        extractor = FeatureExtractor(compute=CountingCompute())
+        with self.assertRaises(ValueError):
+            extractor.extract(tone(220))[0] = 0.0
+
+    @unittest.skipUnless(importlib.util.find_spec("librosa"), "librosa is not installed")
+    def test_feature_vector(self):
+        """Test the layout of the computed vector and the pitch of a pure tone."""
+        features = compute_features(tone(220, duration=2.0))
+        self.assertEqual(features.shape, (len(FEATURE_NAMES),))
+        self.assertAlmostEqual(features[FEATURE_NAMES.index("pitch_mean")], 220, delta=5)
+
+if __name__ == '__main__':
+    unittest.main()
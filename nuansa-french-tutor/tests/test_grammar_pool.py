@@ -0,0 +1,176 @@
+"""
+Tests for the LanguageTool pool's batched checks and the /analyze_text/batch route.
+The pool lends fake servers, so these tests run without Java.
+"""
+
+import os
+import re
+import sys
+import threading
+import types
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.main import app, analyzer
+from src.grammar_pool import (BATCH_MAX_CHARS, BATCH_SEPARATOR, PARALLEL_MIN_CHARS, LanguageToolPool,
+                              matches_to_hits)
+
+class FakeTool:
+    """
+    Stands in for a LanguageTool server: reports every match of its patterns
+    ({regex: (rule_id, replacement)}) and records the texts it checked.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.checked = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def check(self, text):
+        with self._lock:
+            self.checked.append(text)
+        matches = []
+        for pattern, (rule_id, replacement) in self.patterns.items():
+            for found in re.finditer(pattern, text):
+                matches.append(types.SimpleNamespace(offset=found.start(), errorLength=len(found.group()),
+                                                     ruleId=rule_id, replacements=[replacement],
+                                                     message=f"{rule_id} message"))
+        return matches
+
+    def close(self):
+        self.closed = True
+
+PATTERNS = {
+    r"\bfin\b": ("FAKE_FAIM", "faim"),
+    # Only ever found across two paragraphs
+    r"\.\n\nEt": ("FAKE_STRADDLE", ". Et"),
+    r"^Alors|\n\nAlors": ("WORD_REPEAT_BEGINNING_RULE", "Ensuite")
+}
+
+class BarrierTool(FakeTool):
+    """
+    A FakeTool whose checks wait for a check on another server, so they only finish if they run concurrently.
+    """
+
+    def __init__(self, patterns, barrier):
+        super().__init__(patterns)
+        self.barrier = barrier
+
+    def check(self, text):
+        self.barrier.wait(timeout=10)
+        return super().check(text)
+
+def fake_pool(size=1, patterns=PATTERNS, tool=FakeTool, **kwargs):
+    tools = []
+
+    def factory(language):
+        tools.append(tool(patterns, **kwargs))
+        return tools[-1]
+
+    return LanguageToolPool(size=size, tool_factory=factory), tools
+
+class TestCheckMany(unittest.TestCase):
+    def setUp(self):
+        self.pool, (self.tool,) = fake_pool()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_offsets_are_rebased_per_text(self):
+        texts = ["J'ai fin.", "Bonjour.", "Nous avons fin et soif."]
+        results = self.pool.check_many(texts)
+        self.assertEqual(self.tool.checked, [BATCH_SEPARATOR.join(texts)])
+        self.assertEqual([[(match.offset, match.errorLength) for match in matches] for matches in results],
+                         [[(5, 3)], [], [(11, 3)]])
+        for text, matches in zip(texts, results):
+            for hit in matches_to_hits(text, matches):
+                self.assertEqual(hit["error"], "fin")
+
+    def test_matches_spanning_the_separator_are_dropped(self):
+        results = self.pool.check_many(["Il pleut.", "Et il vente."])
+        self.assertEqual(results, [[], []])
+        # The same match inside one text is kept
+        results = self.pool.check_many(["Il pleut.\n\nEt il vente."])
+        self.assertEqual([match.ruleId for match in results[0]], ["FAKE_STRADDLE"])
+
+    def test_cross_text_rules_are_dropped_from_batches(self):
+        """Test that rules comparing neighbouring paragraphs only report within a single text."""
+        self.assertEqual(self.pool.check_many(["Alors il part.", "Alors il revient."]), [[], []])
+        (matches,) = self.pool.check_many(["Alors il part."])
+        self.assertEqual(matches[0].ruleId, "WORD_REPEAT_BEGINNING_RULE")
+
+    def test_batches_are_chunked(self):
+        texts = ["a" * 6000 + " fin"] * 5 + ["b" * (BATCH_MAX_CHARS + 10)]
+        results = self.pool.check_many(texts)
+        # Three texts fit under the limit, the oversized one gets a request of its own
+        self.assertEqual([len(checked) for checked in self.tool.checked],
+                         [3 * 6004 + 2 * len(BATCH_SEPARATOR), 2 * 6004 + len(BATCH_SEPARATOR),
+                          BATCH_MAX_CHARS + 10])
+        self.assertEqual([[match.offset for match in matches] for matches in results], [[6001]] * 5 + [[]])
+
+    def test_large_inputs_are_checked_in_parallel(self):
+        """Test that a large input is split into one batch per server, checked concurrently."""
+        pool, tools = fake_pool(size=2, tool=BarrierTool, barrier=threading.Barrier(2))
+        try:
+            texts = ["a" * PARALLEL_MIN_CHARS + " fin"] * 4
+            results = pool.check_many(texts)
+        finally:
+            pool.close()
+        self.assertEqual([[BATCH_SEPARATOR.join(texts[:2])], [BATCH_SEPARATOR.join(texts[2:])]],
+                         sorted(tool.checked for tool in tools))
+        # Each batch filled its own entries
+        self.assertEqual([[match.offset for match in matches] for matches in results],
+                         [[PARALLEL_MIN_CHARS + 1]] * 4)
+
+    def test_small_inputs_are_not_split(self):
+        pool, tools = fake_pool(size=2)
+        try:
+            pool.check_many(["J'ai fin."] * 4)
+        finally:
+            pool.close()
+        self.assertEqual(sorted(len(tool.checked) for tool in tools), [0, 1])
+
+    def test_empty_pool(self):
+        pool = LanguageToolPool(size=0)
+        self.assertEqual(pool.check_many(["J'ai fin."]), [[]])
+        self.assertEqual(pool.check("J'ai fin."), [])
+
+    def test_close_stops_every_server(self):
+        pool, tools = fake_pool(size=2)
+        pool.close()
+        self.assertTrue(all(tool.closed for tool in tools))
+        self.assertEqual(pool.size, 0)
+
+class TestBatchRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_too_many_texts(self):
+        with mock.patch.dict(app.config, {'BATCH_MAX_TEXTS': 2}):
+            response = self.client.post('/analyze_text/batch', json={'texts': ["Un.", "Deux.", "Trois."]})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("error", response.get_json())
+
+    def test_no_texts(self):
+        for body in ({}, {'texts': []}, {'texts': "J'ai fin."}):
+            self.assertEqual(self.client.post('/analyze_text/batch', json=body).status_code, 400)
+
+    def test_batch_is_one_languagetool_request(self):
+        pool, (tool,) = fake_pool()
+        with mock.patch.dict(analyzer._models, {"grammar": pool}):
+            response = self.client.post('/analyze_text/batch',
+                                        json={'texts': ["Le matin, j'ai fin.", "", "Tu as fin ce soir ?"]})
+        self.assertEqual(response.status_code, 200)
+        first, empty, last = response.get_json()["results"]
+        self.assertEqual(len(tool.checked), 1)
+        self.assertIn("error", empty)
+        for result in (first, last):
+            (error,) = [error for error in result["errors"] if error["source"] == "languagetool"]
+            self.assertEqual(result["transcription"][error["start"]:error["end"]], "fin")
+            self.assertIn("faim", result["corrected_text"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for the memory-mapped inflection lexicon and the agreement checks built on it.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.agreement import AgreementChecker
+from src.inflections import (ADJECTIVE, DEFAULT_INFLECTIONS_PATH, DEFAULT_SOURCE_PATH, NOUN, PARTICIPLE, VERB,
+                             InflectionLexicon, build, read_lexique)
+from src.rules import RuleEngine
+
+class TestInflectionLexicon(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.lexicon = InflectionLexicon()
+
+    def test_lookup(self):
+        inflection = self.lexicon.lookup("chat")
+        self.assertTrue(inflection.flags & NOUN)
+        self.assertEqual(inflection.noun_readings, {("m", "s")})
+        self.assertEqual(inflection.noun[("m", "p")], "chats")
+        self.assertEqual(inflection.noun[("f", "s")], "chatte")
+
+    def test_participles(self):
+        inflection = self.lexicon.lookup("né")
+        self.assertTrue(inflection.flags & PARTICIPLE)
+        self.assertEqual(inflection.adjective[("f", "s")], "née")
+        self.assertEqual(inflection.adjective[("f", "p")], "nées")
+
+    def test_unknown_words(self):
+        self.assertIsNone(self.lexicon.lookup("xyzzyq"))
+        self.assertNotIn("xyzzyq", self.lexicon)
+        self.assertIn("pomme", self.lexicon)
+
+    def test_homographs_keep_every_reading(self):
+        """Test that a form of several lemmas has the readings of all of them."""
+        # "porte" is a feminine noun and a conjugated verb
+        inflection = self.lexicon.lookup("porte")
+        self.assertTrue(inflection.flags & NOUN and inflection.flags & VERB)
+        # "cours" is a masculine singular noun, not only the plural of "cour"
+        self.assertIn(("m", "s"), self.lexicon.lookup("cours").noun_readings)
+
+    def test_adjectives_serving_both_genders(self):
+        """Test that an epicene adjective reads as both genders."""
+        inflection = self.lexicon.lookup("rapide")
+        self.assertTrue(inflection.flags & ADJECTIVE)
+        self.assertIn(("m", "s"), inflection.adjective_readings)
+        self.assertIn(("f", "s"), inflection.adjective_readings)
+
+    def test_shipped_lexicon_is_up_to_date(self):
+        """Test that the committed binary is the build of the committed table."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "inflections.bin")
+            build(read_lexique(DEFAULT_SOURCE_PATH), path)
+            with open(path, "rb") as built, open(DEFAULT_INFLECTIONS_PATH, "rb") as shipped:
+                self.assertEqual(built.read(), shipped.read())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_rejects_other_files(self):
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(b"\0" * 64)
+        try:
+            with self.assertRaises(ValueError):
+                InflectionLexicon(f.name)
+        finally:
+            os.unlink(f.name)
+
+    def test_rejects_truncated_files(self):
+        """Test that a file cut within its strings is rejected rather than read past its end."""
+        with open(DEFAULT_INFLECTIONS_PATH, "rb") as shipped, \
+                tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(shipped.read()[:-10])
+        try:
+            with self.assertRaises(ValueError):
+                InflectionLexicon(f.name)
+        finally:
+            os.unlink(f.name)
+
+class TestAgreementChecker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.checker = AgreementChecker(InflectionLexicon())
+
+    def replacements(self, text, speaker_gender="m"):
+        return [(hit["error"], hit["replacement"]) for hit in self.checker.scan(text, speaker_gender)]
+
+    def test_determiner_gender(self):
+        self.assertEqual(self.replacements("un pomme"), [("un pomme", "une pomme")])
+        self.assertEqual(self.replacements("la chat"), [("la chat", "le chat")])
+        self.assertEqual(self.replacements("mon maison"), [("mon maison", "ma maison")])
+
+    def test_determiner_number(self):
+        """Test that the determiner, which is heard, decides the number of the noun."""
+        self.assertEqual(self.replacements("les chat"), [("les chat", "les chats")])
+
+    def test_determiners_before_vowels(self):
+        self.assertEqual(self.replacements("ma amie"), [("ma amie", "mon amie")])
+        self.assertEqual(self.replacements("ce ami"), [("ce ami", "cet ami")])
+        self.assertEqual(self.replacements("cet garçon"), [("cet garçon", "ce garçon")])
+        self.assertEqual(self.replacements("mon amie"), [])
+
+    def test_same_sounding_form_is_kept_with_the_determiner(self):
+        """Test that 'un amie' becomes 'un ami' rather than 'une amie'."""
+        self.assertEqual(self.replacements("un amie"), [("un amie", "un ami")])
+
+    def test_no_false_positives(self):
+        """Test object pronouns, homographs and correct phrases."""
+        for text in ("je la porte", "le cours", "une pomme", "les chats", "Le Chat", "je suis dans"):
+            self.assertEqual(self.replacements(text), [], text)
+
+    def test_etre_agreement(self):
+        self.assertEqual(self.replacements("elles sont venu"), [("venu", "venues")])
+        self.assertEqual(self.replacements("je suis content", "f"), [("content", "contente")])
+        self.assertEqual(self.replacements("je ne suis pas content", "f"), [("content", "contente")])
+        self.assertEqual(self.replacements("je suis content", "m"), [])
+        self.assertEqual(self.replacements("je suis né", "f"), [("né", "née")])
+
+    def test_rule_engine_merges_agreement_hits(self):
+        """Test that the agreement hits reach the rule engine's corrections and version."""
+        engine = RuleEngine()
+        self.assertEqual(engine.apply("Je suis né à Paris avec un pomme.", "feminine"),
+                         "Je suis née à Paris avec une pomme.")
+        self.assertNotEqual(engine.version, RuleEngine(inflections_path=None).version)
+        self.assertEqual(RuleEngine(inflections_path=None).apply("un pomme"), "un pomme")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests for the background analysis job queue.
+Validates job results, failures and backpressure when the queue is full.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.jobs import JobQueue, QueueFull
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = JobQueue(workers=1, max_pending=2)
+
+    def wait_for(self, job_id, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} did not finish")
+
+    def test_result_is_kept(self):
+        """Test that a finished job exposes its result."""
+        job_id = self.queue.submit(lambda text: text.upper(), "bonjour")
+        job = self.wait_for(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], "BONJOUR")
+
+    def test_failure_is_reported(self):
+        """Test that an exception marks the job as failed."""
+        def broken():
+            raise RuntimeError("fichier illisible")
+
+        job = self.wait_for(self.queue.submit(broken))
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("fichier illisible", job["error"])
+
+    def test_backpressure(self):
+        """Test that submissions beyond the capacity are refused until a job finishes."""
+        release = threading.Event()
+        first = self.queue.submit(release.wait)
+        self.queue.submit(release.wait)
+        with self.assertRaises(QueueFull):
+            self.queue.submit(release.wait)
+
+        release.set()
+        self.wait_for(first)
+        self.queue.submit(lambda: None)
+
+    def test_unknown_job(self):
+        """Test that unknown ids are reported as missing."""
+        self.assertIsNone(self.queue.get("inconnu"))
+
+    def tearDown(self):
+        self.queue.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Tests for the per-stage latency metrics.
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import Histogram, StageMetrics, as_milliseconds, collect
+
+class TestStageMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that each bucket counts the observations up to its bound."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative_counts(), [(0.1, 1), (1.0, 3), (float("inf"), 4)])
+        self.assertAlmostEqual(histogram.sum, 4.25)
+
+    def test_prometheus_export(self):
+        """Test the text exposition format of a stage histogram."""
+        registry = StageMetrics(buckets=(0.1, 1.0))
+        registry.observe("whisper", 0.5)
+        text = registry.render()
+        self.assertIn("# TYPE nuansa_stage_seconds histogram", text)
+        self.assertIn('nuansa_stage_seconds_bucket{stage="whisper",le="0.1"} 0', text)
+        self.assertIn('nuansa_stage_seconds_bucket{stage="whisper",le="+Inf"} 1', text)
+        self.assertIn('nuansa_stage_seconds_count{stage="whisper"} 1', text)
+
+    def test_timed_records_failures_too(self):
+        """Test that a stage raising an exception is still timed."""
+        registry = StageMetrics()
+        with self.assertRaises(ZeroDivisionError):
+            with registry.timed("rules"):
+                1 / 0
+        self.assertEqual(registry.snapshot()["rules"]["count"], 1)
+
+    def test_request_timings_are_collected(self):
+        """Test that collect() gathers the stages of the current request only."""
+        registry = StageMetrics()
+        registry.observe("rules", 0.5)
+        with collect() as timings:
+            registry.observe("rules", 0.002)
+            registry.observe("rules", 0.001)
+            registry.observe("tts", 0.25)
+            # Stages run by another thread belong to another request
+            other = threading.Thread(target=registry.observe, args=("tts", 1.0))
+            other.start()
+            other.join()
+        self.assertEqual(as_milliseconds(timings), {"rules": 3.0, "tts": 250.0})
+        self.assertEqual(registry.snapshot()["tts"]["count"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
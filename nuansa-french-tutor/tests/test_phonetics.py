@@ -0,0 +1,114 @@
+"""
+Tests for the phonetic repair of misspelled transcriptions.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.inflections import InflectionLexicon
+from src.phonetics import PhoneticLexicon, edit_distance, inflection_of, phonetic_key
+
+class TestPhoneticKey(unittest.TestCase):
+    def test_homophones_share_a_key(self):
+        """Test that spellings of the same sound get the same key."""
+        self.assertEqual(phonetic_key("aller"), phonetic_key("allé"))
+        self.assertEqual(phonetic_key("aller"), phonetic_key("allez"))
+        self.assertEqual(phonetic_key("beaucoup"), phonetic_key("bocou"))
+        self.assertEqual(phonetic_key("maison"), phonetic_key("mezon"))
+
+    def test_different_words_differ(self):
+        self.assertNotEqual(phonetic_key("pomme"), phonetic_key("pain"))
+
+    def test_vowels_before_a_mute_e_are_not_nasal(self):
+        """Test that "pome" sounds like "pomme", not like "pont"."""
+        self.assertEqual(phonetic_key("pome"), phonetic_key("pomme"))
+        self.assertNotEqual(phonetic_key("pome"), phonetic_key("pont"))
+        self.assertNotEqual(phonetic_key("lune"), phonetic_key("l'un"))
+        self.assertEqual(phonetic_key("monde")[1], "3")
+
+    def test_inflection_of(self):
+        self.assertTrue(inflection_of("contentes", "contente"))
+        self.assertTrue(inflection_of("mangerez", "mangerai"))
+        self.assertTrue(inflection_of("gâteaux", "gâteau"))
+        self.assertTrue(inflection_of("aimés", "aimer"))
+        # A missing ending is a truncated spelling, not an inflection
+        self.assertTrue(inflection_of("mangerons", "mangeons"))
+        self.assertTrue(inflection_of("finirons", "finissons"))
+        self.assertFalse(inflection_of("verr", "verre"))
+        self.assertFalse(inflection_of("alair", "aller"))
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("alair", "aller"), 2)
+        self.assertEqual(edit_distance("", "abc"), 3)
+
+class TestPhoneticLexicon(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.lexicon = PhoneticLexicon.load()
+
+    def test_known_misspellings(self):
+        """Test the repairs the analyzer used to hard-code."""
+        text, corrections = self.lexicon.repair("je suis alair à l'ecolay")
+        self.assertEqual(text, "je suis aller à l'école")
+        self.assertEqual(corrections, [{"error": "alair", "corrected": "aller"},
+                                       {"error": "ecolay", "corrected": "école"}])
+
+    def test_misspelled_double_consonant(self):
+        self.assertEqual(self.lexicon.repair("je mange une pome")[0], "je mange une pomme")
+
+    def test_known_words_are_kept(self):
+        """Test that lexicon words, even misused ones, are left for the grammar rules."""
+        text = "je suis aller chez mon mère"
+        self.assertEqual(self.lexicon.repair(text), (text, []))
+
+    def test_proper_nouns_are_kept(self):
+        """Test that capitalized words inside a sentence are not repaired."""
+        text, corrections = self.lexicon.repair("Alair avec Marie à Paris.")
+        self.assertEqual(text, "aller avec Marie à Paris.")
+        self.assertEqual(len(corrections), 1)
+        text, _ = self.lexicon.repair("Bonjour Alair, Marie ! Alair avec « Alair »")
+        self.assertEqual(text, "Bonjour Alair, Marie ! aller avec « aller »")
+
+    def test_unrelated_tokens_are_not_repaired(self):
+        """Test that a token sounding like no word is left alone."""
+        self.assertIsNone(self.lexicon.suggest("xyzzyq"))
+
+    def test_each_misspelling_is_reported_once(self):
+        _, corrections = self.lexicon.repair("alair et alair")
+        self.assertEqual(corrections, [{"error": "alair", "corrected": "aller"}])
+
+    def test_inflected_forms_are_kept(self):
+        """Test that plural nouns and adjectives and conjugated verbs missing from the list are not repaired."""
+        for text in ("les filles sont contentes", "des chaussures rouges", "vous mangerez des gâteaux"):
+            self.assertEqual(self.lexicon.repair(text), (text, []), text)
+
+    def test_future_and_conditional_are_kept(self):
+        """Test that a future or conditional is not turned into another tense."""
+        for text in ("nous mangerons", "nous finirons", "ils prendront", "je parlerais", "vous finiriez"):
+            self.assertEqual(self.lexicon.repair(text), (text, []), text)
+        # Without their infinitive, the tense ending alone still protects them
+        lexicon = PhoneticLexicon(["mangeons", "finissons"])
+        self.assertIsNone(lexicon.suggest("mangerons"))
+        self.assertIsNone(lexicon.suggest("finirons"))
+
+    def test_first_sound_is_kept(self):
+        """Test that a repair never drops or changes the sound a word starts with."""
+        self.assertIsNone(self.lexicon.suggest("louvre"))
+
+    def test_known_forms_are_never_repaired(self):
+        """Test that the forms of a full-form lexicon are correct words, not misspellings."""
+        self.assertEqual(PhoneticLexicon(["triste"]).suggest("touriste"), "triste")
+        lexicon = PhoneticLexicon(["triste", "aimer"], known=InflectionLexicon())
+        self.assertIsNone(lexicon.suggest("touriste"))
+        self.assertIsNone(lexicon.suggest("aimés"))
+
+    def test_same_sound_beats_close_spelling(self):
+        """Test that a word with the token's key wins over a more frequent one spelled as closely."""
+        lexicon = PhoneticLexicon(["vert", "verre"])
+        self.assertEqual(lexicon.suggest("verr"), "verre")
+
+if __name__ == '__main__':
+    unittest.main()
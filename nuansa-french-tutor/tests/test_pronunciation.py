@@ -0,0 +1,132 @@
+"""
+Tests for word-level pronunciation scoring.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pronunciation import PronunciationScorer, distance_to_score, dtw_distance
+
+def naive_dtw(a, b):
+    """Textbook DTW, one cell at a time."""
+    n, m = len(a), len(b)
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(n):
+        for j in range(m):
+            cost = np.linalg.norm(a[i] - b[j])
+            acc[i + 1, j + 1] = cost + min(acc[i, j + 1], acc[i + 1, j], acc[i, j])
+    return acc[n, m] / (n + m)
+
+class TestDTW(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_matches_naive_dtw(self):
+        """Test that the diagonal-wise recurrence computes the textbook alignment cost."""
+        a, b = self.rng.normal(size=(17, 4)), self.rng.normal(size=(23, 4))
+        self.assertAlmostEqual(dtw_distance(a, b, band=None), naive_dtw(a, b))
+
+    def test_band_only_raises_the_cost(self):
+        a, b = self.rng.normal(size=(30, 4)), self.rng.normal(size=(40, 4))
+        self.assertGreaterEqual(dtw_distance(a, b, band=0.1), dtw_distance(a, b, band=None) - 1e-9)
+
+    def test_band_always_leaves_a_path(self):
+        """Test very different lengths, where a narrow band alone would not connect the corners."""
+        a, b = self.rng.normal(size=(2, 4)), self.rng.normal(size=(100, 4))
+        self.assertTrue(np.isfinite(dtw_distance(a, b, band=0.05)))
+
+    def test_identical_frames_score_100(self):
+        a = self.rng.normal(size=(20, 4))
+        self.assertEqual(distance_to_score(dtw_distance(a, a)), 100)
+        self.assertEqual(distance_to_score(dtw_distance(a, a[:0])), 0)
+
+class FakeTTS:
+    """Synthesizes a word as its own path; cached words are found without synthesis."""
+
+    def __init__(self, fail=False, cached=()):
+        self.fail = fail
+        self.cached = set(cached)
+        self.calls = []
+
+    def cached_file(self, text, lang="fr", slow=False):
+        return text if text in self.cached else None
+
+    def to_file(self, text, lang="fr", slow=False):
+        self.calls.append(text)
+        if self.fail:
+            return None, None
+        self.cached.add(text)
+        return text, "fake"
+
+class FrameScorer(PronunciationScorer):
+    """Scorer taking samples as frames, so that no audio library is needed."""
+
+    def frames(self, audio, sr=16000):
+        return np.asarray(audio, dtype=np.float64).reshape(-1, 1)
+
+@mock.patch("src.pronunciation.decode_audio", lambda path: np.ones(100))
+class TestPronunciationScorer(unittest.TestCase):
+    def setUp(self):
+        self.audio = np.ones(16000)
+        self.words = [{"word": "oui", "expected": "oui", "start": 0.1, "end": 0.3},
+                      {"word": "non", "expected": "non", "start": 0.5, "end": 0.7}]
+
+    def test_words_are_scored(self):
+        scored = FrameScorer(FakeTTS(cached=("oui", "non")), cpu_budget=10, wall_budget=10).score(self.audio, self.words)
+        self.assertEqual([word["score"] for word in scored], [100, 100])
+        self.assertEqual(scored[0]["word"], "oui")
+
+    def test_references_are_loaded_once(self):
+        scorer = FrameScorer(FakeTTS(cached=("oui", "non")), cpu_budget=10, wall_budget=10)
+        with mock.patch("src.pronunciation.decode_audio", return_value=np.ones(100)) as decode:
+            scorer.score(self.audio, self.words + self.words)
+        self.assertEqual(decode.call_count, 2)
+
+    def test_missing_references_are_synthesized_in_the_background(self):
+        """Test that scoring never waits for a synthesis, and that later clips use it."""
+        tts = FakeTTS()
+        scorer = FrameScorer(tts, cpu_budget=10, wall_budget=10)
+        self.assertEqual([word["score"] for word in scorer.score(self.audio, self.words)], [None, None])
+        scorer._pending.join()
+        self.assertEqual(sorted(tts.calls), ["non", "oui"])
+        self.assertEqual([word["score"] for word in scorer.score(self.audio, self.words)], [100, 100])
+
+    def test_failed_references_are_not_scored_nor_cached(self):
+        tts = FakeTTS(fail=True)
+        scorer = FrameScorer(tts, cpu_budget=10, wall_budget=10)
+        self.assertIsNone(scorer.score(self.audio, self.words)[0]["score"])
+        scorer._pending.join()
+        self.assertIsNone(scorer.score(self.audio, self.words)[0]["score"])
+        scorer._pending.join()
+        self.assertEqual(tts.calls.count("oui"), 2)
+
+    def test_prefetch(self):
+        tts = FakeTTS()
+        scorer = FrameScorer(tts, cpu_budget=10, wall_budget=10)
+        scorer.prefetch(["oui", "non"])
+        self.assertEqual(tts.calls, ["oui", "non"])
+        self.assertEqual([word["score"] for word in scorer.score(self.audio, self.words)], [100, 100])
+
+    def test_short_words_are_not_scored(self):
+        words = [{"word": "a", "expected": "a", "start": 0.5, "end": 0.5}]
+        scorer = FrameScorer(FakeTTS(cached=("a",)), cpu_budget=10, wall_budget=10)
+        self.assertIsNone(scorer.score(self.audio, words)[0]["score"])
+
+    def test_exhausted_budget_skips_words(self):
+        """Test that words past the CPU budget are returned without a score."""
+        scored = FrameScorer(FakeTTS(cached=("oui", "non")), cpu_budget=-1).score(self.audio, self.words)
+        self.assertEqual(scored, [dict(word, score=None) for word in self.words])
+
+    def test_exhausted_wall_budget_skips_words(self):
+        """Test that words past the wall-clock budget are returned without a score."""
+        scorer = FrameScorer(FakeTTS(cached=("oui", "non")), cpu_budget=10, wall_budget=-1)
+        self.assertEqual(scorer.score(self.audio, self.words), [dict(word, score=None) for word in self.words])
+
+if __name__ == '__main__':
+    unittest.main()
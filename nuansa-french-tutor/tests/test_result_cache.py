@@ -0,0 +1,90 @@
+"""
+Tests for the text analysis result cache.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.result_cache import ResultCache, make_key
+from src.rules import RULES, RuleEngine
+
+RESULT = [[{"error": "aller", "suggestions": ["allé"], "start": 8, "end": 13}], "Je suis allé."]
+
+class TestResultCache(unittest.TestCase):
+    def test_key_covers_gender_mode_and_rules(self):
+        """Test that each part of the key separates results."""
+        key = make_key("je suis aller", "masculine", "full", "v1")
+        self.assertEqual(key, make_key("je suis aller  ", "masculine", "full", "v1"))
+        self.assertNotEqual(key, make_key("je suis aller", "feminine", "full", "v1"))
+        self.assertNotEqual(key, make_key("je suis aller", "masculine", "rules", "v1"))
+        self.assertNotEqual(key, make_key("je suis aller", "masculine", "full", "v2"))
+        # Leading spaces shift the error offsets
+        self.assertNotEqual(key, make_key(" je suis aller", "masculine", "full", "v1"))
+
+    def test_rule_changes_change_the_version(self):
+        """Test that editing a rule invalidates the cached results."""
+        edited = [dict(rule) for rule in RULES]
+        edited[0]["message"] += " (modifié)"
+        self.assertEqual(RuleEngine().version, RuleEngine(RULES).version)
+        self.assertNotEqual(RuleEngine().version, RuleEngine(edited).version)
+
+    def test_hits_return_copies(self):
+        """Test that a caller modifying a result does not alter the cache."""
+        cache = ResultCache()
+        cache.set("key", RESULT)
+        cache.get("key")[0].clear()
+        self.assertEqual(cache.get("key"), RESULT)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_lru_and_ttl_eviction(self):
+        """Test that entries are evicted beyond max_entries and after ttl."""
+        cache = ResultCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, RESULT)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), RESULT)
+
+        cache = ResultCache(ttl=0.05)
+        cache.set("a", RESULT)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_shared_store(self):
+        """Test that two caches on the same SQLite file (two workers) share results."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.db")
+            ResultCache(path=path).set("key", RESULT)
+            other = ResultCache(path=path)
+            self.assertEqual(other.get("key"), RESULT)
+            self.assertEqual(other.stats()["shared_hits"], 1)
+            self.assertEqual(other.get("key"), RESULT)
+            self.assertEqual(other.stats()["hits"], 1)
+
+    def test_shared_store_is_bounded(self):
+        """Test that the SQLite file keeps at most max_rows rows, dropping the oldest."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.db")
+            cache = ResultCache(max_entries=0, path=path, max_rows=2)
+            for key in ("a", "b", "c"):
+                cache.set(key, RESULT)
+                # Purge on every write
+                cache._next_purge = 0
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("c"), RESULT)
+
+    def test_shared_store_drops_expired_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.db")
+            ResultCache(ttl=-1, path=path).set("old", RESULT)
+            cache = ResultCache(path=path)
+            cache.set("new", RESULT)
+            count = cache._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            self.assertEqual(count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
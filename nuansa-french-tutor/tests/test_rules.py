@@ -0,0 +1,85 @@
+"""
+Tests for the declarative correction rule engine.
+Validates that the single-pass scan produces the corrections the original
+cascade of regex substitutions produced, including gender-aware rules.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rules import RuleEngine, RULES, merge_hits
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RuleEngine()
+
+    def test_sample_sentences(self):
+        """Test corrections of the preloaded demo sentences."""
+        cases = {
+            "Je vais à le marché.": "Je vais au marché.",
+            "Je suis aller chez mon mère.": "je suis allé chez ma mère.",
+            "Elle mange un pomme.": "Elle mange une pomme.",
+            "Je mange à école.": "Je mange à l'école.",
+            "Il est une belle fille.": "Elle est une belle fille.",
+        }
+        for text, expected in cases.items():
+            self.assertEqual(self.engine.apply(text), expected)
+
+    def test_speaker_gender(self):
+        """Test that gendered rules only apply to the matching speaker."""
+        self.assertEqual(self.engine.apply("je suis aller", "feminine"), "je suis allée")
+        self.assertEqual(self.engine.apply("je suis aller", "masculine"), "je suis allé")
+        self.assertEqual(self.engine.apply("je suis né", "feminine"), "je suis née")
+        self.assertEqual(self.engine.apply("je suis né", "masculine"), "je suis né")
+
+    def test_single_scan_does_not_overlap(self):
+        """Test that a rewritten span is never matched again by a later rule."""
+        self.assertEqual(self.engine.apply("de les chat"), "des chat")
+        self.assertEqual(self.engine.apply("À le marché, de le pain"), "au marché, du pain")
+
+    def test_scan_reports_spans(self):
+        """Test that hits carry offsets into the scanned text."""
+        text = "Elle mange un pomme."
+        hits = list(self.engine.scan(text))
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(text[hits[0]["start"]:hits[0]["end"]], "un pomme")
+        self.assertEqual(hits[0]["replacement"], "une pomme")
+
+    def test_correct_text_has_no_hits(self):
+        """Test that matches already written correctly are neither errors nor rewrites."""
+        self.assertEqual(list(self.engine.scan("Les chats sont mignons.")), [])
+        self.assertEqual(list(self.engine.scan("Je suis allée", "feminine")), [])
+        self.assertEqual(list(self.engine.scan("Je suis allé", "masculine")), [])
+
+    def test_hits_and_rewrite_agree(self):
+        """Test that every reported error is exactly what the rewrite changes."""
+        text = "Je suis allé chez mon mère."
+        hits = list(self.engine.scan(text, "feminine"))
+        self.assertEqual([hit["error"] for hit in hits], ["Je suis allé", "mon mère"])
+        self.assertEqual(self.engine.rewrite(text, hits), "je suis allée chez ma mère.")
+
+    def test_merge_prefers_rule_hits(self):
+        """Test that LanguageTool hits overlapping our own rules are dropped."""
+        text = "Je suis aller chez mon mère ."
+        rule_hits = list(self.engine.scan(text, "feminine"))
+        external = [
+            {"start": 8, "end": 13, "replacement": "allé", "source": "languagetool"},
+            {"start": 27, "end": 29, "replacement": ".", "source": "languagetool"},
+            {"start": 28, "end": 29, "replacement": None, "source": "languagetool"},
+        ]
+        merged = merge_hits(rule_hits, external)
+        self.assertEqual([(hit["start"], hit["source"]) for hit in merged],
+                         [(0, "rules"), (19, "rules"), (27, "languagetool")])
+        self.assertEqual(self.engine.rewrite(text, merged), "je suis allée chez ma mère.")
+
+    def test_every_rule_has_a_message(self):
+        """Test that the rule table is complete."""
+        for rule in RULES:
+            self.assertTrue(rule["message"], f"Rule {rule['id']} has no message")
+            self.assertIn(rule["gender"], (None, "masculine", "feminine"))
+
+if __name__ == '__main__':
+    unittest.main()
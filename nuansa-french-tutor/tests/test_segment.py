@@ -0,0 +1,45 @@
+"""
+Tests for the sentence segmentation of long texts.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.segment import split_sentences
+
+def sentences(text):
+    return [text[start:end] for start, end in split_sentences(text)]
+
+class TestSplitSentences(unittest.TestCase):
+    def test_final_punctuation(self):
+        """Test the split on periods, question and exclamation marks."""
+        self.assertEqual(sentences("Je vais à le marché. Tu viens ? Oui !"),
+                         ["Je vais à le marché.", "Tu viens ?", "Oui !"])
+
+    def test_offsets_point_into_the_text(self):
+        """Test that spans exclude the surrounding whitespace."""
+        text = "  Il est une belle fille.   Elle mange un pomme.  "
+        self.assertEqual(split_sentences(text), [(2, 25), (28, 48)])
+
+    def test_line_breaks_end_sentences(self):
+        """Test that a line break ends a sentence without punctuation."""
+        self.assertEqual(sentences("je suis aller\nelle mange"), ["je suis aller", "elle mange"])
+
+    def test_abbreviations_and_numbers(self):
+        """Test that abbreviations, initials and decimals do not end a sentence."""
+        self.assertEqual(sentences("M. Dupont et Mme Martin arrivent. J. Verne a écrit 2.5 livres, etc."),
+                         ["M. Dupont et Mme Martin arrivent.", "J. Verne a écrit 2.5 livres, etc."])
+
+    def test_closing_quotes_stay_with_the_sentence(self):
+        """Test that quotes after the final punctuation belong to the sentence."""
+        self.assertEqual(sentences("Il a dit « Bonjour. » Puis il est parti."),
+                         ["Il a dit « Bonjour. »", "Puis il est parti."])
+
+    def test_empty_text(self):
+        self.assertEqual(split_sentences("   "), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests for the preforking server's WSGI middlewares and CPU split.
+Workers are not forked: the middlewares are served by local threaded servers.
+"""
+
+import http.client
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.test import Client
+from werkzeug.wsgi import FileWrapper
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.serve import OwnerRouting, Sendfile, cpu_pools, make_server
+
+def echo_app(environ, start_response):
+    """Answers with the method, path, query and body it received."""
+    length = int(environ.get("CONTENT_LENGTH") or 0)
+    body = {
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ.get("QUERY_STRING", ""),
+        "body": environ["wsgi.input"].read(length).decode("utf-8") if length else ""
+    }
+    start_response("200 OK", [("Content-Type", "application/json"), ("X-Served-By", "owner")])
+    return [json.dumps(body).encode("utf-8")]
+
+def local_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"local"]
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+class TestOwnerRouting(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.routing = OwnerRouting(local_app, 0, self.socket_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def socket_path(self, index):
+        return os.path.join(self.directory, f"worker-{index}.sock")
+
+    def test_own_and_unowned_paths_stay_local(self):
+        client = Client(self.routing)
+        self.assertEqual(client.get("/jobs/w0-abc").get_data(), b"local")
+        self.assertEqual(client.get("/analyze_text").get_data(), b"local")
+
+    def test_requests_are_forwarded_to_the_owner(self):
+        """Test that another worker's job is fetched over its Unix socket, body and query included."""
+        owner = make_server(f"unix://{self.socket_path(1)}", 0, echo_app, threads=2)
+        serve(owner)
+        try:
+            response = Client(self.routing).post("/documents/w1-abc/edits?full=1", data="bonjour",
+                                                 content_type="text/plain")
+        finally:
+            owner.shutdown()
+            owner.server_close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Served-By"], "owner")
+        self.assertEqual(response.get_json(), {"method": "POST", "path": "/documents/w1-abc/edits",
+                                               "query": "full=1", "body": "bonjour"})
+
+    def test_unreachable_owner_is_not_found(self):
+        """Test that a job of a worker that is gone answers 404 instead of failing."""
+        with self.assertLogs("app.serve", level="WARNING"):
+            response = Client(self.routing).get("/stream/w3-abc")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("error", response.get_json())
+
+class TestCpuPools(unittest.TestCase):
+    @unittest.skipUnless(hasattr(os, "sched_getaffinity"), "needs CPU affinity")
+    def test_split(self):
+        with mock.patch("os.sched_getaffinity", return_value={0, 1, 2, 3}):
+            self.assertEqual(cpu_pools([2, 3]), ([0, 1], [2, 3]))
+            # CPUs the process cannot use are left out
+            self.assertEqual(cpu_pools([3, 4096]), ([0, 1, 2], [3]))
+            # Requests keep every CPU rather than none
+            self.assertEqual(cpu_pools([0, 1, 2, 3]), ([0, 1, 2, 3], [0, 1, 2, 3]))
+            self.assertEqual(cpu_pools([]), ([0, 1, 2, 3], []))
+
+class TestSendfile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "audio.mp3")
+        self.content = os.urandom(200_000)
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def file_app(self, environ, start_response):
+        start_response("200 OK", [("Content-Type", "audio/mpeg"), ("Content-Length", str(len(self.content)))])
+        # Like Flask's send_file: the server's file wrapper if it has one
+        return environ.get("wsgi.file_wrapper", FileWrapper)(open(self.path, "rb"))
+
+    def fetch(self, app):
+        server = make_server("127.0.0.1", 0, app, threads=2)
+        serve(server)
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+            connection.request("GET", "/audio.mp3")
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_whole_files_are_sent_with_sendfile(self):
+        sendfile = socket.socket.sendfile
+        with mock.patch("socket.socket.sendfile", autospec=True, side_effect=sendfile) as patched:
+            status, body = self.fetch(Sendfile(self.file_app))
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(patched.call_count, 1)
+
+    def test_other_responses_pass_through(self):
+        with mock.patch("socket.socket.sendfile", autospec=True) as patched:
+            status, body = self.fetch(Sendfile(local_app))
+        self.assertEqual((status, body), (200, b"local"))
+        patched.assert_not_called()
+
+    def test_without_a_socket_the_app_is_called_as_is(self):
+        """Test that servers without werkzeug.socket (e.g. the test client) get the plain response."""
+        response = Client(Sendfile(self.file_app)).get("/audio.mp3")
+        self.assertEqual(response.get_data(), self.content)
+
+if __name__ == '__main__':
+    unittest.main()
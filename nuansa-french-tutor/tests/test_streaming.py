@@ -0,0 +1,110 @@
+"""
+Tests for incremental transcription of streamed audio.
+Whisper is replaced by a scripted transcriber returning word timestamps.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.audio import SAMPLE_RATE
+from src.streaming import StreamManager, StreamingSession, pcm16_to_float32
+
+class ScriptedTranscriber:
+    """Returns the next scripted hypothesis; words are spaced 0.5 s apart."""
+
+    def __init__(self, hypotheses):
+        self.hypotheses = list(hypotheses)
+        self.windows = []
+
+    def transcribe(self, audio, **options):
+        self.windows.append(len(audio) / SAMPLE_RATE)
+        words = self.hypotheses.pop(0).split()
+        return {"segments": [{"words": [
+            {"word": f" {word}", "start": index * 0.5, "end": index * 0.5 + 0.4}
+            for index, word in enumerate(words)]}]}
+
+def seconds(duration):
+    return np.zeros(int(duration * SAMPLE_RATE), dtype=np.float32)
+
+class TestStreamingSession(unittest.TestCase):
+    def test_words_become_stable_when_hypotheses_agree(self):
+        """Test the local agreement between two successive hypotheses."""
+        transcriber = ScriptedTranscriber(["je suis", "je suis aller", "aller chez"])
+        session = StreamingSession(transcriber, step=1.0)
+
+        self.assertTrue(session.add_chunk(seconds(1.0)))
+        self.assertEqual(session.stable_text, "")
+        self.assertEqual(session.unstable_text, "je suis")
+
+        session.add_chunk(seconds(1.0))
+        self.assertEqual(session.stable_text, "je suis")
+        self.assertEqual(session.unstable_text, "aller")
+
+        # The committed audio (up to the end of "suis", 0.9 s) left the window
+        session.add_chunk(seconds(1.0))
+        self.assertAlmostEqual(transcriber.windows[-1], 2.1, places=2)
+
+    def test_committed_words_keep_their_time_in_the_recording(self):
+        """Test that word times stay relative to the recording after the window moves."""
+        transcriber = ScriptedTranscriber(["je suis", "je suis aller", "aller chez"])
+        session = StreamingSession(transcriber, step=1.0)
+        for _ in range(3):
+            session.add_chunk(seconds(1.0))
+
+        self.assertEqual([timing["word"] for timing in session.word_timings], ["je", "suis", "aller"])
+        self.assertAlmostEqual(session.word_timings[1]["start"], 0.5)
+        # "aller" starts the window left after "suis" (0.9 s)
+        self.assertAlmostEqual(session.word_timings[2]["start"], 0.9, places=3)
+        self.assertAlmostEqual(session.word_timings[2]["end"], 1.3, places=3)
+
+    def test_decoding_waits_for_a_full_step(self):
+        """Test that small chunks are buffered until `step` seconds are new."""
+        transcriber = ScriptedTranscriber(["bonjour"])
+        session = StreamingSession(transcriber, step=1.0)
+        self.assertFalse(session.add_chunk(seconds(0.5)))
+        self.assertTrue(session.add_chunk(seconds(0.5)))
+        self.assertEqual(len(transcriber.windows), 1)
+
+    def test_finish_commits_everything(self):
+        """Test that the end of the recording commits the unstable tail."""
+        transcriber = ScriptedTranscriber(["je mange", "je mange une pomme"])
+        session = StreamingSession(transcriber, step=1.0)
+        session.add_chunk(seconds(1.0))
+        recording = session.finish()
+        self.assertEqual(session.stable_text, "je mange une pomme")
+        self.assertEqual(len(recording), SAMPLE_RATE)
+
+    def test_recording_length_is_bounded(self):
+        """Test that a session refuses audio beyond max_duration."""
+        session = StreamingSession(ScriptedTranscriber([]), step=10.0, max_duration=2.0)
+        session.add_chunk(seconds(1.5))
+        with self.assertRaises(ValueError):
+            session.add_chunk(seconds(1.0))
+
+    def test_pcm_conversion(self):
+        """Test the conversion of 16-bit PCM chunks."""
+        samples = pcm16_to_float32(np.array([0, 16384, -32768], dtype="<i2").tobytes())
+        np.testing.assert_allclose(samples, [0.0, 0.5, -1.0])
+
+    def test_session_limit(self):
+        """Test that the manager refuses sessions beyond its capacity."""
+        manager = StreamManager(ScriptedTranscriber([]), max_sessions=1)
+        session = manager.create()
+        self.assertIsNone(manager.create())
+        manager.close(session.id)
+        self.assertIsNotNone(manager.create())
+
+    def test_session_ids_carry_the_prefix(self):
+        """Test that session ids start with the manager's id_prefix."""
+        manager = StreamManager(ScriptedTranscriber([]), id_prefix="w3-")
+        session = manager.create()
+        self.assertTrue(session.id.startswith("w3-"))
+        self.assertIs(manager.get(session.id), session)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the micro-batching transcription service.
+The Whisper forward pass is replaced by a recorder so only the batching is tested.
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.transcription import BatchingTranscriber, parse_cpu_list
+
+class RecordingTranscriber(BatchingTranscriber):
+    def __init__(self, **kwargs):
+        super().__init__(model_loader=lambda: None, **kwargs)
+        self.batch_sizes = []
+
+    def _process(self, batch):
+        self.batch_sizes.append(len(batch))
+        for audio, _, future in batch:
+            future.set_result({"text": f"transcription de {audio}"})
+
+class TestBatchingTranscriber(unittest.TestCase):
+    def run_concurrently(self, transcriber, count):
+        results = [None] * count
+
+        def call(index):
+            results[index] = transcriber.transcribe(f"clip{index}")
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        return results
+
+    def test_each_caller_gets_its_result(self):
+        """Test that results are routed back to the right caller."""
+        transcriber = RecordingTranscriber(window=0.05)
+        results = self.run_concurrently(transcriber, 6)
+        self.assertEqual([result["text"] for result in results],
+                         [f"transcription de clip{index}" for index in range(6)])
+
+    def test_concurrent_requests_are_batched(self):
+        """Test that requests arriving within the window share a batch."""
+        transcriber = RecordingTranscriber(window=0.2, max_batch=8)
+        self.run_concurrently(transcriber, 6)
+        self.assertEqual(sum(transcriber.batch_sizes), 6)
+        self.assertLess(len(transcriber.batch_sizes), 6)
+
+    def test_max_batch_size(self):
+        """Test that a batch never exceeds max_batch clips."""
+        transcriber = RecordingTranscriber(window=0.2, max_batch=2)
+        self.run_concurrently(transcriber, 5)
+        self.assertTrue(all(size <= 2 for size in transcriber.batch_sizes))
+
+    def test_errors_reach_the_caller(self):
+        """Test that a failing batch raises in every waiting caller."""
+        transcriber = BatchingTranscriber(model_loader=lambda: 1 / 0, window=0)
+        with self.assertRaises(Exception):
+            transcriber.transcribe("clip")
+
+    def test_unavailable_cpus_do_not_stop_the_worker(self):
+        """Test that pinning to CPUs the process cannot use still transcribes."""
+        transcriber = RecordingTranscriber(window=0, cpu_affinity=[4096])
+        with self.assertLogs("src.transcription", level="WARNING"):
+            result = transcriber.transcribe("clip")
+        self.assertEqual(result["text"], "transcription de clip")
+
+    def test_dead_worker_fails_waiting_callers(self):
+        """Test that callers get an error instead of blocking when the worker stops."""
+        class BrokenTranscriber(RecordingTranscriber):
+            def _serve(self):
+                raise RuntimeError("worker crashed")
+
+        transcriber = BrokenTranscriber(window=0)
+        with self.assertLogs("src.transcription", level="ERROR"):
+            with self.assertRaises(RuntimeError):
+                transcriber.transcribe("clip")
+
+class TestCpuList(unittest.TestCase):
+    def test_ranges_and_single_cpus(self):
+        """Test the taskset-style CPU list syntax."""
+        self.assertEqual(parse_cpu_list("0-3,6"), [0, 1, 2, 3, 6])
+        self.assertEqual(parse_cpu_list(" 2 , 1-2 "), [1, 2])
+        self.assertEqual(parse_cpu_list(""), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the text-to-speech backends and backend fallback.
+Runs offline with the deterministic stub backend.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tts import StubBackend, TTSBackend, TTSError, TTSService, create_backends
+from src.tts_cache import AudioCache
+
+class FailingBackend(TTSBackend):
+    name = "failing"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def synthesize(self, text, lang="fr", slow=False):
+        self.calls += 1
+        raise TTSError("network unreachable")
+
+class ChunkedBackend(TTSBackend):
+    """Streams three chunks, failing before the last one when broken."""
+    name = "chunked"
+
+    def __init__(self, broken=False):
+        super().__init__()
+        self.broken = broken
+        self.calls = 0
+
+    def stream(self, text, lang="fr", slow=False):
+        self.calls += 1
+        yield b"un-"
+        yield b"deux-"
+        if self.broken:
+            raise TTSError("connection reset")
+        yield b"trois"
+
+class TestTTS(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = AudioCache(self.temp_dir.name)
+
+    def test_stub_is_deterministic(self):
+        """Test that the stub backend returns the same wav for the same text."""
+        backend = StubBackend()
+        audio = backend.synthesize("Bonjour")
+        self.assertTrue(audio.startswith(b"RIFF"))
+        self.assertEqual(audio, backend.synthesize("Bonjour"))
+        self.assertNotEqual(audio, backend.synthesize("Bonsoir"))
+
+    def test_fallback_and_cooldown(self):
+        """Test that a failing backend falls back and is skipped afterwards."""
+        failing = FailingBackend()
+        service = TTSService([failing, StubBackend()], self.cache)
+
+        path, backend = service.to_file("Je suis allée à l'école.")
+        self.assertEqual(backend.name, "stub")
+        self.assertTrue(path.endswith(".wav"))
+
+        service.to_file("Elle mange une pomme.")
+        self.assertEqual(failing.calls, 1)
+
+    def test_no_backend_left(self):
+        """Test that synthesis reports failure when every backend fails."""
+        service = TTSService([FailingBackend()], self.cache)
+        self.assertEqual(service.to_file("Bonjour"), (None, None))
+
+    def test_cached_file_never_synthesizes(self):
+        service = TTSService([FailingBackend(), StubBackend()], self.cache)
+        self.assertIsNone(service.cached_file("Bonjour"))
+        path, _ = service.to_file("Bonjour")
+        self.assertEqual(service.cached_file("Bonjour"), path)
+
+    def test_stream_passes_chunks_and_caches_the_audio(self):
+        """Test that streamed audio arrives in chunks and is served from the cache afterwards."""
+        backend = ChunkedBackend()
+        service = TTSService([backend], self.cache)
+
+        chunks, _ = service.stream("Bonjour")
+        self.assertEqual(list(chunks), [b"un-", b"deux-", b"trois"])
+        chunks, _ = service.stream("Bonjour")
+        self.assertEqual(b"".join(chunks), b"un-deux-trois")
+        self.assertEqual(backend.calls, 1)
+
+    def test_stream_falls_back_before_the_first_chunk(self):
+        service = TTSService([FailingBackend(), StubBackend()], self.cache)
+        chunks, backend = service.stream("Bonjour")
+        self.assertEqual(backend.name, "stub")
+        self.assertTrue(b"".join(chunks).startswith(b"RIFF"))
+        self.assertEqual(TTSService([FailingBackend()], self.cache).stream("Bonjour"), (None, None))
+
+    def test_interrupted_stream_is_not_cached(self):
+        """Test that audio cut short by a backend failure is not cached."""
+        service = TTSService([ChunkedBackend(broken=True)], self.cache)
+        chunks, _ = service.stream("Bonjour")
+        self.assertEqual(list(chunks), [b"un-", b"deux-"])
+        self.assertEqual(self.cache.stats()["files"], 0)
+
+    def test_unknown_backend_name(self):
+        """Test that configuration errors are reported."""
+        self.assertEqual([backend.name for backend in create_backends("stub")], ["stub"])
+        with self.assertRaises(ValueError):
+            create_backends("gtts,festival")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
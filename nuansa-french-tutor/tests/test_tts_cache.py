@@ -0,0 +1,125 @@
+"""
+Tests for the content-addressed TTS audio cache.
+Validates key normalization, hit/miss accounting, LRU eviction and sweeping.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tts_cache import STRAY_FILE_AGE, AudioCache, is_cache_file, make_key
+
+class TestAudioCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.calls = []
+
+    def producer(self, payload):
+        def write(path):
+            self.calls.append(path)
+            with open(path, "wb") as f:
+                f.write(payload)
+        return write
+
+    def test_key_normalization(self):
+        """Test that whitespace differences share a key but settings do not."""
+        self.assertEqual(make_key("Bonjour  le\nmonde "), make_key("Bonjour le monde"))
+        self.assertNotEqual(make_key("Bonjour", lang="fr"), make_key("Bonjour", lang="en"))
+        self.assertNotEqual(make_key("Bonjour", speed="slow"), make_key("Bonjour"))
+
+    def test_second_request_is_a_hit(self):
+        """Test that identical requests are synthesized once."""
+        cache = AudioCache(self.temp_dir.name)
+        key = make_key("Je suis allée chez ma mère.")
+        first = cache.get_or_create(key, self.producer(b"mp3"))
+        second = cache.get_or_create(key, self.producer(b"mp3"))
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_empty_audio_is_not_cached(self):
+        """Test that a failed synthesis leaves nothing behind."""
+        cache = AudioCache(self.temp_dir.name)
+        self.assertIsNone(cache.get_or_create(make_key("vide"), self.producer(b"")))
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_lru_eviction(self):
+        """Test that the least recently used file is evicted first."""
+        cache = AudioCache(self.temp_dir.name, max_bytes=10)
+        keys = [make_key(text) for text in ("un", "deux", "trois")]
+        cache.get_or_create(keys[0], self.producer(b"aaaa"))
+        cache.get_or_create(keys[1], self.producer(b"bbbb"))
+        cache.get(keys[0])
+        cache.get_or_create(keys[2], self.producer(b"cccc"))
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+
+    def test_index_survives_restart(self):
+        """Test that files written by a previous process are served as hits."""
+        key = make_key("Bonjour")
+        AudioCache(self.temp_dir.name).get_or_create(key, self.producer(b"mp3"))
+        self.assertIsNotNone(AudioCache(self.temp_dir.name).get(key))
+
+    def age(self, name, seconds):
+        """Make a file look unused for seconds."""
+        path = os.path.join(self.temp_dir.name, name)
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_sweep_removes_expired_files(self):
+        """Test that files unused for longer than the time to live are removed."""
+        cache = AudioCache(self.temp_dir.name, ttl=60)
+        old, new = make_key("ancien"), make_key("nouveau")
+        cache.get_or_create(old, self.producer(b"aaaa"))
+        cache.get_or_create(new, self.producer(b"bbbb"))
+        self.age(f"{old}.mp3", 120)
+
+        self.assertEqual(cache.sweep(), 1)
+        self.assertIsNone(cache.get(old))
+        self.assertIsNotNone(cache.get(new))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.stats()["bytes"], 4)
+
+    def test_sweep_removes_old_stray_files(self):
+        """Test that leftover temporary and one-off files are removed once old enough."""
+        cache = AudioCache(self.temp_dir.name)
+        for name in ("correction_1234.mp3", "abc.mp3.5678.tmp", "recent.mp3"):
+            with open(os.path.join(self.temp_dir.name, name), "wb") as f:
+                f.write(b"mp3")
+        self.age("correction_1234.mp3", STRAY_FILE_AGE + 1)
+        self.age("abc.mp3.5678.tmp", STRAY_FILE_AGE + 1)
+
+        self.assertEqual(cache.sweep(), 2)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["recent.mp3"])
+
+    def test_sweep_enforces_bounds_across_processes(self):
+        """Test that files written by another cache on the same directory count towards the bounds."""
+        cache = AudioCache(self.temp_dir.name, max_bytes=10)
+        other = AudioCache(self.temp_dir.name, max_bytes=10)
+        cache.get_or_create(make_key("un"), self.producer(b"aaaa"))
+        other.get_or_create(make_key("deux"), self.producer(b"bbbb"))
+        other.get_or_create(make_key("trois"), self.producer(b"cccc"))
+        self.age(f"{make_key('un')}.mp3", 10)
+
+        cache.sweep()
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 2)
+        self.assertIsNone(cache.get(make_key("un")))
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+
+    def test_cache_file_names(self):
+        self.assertTrue(is_cache_file(f"{make_key('Bonjour')}.mp3"))
+        self.assertFalse(is_cache_file("correction_0432eeae.mp3"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Tests for the choice between the accurate and the fast Whisper model.
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.whisper_models import ModelPolicy, load_whisper_model, model_label
+
+class TestModelPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = ModelPolicy(fast_max_seconds=8, busy_pending=4)
+
+    def test_short_clips_use_the_fast_model(self):
+        """Test the clip length threshold."""
+        self.assertTrue(self.policy.use_fast(3.0, pending=0))
+        self.assertFalse(self.policy.use_fast(20.0, pending=0))
+
+    def test_load_uses_the_fast_model(self):
+        """Test that long clips go to the fast model while transcriptions pile up."""
+        self.assertTrue(self.policy.use_fast(20.0, pending=4))
+
+    def test_requested_accuracy_wins(self):
+        """Test that the request can force either model."""
+        self.assertFalse(self.policy.use_fast(3.0, pending=10, accuracy="high"))
+        self.assertTrue(self.policy.use_fast(20.0, pending=0, accuracy="fast"))
+
+class TestModelLabel(unittest.TestCase):
+    def test_quantized_models_are_labelled(self):
+        self.assertEqual(model_label("base"), "base")
+        self.assertEqual(model_label("tiny", quantize=True), "tiny-int8")
+
+@unittest.skipUnless(importlib.util.find_spec("whisper") and importlib.util.find_spec("torch"),
+                     "whisper and torch are not installed")
+class TestQuantization(unittest.TestCase):
+    def test_linear_layers_are_quantized(self):
+        """Test that no float linear layer is left in a quantized model."""
+        import torch
+
+        model = load_whisper_model("tiny", quantize=True)
+        self.assertFalse(any(type(module) is torch.nn.Linear for module in model.modules()))
+        self.assertEqual(model.device.type, "cpu")
+
+if __name__ == '__main__':
+    unittest.main()